@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: forecast aggregation engine vs. the original per-day implementation.
+
+Run from backend/:
+
+    python -m benchmarks.bench_forecast_aggregation [--batch 200] [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from models.weather import DailyForecast
+from services.forecast_aggregation import aggregate_daily
+
+CONDITIONS = [
+    {"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"},
+    {"id": 801, "main": "Clouds", "description": "few clouds", "icon": "02d"},
+    {"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"},
+    {"id": 600, "main": "Snow", "description": "light snow", "icon": "13d"},
+]
+
+
+def make_forecast_payload(seed: int, tz_offset: int = 3600, slots: int = 40) -> dict:
+    """Build a realistic 5-day/3-hour forecast payload."""
+    rng = random.Random(seed)
+    start = 1704067200 + rng.randrange(0, 8) * 10800
+    items = []
+    for i in range(slots):
+        temp = round(rng.uniform(-10, 35), 2)
+        item = {
+            "dt": start + i * 10800,
+            "main": {
+                "temp": temp,
+                "feels_like": round(temp - rng.uniform(0, 3), 2),
+                "temp_min": temp - 1,
+                "temp_max": temp + 1,
+                "pressure": rng.randint(990, 1030),
+                "humidity": rng.randint(20, 100),
+            },
+            "weather": [rng.choice(CONDITIONS)],
+            "clouds": {"all": rng.randint(0, 100)},
+            "wind": {"speed": round(rng.uniform(0, 15), 2), "deg": rng.randint(0, 359)},
+            "pop": round(rng.random(), 2),
+        }
+        if rng.random() < 0.3:
+            item["rain"] = {"3h": round(rng.uniform(0.1, 5), 2)}
+        if rng.random() < 0.1:
+            item["snow"] = {"3h": round(rng.uniform(0.1, 3), 2)}
+        items.append(item)
+    return {
+        "city": {"coord": {"lat": 48.8566, "lon": 2.3522}, "timezone": tz_offset},
+        "list": items,
+    }
+
+
+def legacy_aggregate(items: list[dict], tz_offset: int) -> list[DailyForecast]:
+    """The original implementation: group by formatted local date, then aggregate each day."""
+    location_tz = timezone(timedelta(seconds=tz_offset))
+    daily_items: dict[str, list[dict]] = defaultdict(list)
+    for item in items:
+        dt_local = datetime.fromtimestamp(item["dt"], tz=timezone.utc).astimezone(location_tz)
+        daily_items[dt_local.strftime("%Y-%m-%d")].append(item)
+
+    return [
+        DailyForecast.from_openweathermap_3h(
+            daily_items[date_key],
+            datetime.strptime(date_key, "%Y-%m-%d").replace(tzinfo=location_tz),
+        )
+        for date_key in sorted(daily_items)
+    ]
+
+
+def bench(label: str, fn, number: int, repeat: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    print(f"  {label:<10} {best * 1e6:10.1f} us")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch", type=int, default=200, help="Forecasts per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (best is kept)")
+    args = parser.parse_args()
+
+    payloads = [make_forecast_payload(seed, tz_offset=(seed % 25 - 12) * 3600) for seed in range(args.batch)]
+    for payload in payloads:
+        tz = payload["city"]["timezone"]
+        assert aggregate_daily(payload["list"], tz) == legacy_aggregate(payload["list"], tz)
+
+    single = payloads[0]
+    tz = single["city"]["timezone"]
+    print("Single forecast (40 slots):")
+    legacy = bench("legacy", lambda: legacy_aggregate(single["list"], tz), 2000, args.repeat)
+    engine = bench("engine", lambda: aggregate_daily(single["list"], tz), 2000, args.repeat)
+    print(f"  speedup    {legacy / engine:10.2f}x")
+
+    def run_batch(aggregate):
+        for payload in payloads:
+            aggregate(payload["list"], payload["city"]["timezone"])
+
+    print(f"Batch of {args.batch} forecasts:")
+    legacy = bench("legacy", lambda: run_batch(legacy_aggregate), 10, args.repeat)
+    engine = bench("engine", lambda: run_batch(aggregate_daily), 10, args.repeat)
+    print(f"  speedup    {legacy / engine:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: upstream tail latency with and without hedging.
+
+Simulates an upstream whose responses usually take a few milliseconds but
+occasionally stall, and reports latency percentiles and the extra upstream
+calls spent on hedges. Latencies are scaled down so the run takes seconds.
+Run from backend/:
+
+    python -m benchmarks.bench_hedging [--calls 2000] [--stall-rate 0.03]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from services.hedging import Hedger, LatencyTracker
+
+
+def make_upstream(stall_rate: float, seed: int):
+    rng = random.Random(seed)
+    sent = 0
+
+    async def request(timeout: float) -> None:
+        nonlocal sent
+        sent += 1
+        latency = rng.uniform(0.002, 0.006)
+        if rng.random() < stall_rate:
+            latency += rng.uniform(0.05, 0.1)
+        await asyncio.sleep(min(latency, timeout))
+
+    return request, lambda: sent
+
+
+async def run(calls: int, stall_rate: float, hedger: Hedger | None) -> tuple[LatencyTracker, int]:
+    request, sent = make_upstream(stall_rate, seed=7)
+    latencies = LatencyTracker(window=calls)
+    for _ in range(calls):
+        start = time.perf_counter()
+        if hedger is None:
+            await request(10.0)
+        else:
+            await hedger.call("weather", request, timeout=10.0)
+        latencies.record(time.perf_counter() - start)
+    return latencies, sent()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000, help="Upstream calls per scenario")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="Fraction of calls that stall")
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, {args.stall_rate:.0%} stalling:")
+    scenarios = [
+        ("no hedging", None),
+        ("hedge at p95, max 10%", Hedger(percentile=0.95, max_rate=0.1, min_delay=0.0)),
+    ]
+    for label, hedger in scenarios:
+        latencies, sent = asyncio.run(run(args.calls, args.stall_rate, hedger))
+        p50, p95, p99 = (latencies.percentile(q) * 1e3 for q in (0.5, 0.95, 0.99))
+        extra = sent / args.calls - 1
+        print(
+            f"  {label:<22} p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  p99 {p99:6.1f} ms"
+            f"  extra calls {extra:5.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
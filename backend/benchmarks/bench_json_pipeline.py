@@ -0,0 +1,105 @@
+"""
+Benchmark: JSON pipeline with and without the fast path.
+
+Measures upstream body parsing (stdlib json vs. orjson) and in-process
+endpoint throughput with FAST_JSON_RESPONSES off and on. The app runs over
+httpx's ASGI transport against a stub provider, so only routing, validation
+and serialization are timed. Run from backend/:
+
+    python -m benchmarks.bench_json_pipeline [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import timeit
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.bench_forecast_aggregation import make_forecast_payload
+from config import settings
+from models.weather import CurrentWeather
+from routers import geocoding_router, weather_router
+from services import json_codec
+from services.weather_provider import ForecastSeries
+
+
+class StubProvider:
+    """Serves prebuilt models so only the HTTP layer is measured."""
+
+    def __init__(self, current: CurrentWeather, series: ForecastSeries):
+        self.current = current
+        self.series = series
+
+    async def get_current(self, lat, lon, units="metric"):
+        return self.current
+
+    async def get_forecast(self, lat, lon, days=5, units="metric"):
+        return self.series.for_days(days)
+
+    def fresh_for(self, kind, lat, lon):
+        return settings.weather_cache_ttl if kind == "current" else settings.forecast_cache_ttl
+
+
+def build_app(current_payload: dict, forecast_payload: dict) -> FastAPI:
+    app = FastAPI()
+    app.state.weather_provider = StubProvider(
+        CurrentWeather.from_openweathermap(current_payload), ForecastSeries(forecast_payload)
+    )
+    app.include_router(geocoding_router)
+    app.include_router(weather_router)
+    return app
+
+
+async def throughput(app: FastAPI, path: str, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        params = {"lat": 48.8566, "lon": 2.3522}
+        for _ in range(50):  # warm up
+            await client.get(path, params=params)
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get(path, params=params)
+            response.raise_for_status()
+        return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    args = parser.parse_args()
+
+    current_payload = {
+        "coord": {"lon": 2.3522, "lat": 48.8566},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "main": {"temp": 20.5, "feels_like": 19.8, "temp_min": 18.0, "temp_max": 22.0,
+                 "pressure": 1015, "humidity": 65},
+        "visibility": 10000,
+        "wind": {"speed": 3.5, "deg": 180},
+        "clouds": {"all": 0},
+        "dt": 1704067200,
+        "sys": {"country": "FR", "sunrise": 1704093600, "sunset": 1704126000},
+        "name": "Paris",
+    }
+    forecast_payload = make_forecast_payload(0)
+    forecast_bytes = json.dumps(forecast_payload).encode()
+
+    print(f"Upstream parse of a {len(forecast_bytes)} byte forecast body:")
+    stdlib = min(timeit.repeat(lambda: json.loads(forecast_bytes), number=2000, repeat=5)) / 2000
+    codec = min(timeit.repeat(lambda: json_codec.loads(forecast_bytes), number=2000, repeat=5)) / 2000
+    print(f"  json.loads        {stdlib * 1e6:8.1f} us")
+    print(f"  json_codec.loads  {codec * 1e6:8.1f} us  (orjson={'yes' if json_codec.HAVE_ORJSON else 'no'})")
+
+    app = build_app(current_payload, forecast_payload)
+    for path in ("/api/weather/current", "/api/weather/forecast"):
+        print(f"{path} throughput ({args.requests} requests):")
+        for fast in (False, True):
+            settings.fast_json_responses = fast
+            rps = asyncio.run(throughput(app, path, args.requests))
+            print(f"  fast_json_responses={str(fast):<5} {rps:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Local OpenWeatherMap stand-in for load tests.
+
+Serves the current weather, forecast and geocoding endpoints over HTTP/1.1
+keep-alive on localhost, with a configurable latency distribution, error
+rate and payload sizes. Payloads are built from synthetic metric fixtures
+(`tests/fixtures/owm_*.json`), with the requested coordinates echoed back so
+every location decodes as its own.
+"""
+
+import asyncio
+import copy
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+STATUS_TEXT = {200: "OK", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+@dataclass
+class UpstreamProfile:
+    """How the stand-in behaves."""
+
+    # Median latency and log-normal spread (sigma) of response times
+    latency_ms: float = 40.0
+    latency_sigma: float = 0.5
+    # Fraction of responses that are 503s
+    error_rate: float = 0.0
+    # 3-hour slots per forecast (OpenWeatherMap returns 40)
+    forecast_slots: int = 40
+    # Results per geocoding query (OpenWeatherMap returns up to 5)
+    geocoding_results: int = 5
+
+
+def _load_fixture(name: str) -> dict:
+    return json.loads((FIXTURES_DIR / name).read_text())
+
+
+class FakeOpenWeatherMap:
+    """OpenWeatherMap stand-in on a local port; counts calls per path."""
+
+    def __init__(self, profile: UpstreamProfile | None = None, seed: int = 0):
+        self.profile = profile or UpstreamProfile()
+        self.calls: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._current = _load_fixture("owm_current.json")
+        self._forecast = _load_fixture("owm_forecast.json")
+        self._server: asyncio.Server | None = None
+        self.url = ""
+
+    async def start(self) -> str:
+        """Start listening on a free local port and return the base URL."""
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeOpenWeatherMap":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                status, body = await self._respond(method, target)
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str) -> tuple[int, bytes]:
+        url = urlsplit(target)
+        self.calls[url.path] += 1
+        if method == "HEAD":
+            return 200, b""
+
+        profile = self.profile
+        latency = profile.latency_ms * self._rng.lognormvariate(0, profile.latency_sigma)
+        await asyncio.sleep(latency / 1000)
+        if self._rng.random() < profile.error_rate:
+            return 503, b'{"cod": 503, "message": "Service Unavailable"}'
+
+        params = dict(parse_qsl(url.query))
+        if url.path == "/data/2.5/weather":
+            payload = self.current_payload(float(params["lat"]), float(params["lon"]))
+        elif url.path == "/data/2.5/forecast":
+            payload = self.forecast_payload(float(params["lat"]), float(params["lon"]))
+        elif url.path == "/geo/1.0/direct":
+            payload = self.geocoding_payload(params["q"], int(params.get("limit", 5)))
+        else:
+            return 404, b'{"cod": 404, "message": "Not Found"}'
+        return 200, json.dumps(payload).encode()
+
+    def current_payload(self, lat: float, lon: float) -> dict:
+        payload = copy.deepcopy(self._current)
+        payload["coord"] = {"lat": lat, "lon": lon}
+        return payload
+
+    def forecast_payload(self, lat: float, lon: float) -> dict:
+        payload = copy.deepcopy(self._forecast)
+        recorded = payload["list"]
+        start = recorded[0]["dt"]
+        payload["list"] = [
+            {**recorded[i % len(recorded)], "dt": start + i * 10800}
+            for i in range(self.profile.forecast_slots)
+        ]
+        payload["city"]["coord"] = {"lat": lat, "lon": lon}
+        return payload
+
+    def geocoding_payload(self, query: str, limit: int) -> list[dict]:
+        return [
+            {
+                "name": query.title(),
+                "lat": round(48.8566 + i, 4),
+                "lon": round(2.3522 + i, 4),
+                "country": "FR",
+                "state": f"Region {i}",
+            }
+            for i in range(min(limit, self.profile.geocoding_results))
+        ]
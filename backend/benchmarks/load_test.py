@@ -0,0 +1,296 @@
+"""
+Load test: the real FastAPI app against a local OpenWeatherMap stand-in.
+
+Starts benchmarks.fake_owm on a local port, points the app at it and drives
+each scenario with a fixed number of concurrent clients, each sending its
+next request as soon as the previous one returns. Every scenario gets a
+fresh app (empty caches, closed circuits). Reports requests per second,
+latency percentiles, errors and upstream calls per endpoint; `--json`
+writes the same as JSON and `--compare` diffs against an earlier run.
+
+`--replay ARCHIVE` runs a scenario built from traffic recorded with
+UPSTREAM_RECORD_FILE: each recorded upstream call becomes the API request
+that asks for it, and upstream is served from the archive with its
+recorded latencies (scaled by `--latency-scale`). It replaces the synthetic
+scenarios unless some are picked with `--scenario`.
+Run from backend/:
+
+    python -m benchmarks.load_test [--concurrency 32] [--requests 2000]
+        [--scenario current_hot ...] [--replay upstream.jsonl.gz]
+        [--json out.json] [--compare before.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextlib import AsyncExitStack, contextmanager
+from dataclasses import dataclass, field
+
+import httpx
+
+from benchmarks.fake_owm import FakeOpenWeatherMap, UpstreamProfile
+from config import settings
+from main import app
+from services.recording import load_archive
+
+PLACES = ["paris", "london", "berlin", "madrid", "rome", "vienna", "prague", "lisbon"]
+
+
+@dataclass
+class Scenario:
+    """A request mix and the upstream it runs against."""
+
+    name: str
+    description: str
+    # Builds the i-th GET request: (path, query params)
+    make_request: Callable[[random.Random, int], tuple[str, dict]]
+    upstream: UpstreamProfile = field(default_factory=UpstreamProfile)
+    # Settings overridden for the scenario
+    settings: dict = field(default_factory=dict)
+    # Serve upstream from this recorded archive instead of the stand-in
+    replay: str | None = None
+
+
+def _location(rng: random.Random, spread: int) -> dict:
+    """One of `spread` locations, far enough apart not to share a cache cell."""
+    i = rng.randrange(spread)
+    return {"lat": round(-60 + (i % 120), 4), "lon": round(-170 + (i // 120) % 340, 4)}
+
+
+def _unique_location(i: int) -> dict:
+    return {"lat": round(-60 + (i % 120), 4), "lon": round(-170 + i // 120, 4)}
+
+
+SCENARIOS = [
+    Scenario(
+        "current_hot",
+        "current weather for 8 popular locations (cache and coalescing)",
+        lambda rng, i: ("/api/weather/current", _location(rng, 8)),
+    ),
+    Scenario(
+        "current_cold",
+        "current weather, every request a new location (all cache misses)",
+        lambda rng, i: ("/api/weather/current", _unique_location(i)),
+    ),
+    Scenario(
+        "forecast_mixed",
+        "5-day forecasts across 200 locations",
+        lambda rng, i: ("/api/weather/forecast", _location(rng, 200)),
+    ),
+    Scenario(
+        "bundle",
+        "current weather and forecast together across 200 locations",
+        lambda rng, i: ("/api/weather/bundle", _location(rng, 200)),
+    ),
+    Scenario(
+        "geocode",
+        "place searches over a small vocabulary",
+        lambda rng, i: ("/api/geocode", {"q": rng.choice(PLACES)}),
+    ),
+    Scenario(
+        "upstream_errors",
+        "cold current weather with 20% upstream 503s and slower responses",
+        lambda rng, i: ("/api/weather/current", _unique_location(i)),
+        upstream=UpstreamProfile(latency_ms=80.0, latency_sigma=0.8, error_rate=0.2),
+    ),
+]
+
+
+# Recorded upstream paths and the API endpoints that call them
+REPLAYED_ENDPOINTS = {
+    "/data/2.5/weather": ("/api/weather/current", ("lat", "lon")),
+    "/data/2.5/forecast": ("/api/weather/forecast", ("lat", "lon")),
+    "/geo/1.0/direct": ("/api/geocode", ("q", "limit")),
+}
+
+
+def replay_scenario(path: str, latency_scale: float) -> tuple[Scenario, int]:
+    """A scenario sending the API request behind each recorded upstream GET."""
+    calls = []
+    for exchange in load_archive(path):
+        method, _, target = exchange.key.partition(" ")
+        url = httpx.URL(target)
+        if method != "GET" or url.path not in REPLAYED_ENDPOINTS:
+            continue
+        api_path, names = REPLAYED_ENDPOINTS[url.path]
+        calls.append((api_path, {name: url.params[name] for name in names if name in url.params}))
+    scenario = Scenario(
+        "replay",
+        f"{len(calls)} recorded upstream calls from {path}",
+        lambda rng, i: calls[i % len(calls)],
+        settings={"upstream_replay_latency_scale": latency_scale},
+        replay=path,
+    )
+    return scenario, len(calls)
+
+
+@contextmanager
+def overridden_settings(**overrides):
+    """Temporarily replace settings attributes."""
+    saved = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_scenario(scenario: Scenario, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    calls = [scenario.make_request(rng, i) for i in range(requests)]
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+
+    async with AsyncExitStack() as stack:
+        overrides = {
+            "openweathermap_api_key": "load-test",
+            # The stand-in has no quota; keep the limiter out of the measurement
+            "upstream_rate_limit_per_minute": 0,
+            "upstream_rate_limit_per_day": 0,
+            "upstream_max_connections": max(concurrency, settings.upstream_max_connections),
+            **scenario.settings,
+        }
+        if scenario.replay is None:
+            upstream = await stack.enter_async_context(
+                FakeOpenWeatherMap(scenario.upstream, seed=seed)
+            )
+            overrides["openweathermap_url"] = upstream.url
+            upstream_calls = upstream.calls
+        else:
+            overrides["upstream_replay_file"] = scenario.replay
+            upstream_calls = Counter()
+        with overridden_settings(**overrides):
+            async with app.router.lifespan_context(app):
+                # Prewarming is counted against the app, not the scenario
+                upstream_calls.clear()
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(
+                    transport=transport, base_url="http://load-test"
+                ) as client:
+                    next_call = iter(calls)
+
+                    async def worker() -> None:
+                        for path, params in next_call:
+                            start = time.perf_counter()
+                            response = await client.get(path, params=params)
+                            latencies.append(time.perf_counter() - start)
+                            statuses[response.status_code] += 1
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*(worker() for _ in range(concurrency)))
+                    elapsed = time.perf_counter() - started
+                if scenario.replay is not None:
+                    upstream_calls["replayed"] = app.state.upstream_replay.served
+                    upstream_calls["not_recorded"] = app.state.upstream_replay.missing
+
+    latencies.sort()
+    return {
+        "description": scenario.description,
+        "requests": requests,
+        "concurrency": concurrency,
+        "rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            name: round(_percentile(latencies, q) * 1000, 2)
+            for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        },
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "upstream_calls": dict(sorted(upstream_calls.items())),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format(name: str, result: dict, before: dict | None) -> str:
+    latency = result["latency_ms"]
+    upstream = sum(result["upstream_calls"].values())
+    line = (
+        f"  {name:<16} {result['rps']:8.1f} req/s  p50 {latency['p50']:7.1f} ms"
+        f"  p95 {latency['p95']:7.1f} ms  p99 {latency['p99']:7.1f} ms"
+        f"  errors {result['errors']:5d}  upstream {upstream:5d}"
+    )
+    if before is not None:
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        p99_change = (
+            latency["p99"] / before["latency_ms"]["p99"] - 1
+            if before["latency_ms"]["p99"]
+            else 0.0
+        )
+        line += f"  (rps {rps_change:+.0%}, p99 {p99_change:+.0%})"
+    return line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="Run only these scenarios (repeatable)",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Seed for request mix and upstream")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="Replay a recorded archive")
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0, help="Multiplier for replayed latencies"
+    )
+    parser.add_argument("--json", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with an earlier --json run")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["scenarios"]
+
+    selected = args.scenario or ([] if args.replay else [scenario.name for scenario in SCENARIOS])
+    runs = [(scenario, args.requests) for scenario in SCENARIOS if scenario.name in selected]
+    if args.replay:
+        scenario, requests = replay_scenario(args.replay, args.latency_scale)
+        if not requests:
+            parser.error(f"no replayable upstream calls in {args.replay}")
+        runs.append((scenario, requests))
+
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent clients:")
+    results = {}
+    for scenario, requests in runs:
+        result = asyncio.run(run_scenario(scenario, requests, args.concurrency, args.seed))
+        results[scenario.name] = result
+        print(_format(scenario.name, result, baseline.get(scenario.name)))
+
+    if args.json:
+        report = {
+            "commit": _commit(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "scenarios": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
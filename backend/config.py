@@ -5,8 +5,109 @@ class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
     openweathermap_api_key: str = ""
+    # Origin of the OpenWeatherMap APIs (e.g. a local stand-in for load tests)
+    openweathermap_url: str = "https://api.openweathermap.org"
     frontend_url: str = "http://localhost:5173"
 
+    # Weather caches: TTLs in seconds (0 disables), grid cell size in degrees
+    weather_cache_ttl: float = 300.0
+    forecast_cache_ttl: float = 1800.0
+    weather_cache_grid: float = 0.01
+    weather_cache_max_entries: int = 10_000
+    # Seconds past expiry to serve stale while refreshing / when upstream fails
+    weather_cache_stale_while_revalidate: float = 600.0
+    weather_cache_stale_if_error: float = 3600.0
+
+    # Cache tier shared by all workers: memory://, sqlite:///path/to/cache.db
+    # or redis://host:port/db (empty disables); geocoding results kept for a day
+    shared_cache_url: str = ""
+    geocode_shared_cache_ttl: float = 86400.0
+
+    # Maximum concurrent upstream lookups per batch request
+    weather_batch_concurrency: int = 10
+
+    # Shared upstream HTTP pool; connections pre-opened per host at startup
+    # when an API key is configured (0 disables)
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_keepalive_expiry: float = 30.0
+    upstream_http2: bool = False
+    upstream_compression: bool = True
+    upstream_prewarm_connections: int = 0
+
+    # Append every upstream exchange to a compressed archive (one file per
+    # worker process, named after it with the pid), or serve upstream calls
+    # from one instead of the network (empty disables); replayed latencies are
+    # multiplied by the scale (0 answers at once)
+    upstream_record_file: str = ""
+    upstream_replay_file: str = ""
+    upstream_replay_latency_scale: float = 1.0
+
+    # Upstream account quota shared by all services (0 disables a budget).
+    # Every worker process enforces its own budget, so each gets the quota
+    # divided by the number of workers, which must match uvicorn --workers.
+    # Interactive calls wait up to max_wait for budget; background refreshes
+    # are dropped once only the reserved fraction is left.
+    upstream_rate_limit_per_minute: int = 60
+    upstream_rate_limit_per_day: int = 0
+    upstream_rate_limit_workers: int = 1
+    upstream_rate_limit_max_wait: float = 2.0
+    upstream_rate_limit_background_reserve: float = 0.2
+
+    # Total seconds per upstream call across retries, and per-endpoint circuit
+    # breakers that fail fast after consecutive failures
+    upstream_deadline: float = 10.0
+    upstream_attempts: int = 3
+    upstream_retry_backoff: float = 0.25
+    upstream_circuit_failure_threshold: int = 5
+    upstream_circuit_recovery_time: float = 30.0
+
+    # Send a second identical upstream request when the first is slower than
+    # the given percentile of recent latencies, for at most max_rate of calls
+    upstream_hedging: bool = False
+    upstream_hedge_percentile: float = 0.95
+    upstream_hedge_max_rate: float = 0.1
+    upstream_hedge_min_delay: float = 0.05
+
+    # Refresh the most requested weather and forecast entries shortly before
+    # they expire (0 disables). Access counts halve every half_life seconds
+    # and keys need min_hits of them; refreshes use background budget and
+    # at most max_calls_per_minute upstream calls.
+    prewarm_top_n: int = 50
+    prewarm_min_hits: float = 3.0
+    prewarm_half_life: float = 3600.0
+    prewarm_lead_time: float = 30.0
+    prewarm_max_calls_per_minute: int = 10
+
+    # Live current-weather streams: each subscribed location is polled once
+    # per interval however many clients follow it (0 subscribers disables),
+    # and idle streams get a keep-alive comment every heartbeat seconds
+    live_poll_interval: float = 60.0
+    live_max_subscribers: int = 1000
+    live_heartbeat: float = 15.0
+
+    # Report per-phase timings in a Server-Timing header on every response,
+    # and optionally log them
+    server_timing: bool = True
+    server_timing_log: bool = False
+
+    # Compress responses of at least min_size bytes with brotli (if the
+    # optional package is installed) or gzip, as the client accepts
+    response_compression: bool = True
+    response_compression_min_size: int = 1024
+
+    # Serialize endpoint models directly instead of re-validating them in FastAPI
+    fast_json_responses: bool = False
+
+    # Typeahead cache of past geocoding results (0 entries disables)
+    geocode_prefix_cache_entries: int = 5000
+    geocode_prefix_cache_bytes: int = 4 * 1024 * 1024
+
+    # Offline gazetteer: GeoNames cities file (empty disables) and optional admin1 names
+    gazetteer_cities_file: str = ""
+    gazetteer_admin1_file: str = ""
+    gazetteer_index_file: str = "gazetteer.idx"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
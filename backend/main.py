@@ -1,25 +1,201 @@
 from contextlib import asynccontextmanager
 
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
-from routers import geocoding_router, weather_router
-from services import GeocodingService, WeatherProvider
+from routers import geocoding_router, metrics_router, weather_router
+from services import (
+    Gazetteer,
+    GeocodingService,
+    Hedger,
+    LiveWeatherHub,
+    PopularityTracker,
+    PrefixCache,
+    PrewarmScheduler,
+    RateLimiter,
+    ReplayTransport,
+    TrafficArchive,
+    TTLCache,
+    UpstreamPolicy,
+    UpstreamPool,
+    WeatherProvider,
+    load_archive,
+    open_backend,
+)
+from services.compression import CompressionMiddleware
+from services.metrics import MetricsMiddleware, RequestMetrics
+from services.rate_limit import worker_share
+from services.timing import ServerTimingMiddleware
+
+
+def _weather_cache(ttl: float) -> TTLCache | None:
+    """Build a weather cache that retains entries for the configured stale windows."""
+    if ttl <= 0:
+        return None
+    return TTLCache(
+        ttl=ttl,
+        max_entries=settings.weather_cache_max_entries,
+        stale_ttl=max(
+            settings.weather_cache_stale_while_revalidate,
+            settings.weather_cache_stale_if_error,
+        ),
+    )
+
+
+def _upstream_url(default: str) -> str:
+    """Move a service's default base URL onto the configured OpenWeatherMap origin."""
+    return settings.openweathermap_url.rstrip("/") + httpx.URL(default).path
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle - initialize and cleanup services."""
     # Startup: Initialize services
-    app.state.geocoding_service = GeocodingService(settings.openweathermap_api_key)
-    app.state.weather_provider = WeatherProvider(settings.openweathermap_api_key)
+    replay = None
+    if settings.upstream_replay_file:
+        replay = ReplayTransport(
+            load_archive(settings.upstream_replay_file),
+            latency_scale=settings.upstream_replay_latency_scale,
+        )
+    app.state.upstream_replay = replay
+    archive = None
+    if settings.upstream_record_file:
+        archive = TrafficArchive(settings.upstream_record_file)
+    pool = UpstreamPool(
+        max_connections=settings.upstream_max_connections,
+        max_keepalive_connections=settings.upstream_max_keepalive_connections,
+        keepalive_expiry=settings.upstream_keepalive_expiry,
+        http2=settings.upstream_http2,
+        compression=settings.upstream_compression,
+        transport=replay,
+        archive=archive,
+    )
+    app.state.upstream_pool = pool
+    rate_limiter = RateLimiter(
+        per_minute=worker_share(
+            settings.upstream_rate_limit_per_minute, settings.upstream_rate_limit_workers
+        ),
+        per_day=worker_share(
+            settings.upstream_rate_limit_per_day, settings.upstream_rate_limit_workers
+        ),
+        max_wait=settings.upstream_rate_limit_max_wait,
+        background_reserve=settings.upstream_rate_limit_background_reserve,
+    )
+    app.state.rate_limiter = rate_limiter
+    policy = UpstreamPolicy(
+        deadline=settings.upstream_deadline,
+        attempts=settings.upstream_attempts,
+        backoff=settings.upstream_retry_backoff,
+        failure_threshold=settings.upstream_circuit_failure_threshold,
+        recovery_time=settings.upstream_circuit_recovery_time,
+    )
+    app.state.upstream_policy = policy
+    hedger = None
+    if settings.upstream_hedging:
+        hedger = Hedger(
+            percentile=settings.upstream_hedge_percentile,
+            max_rate=settings.upstream_hedge_max_rate,
+            min_delay=settings.upstream_hedge_min_delay,
+        )
+    app.state.hedger = hedger
+    shared_cache = open_backend(settings.shared_cache_url) if settings.shared_cache_url else None
+    gazetteer = None
+    if settings.gazetteer_cities_file:
+        gazetteer = Gazetteer.load(
+            settings.gazetteer_cities_file,
+            settings.gazetteer_index_file,
+            admin1_path=settings.gazetteer_admin1_file or None,
+        )
+    prefix_cache = None
+    if settings.geocode_prefix_cache_entries > 0:
+        prefix_cache = PrefixCache(
+            max_entries=settings.geocode_prefix_cache_entries,
+            max_bytes=settings.geocode_prefix_cache_bytes,
+        )
+    app.state.geocoding_service = GeocodingService(
+        settings.openweathermap_api_key,
+        base_url=_upstream_url(GeocodingService.BASE_URL),
+        gazetteer=gazetteer,
+        prefix_cache=prefix_cache,
+        client=pool.client,
+        rate_limiter=rate_limiter,
+        policy=policy,
+        hedger=hedger,
+        shared_cache=shared_cache,
+        shared_cache_ttl=settings.geocode_shared_cache_ttl,
+    )
+    popularity = None
+    caching = settings.weather_cache_ttl > 0 or settings.forecast_cache_ttl > 0
+    if settings.prewarm_top_n > 0 and caching:
+        popularity = PopularityTracker(half_life=settings.prewarm_half_life)
+    app.state.weather_provider = WeatherProvider(
+        settings.openweathermap_api_key,
+        base_url=_upstream_url(WeatherProvider.BASE_URL),
+        current_cache=_weather_cache(settings.weather_cache_ttl),
+        forecast_cache=_weather_cache(settings.forecast_cache_ttl),
+        cache_grid=settings.weather_cache_grid,
+        stale_while_revalidate=settings.weather_cache_stale_while_revalidate,
+        stale_if_error=settings.weather_cache_stale_if_error,
+        batch_concurrency=settings.weather_batch_concurrency,
+        client=pool.client,
+        rate_limiter=rate_limiter,
+        policy=policy,
+        hedger=hedger,
+        shared_cache=shared_cache,
+        popularity=popularity,
+    )
+    prewarm = None
+    if popularity is not None:
+        prewarm = PrewarmScheduler(
+            app.state.weather_provider,
+            popularity,
+            top_n=settings.prewarm_top_n,
+            min_score=settings.prewarm_min_hits,
+            lead_time=settings.prewarm_lead_time,
+            max_calls_per_minute=settings.prewarm_max_calls_per_minute,
+        )
+        prewarm.start()
+    app.state.prewarm = prewarm
+    live_weather = None
+    if settings.live_max_subscribers > 0:
+        live_weather = LiveWeatherHub(
+            app.state.weather_provider,
+            interval=settings.live_poll_interval,
+            grid=settings.weather_cache_grid,
+            max_subscribers=settings.live_max_subscribers,
+        )
+    app.state.live_weather = live_weather
+    # Without a key, upstream calls would only fail, so don't reach out at startup
+    if (
+        settings.upstream_prewarm_connections > 0
+        and settings.openweathermap_api_key
+        and replay is None
+    ):
+        hosts = {
+            str(httpx.URL(url).copy_with(path="/"))
+            for url in (
+                app.state.geocoding_service.base_url,
+                app.state.weather_provider.base_url,
+            )
+        }
+        await pool.prewarm(sorted(hosts), connections=settings.upstream_prewarm_connections)
 
     yield
 
     # Shutdown: Cleanup services
+    if live_weather is not None:
+        await live_weather.close()
+    if prewarm is not None:
+        await prewarm.stop()
     await app.state.geocoding_service.close()
     await app.state.weather_provider.close()
+    await pool.aclose()
+    if shared_cache is not None:
+        await shared_cache.close()
+    if gazetteer is not None:
+        gazetteer.close()
 
 
 app = FastAPI(
@@ -42,13 +218,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Inside the timing middleware, so compression shows up in Server-Timing
+if settings.response_compression:
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=settings.response_compression_min_size
+    )
+
+if settings.server_timing:
+    app.add_middleware(ServerTimingMiddleware, log=settings.server_timing_log)
+
+# Time every request, including CORS handling and error responses
+app.state.request_metrics = RequestMetrics()
+app.add_middleware(MetricsMiddleware, metrics=app.state.request_metrics)
+
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "chasingmana-api"}
+    response = {"status": "healthy", "service": "chasingmana-api"}
+    weather_provider = app.state.weather_provider
+    for name, stats in (
+        ("weather_cache", weather_provider.cache_stats),
+        ("forecast_cache", weather_provider.forecast_cache_stats),
+    ):
+        if stats is not None:
+            response[name] = {
+                "hits": stats.hits,
+                "stale_hits": stats.stale_hits,
+                "misses": stats.misses,
+                "size": stats.size,
+                "hit_ratio": round(stats.hit_ratio, 4),
+            }
+    shared_stats = {
+        **weather_provider.shared_cache_stats,
+        "geocode": app.state.geocoding_service.shared_cache_stats,
+    }
+    response["shared_cache"] = {
+        name: {
+            "hits": stats.hits,
+            "stale_hits": stats.stale_hits,
+            "misses": stats.misses,
+            "hit_ratio": round(stats.hit_ratio, 4),
+        }
+        for name, stats in shared_stats.items()
+        if stats is not None
+    }
+    pool_stats = app.state.upstream_pool.stats
+    response["upstream_pool"] = {
+        "max_connections": pool_stats.max_connections,
+        "connections": pool_stats.connections,
+        "active_connections": pool_stats.active_connections,
+        "in_flight": pool_stats.in_flight,
+        "peak_in_flight": pool_stats.peak_in_flight,
+        "requests": pool_stats.requests,
+        "utilization": (
+            round(pool_stats.utilization, 4) if pool_stats.utilization is not None else None
+        ),
+    }
+    limit_stats = app.state.rate_limiter.stats
+    response["rate_limit"] = {
+        "minute_remaining": limit_stats.minute_remaining,
+        "day_remaining": limit_stats.day_remaining,
+        "granted": limit_stats.granted,
+        "waited": limit_stats.waited,
+        "throttled": limit_stats.throttled,
+        "dropped": limit_stats.dropped,
+    }
+    response["circuits"] = {
+        endpoint: {"state": circuit.state, "failures": circuit.failures}
+        for endpoint, circuit in app.state.upstream_policy.stats.items()
+    }
+    if app.state.hedger is not None:
+        hedge_stats = app.state.hedger.stats
+        response["hedging"] = {
+            "requests": hedge_stats.requests,
+            "hedged": hedge_stats.hedged,
+            "hedge_wins": hedge_stats.hedge_wins,
+            "capped": hedge_stats.capped,
+            "delays": hedge_stats.delays,
+        }
+    if app.state.prewarm is not None:
+        prewarm_stats = app.state.prewarm.stats
+        response["prewarm"] = {
+            "cycles": prewarm_stats.cycles,
+            "refreshed": prewarm_stats.refreshed,
+            "shared": prewarm_stats.shared,
+            "deferred": prewarm_stats.deferred,
+            "failed": prewarm_stats.failed,
+        }
+    if app.state.live_weather is not None:
+        live_stats = app.state.live_weather.stats
+        response["live"] = {
+            "channels": live_stats.channels,
+            "subscribers": live_stats.subscribers,
+            "polls": live_stats.polls,
+            "changes": live_stats.changes,
+            "pushed": live_stats.pushed,
+            "coalesced": live_stats.coalesced,
+            "failed": live_stats.failed,
+        }
+    return response
 
 
 # Include routers
 app.include_router(geocoding_router)
 app.include_router(weather_router)
+app.include_router(metrics_router)
@@ -4,6 +4,11 @@ from .weather import (
     CurrentWeather,
     DailyForecast,
     ForecastResponse,
+    WeatherBundle,
+    Coordinates,
+    CurrentWeatherBatchRequest,
+    CurrentWeatherBatchItem,
+    CurrentWeatherBatchResponse,
 )
 
 __all__ = [
@@ -13,4 +18,9 @@ __all__ = [
     "CurrentWeather",
     "DailyForecast",
     "ForecastResponse",
+    "WeatherBundle",
+    "Coordinates",
+    "CurrentWeatherBatchRequest",
+    "CurrentWeatherBatchItem",
+    "CurrentWeatherBatchResponse",
 ]
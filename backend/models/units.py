@@ -0,0 +1,72 @@
+from models.weather import CurrentWeather, DailyForecast, ForecastResponse
+
+# Upstream data is always fetched in this unit system and converted locally
+CANONICAL_UNITS = "metric"
+
+METERS_PER_SECOND_PER_MPH = 0.44704
+KELVIN_OFFSET = 273.15
+
+_CURRENT_TEMP_FIELDS = ("temp", "feels_like", "temp_min", "temp_max")
+_DAILY_TEMP_FIELDS = ("temp_day", "temp_min", "temp_max", "temp_night", "feels_like_day")
+
+# OpenWeatherMap reports values to two decimal places
+_PRECISION = 2
+
+
+def normalize_units(units: str) -> str:
+    """Map a units parameter to metric, imperial or standard, as OpenWeatherMap does."""
+    units = units.lower()
+    return units if units in ("metric", "imperial") else "standard"
+
+
+def convert_temp(celsius: float, units: str) -> float:
+    """Convert a Celsius temperature to the given unit system."""
+    if units == "imperial":
+        return round(celsius * 9 / 5 + 32, _PRECISION)
+    if units == "standard":
+        return round(celsius + KELVIN_OFFSET, _PRECISION)
+    return celsius
+
+
+def convert_speed(meters_per_second: float, units: str) -> float:
+    """Convert a speed in m/s to the given unit system (mph for imperial)."""
+    if units == "imperial":
+        return round(meters_per_second / METERS_PER_SECOND_PER_MPH, _PRECISION)
+    return meters_per_second
+
+
+def convert_current_weather(weather: CurrentWeather, units: str) -> CurrentWeather:
+    """Convert metric current weather to the requested unit system."""
+    units = normalize_units(units)
+    if units == CANONICAL_UNITS:
+        return weather
+
+    update = {field: convert_temp(getattr(weather, field), units) for field in _CURRENT_TEMP_FIELDS}
+    update["wind_speed"] = convert_speed(weather.wind_speed, units)
+    return weather.model_copy(update=update)
+
+
+def convert_daily_forecast(daily: DailyForecast, units: str) -> DailyForecast:
+    """Convert a metric daily forecast to the requested unit system."""
+    units = normalize_units(units)
+    if units == CANONICAL_UNITS:
+        return daily
+
+    update = {field: convert_temp(getattr(daily, field), units) for field in _DAILY_TEMP_FIELDS}
+    update["wind_speed"] = convert_speed(daily.wind_speed, units)
+    return daily.model_copy(update=update)
+
+
+def convert_forecast(forecast: ForecastResponse, units: str) -> ForecastResponse:
+    """
+    Convert a metric forecast to the requested unit system.
+
+    Daily values are converted from the unrounded metric aggregates, so each
+    is rounded once rather than per 3-hour item.
+    """
+    if normalize_units(units) == CANONICAL_UNITS:
+        return forecast
+
+    return forecast.model_copy(
+        update={"daily": [convert_daily_forecast(day, units) for day in forecast.daily]}
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class WeatherCondition(BaseModel):
@@ -131,3 +131,43 @@ class ForecastResponse(BaseModel):
     lon: float
     timezone: int | None = None
     daily: list[DailyForecast]
+
+    # Identifies the upstream forecast and day count this response was built
+    # from, for HTTP validators; not serialized
+    _version: str | None = PrivateAttr(default=None)
+
+
+class WeatherBundle(BaseModel):
+    """Current weather and forecast for one location, returned together."""
+
+    current: CurrentWeather
+    forecast: ForecastResponse
+
+
+class Coordinates(BaseModel):
+    """A latitude/longitude pair."""
+
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class CurrentWeatherBatchRequest(BaseModel):
+    """Request body for batch current weather."""
+
+    locations: list[Coordinates] = Field(..., min_length=1, max_length=200)
+    units: str = "metric"
+
+
+class CurrentWeatherBatchItem(BaseModel):
+    """Result for one location in a batch: either weather or an error."""
+
+    lat: float
+    lon: float
+    weather: CurrentWeather | None = None
+    error: str | None = None
+
+
+class CurrentWeatherBatchResponse(BaseModel):
+    """Response for batch current weather, in request order."""
+
+    results: list[CurrentWeatherBatchItem]
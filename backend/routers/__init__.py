@@ -1,4 +1,5 @@
 from .geocoding import router as geocoding_router
+from .metrics import router as metrics_router
 from .weather import router as weather_router
 
-__all__ = ["geocoding_router", "weather_router"]
+__all__ = ["geocoding_router", "metrics_router", "weather_router"]
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
 from models.geocoding import GeocodingResponse
+from routers.responses import cache_control, conditional_response, entity_tag, quota_exceeded
+from services.rate_limit import RateLimitExceeded
 
 router = APIRouter(prefix="/api", tags=["geocoding"])
 
@@ -8,18 +10,28 @@ router = APIRouter(prefix="/api", tags=["geocoding"])
 @router.get("/geocode", response_model=GeocodingResponse)
 async def geocode(
     request: Request,
+    response: Response,
     q: str = Query(..., min_length=1, description="Location search query"),
     limit: int = Query(5, ge=1, le=5, description="Maximum results"),
 ) -> GeocodingResponse:
     """
     Search for locations by name.
 
-    Returns a list of matching locations with coordinates.
+    Returns a list of matching locations with coordinates. Responses carry an
+    ETag for the results and may be revalidated with If-None-Match.
     """
     geocoding_service = request.app.state.geocoding_service
 
     try:
-        results = await geocoding_service.search(q, limit=limit)
-        return GeocodingResponse(results=results)
+        results, fresh_for = await geocoding_service.search_entry(q, limit=limit)
+    except RateLimitExceeded as e:
+        raise quota_exceeded(e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Geocoding service error: {str(e)}")
+    return conditional_response(
+        request,
+        response,
+        GeocodingResponse(results=results),
+        entity_tag("geocode", *(tuple(result.model_dump().values()) for result in results)),
+        cache_control(fresh_for),
+    )
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from services.metrics import MetricFamily, render
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """
+    Expose request, upstream, cache and quota metrics for Prometheus.
+
+    Counters are cumulative since the process started; with several workers
+    each process reports its own.
+    """
+    state = request.app.state
+    families: list[MetricFamily] = []
+    if (request_metrics := getattr(state, "request_metrics", None)) is not None:
+        families += request_metrics.families()
+    if (policy := getattr(state, "upstream_policy", None)) is not None:
+        families += _upstream_families(policy)
+    families += _cache_families(state)
+    if (pool := getattr(state, "upstream_pool", None)) is not None:
+        families += _pool_families(pool.stats)
+    if (rate_limiter := getattr(state, "rate_limiter", None)) is not None:
+        families += _rate_limit_families(rate_limiter.stats)
+    if (hedger := getattr(state, "hedger", None)) is not None:
+        families += _hedge_families(hedger.stats)
+    if (prewarm := getattr(state, "prewarm", None)) is not None:
+        families += _prewarm_families(prewarm.stats)
+    if (live_weather := getattr(state, "live_weather", None)) is not None:
+        families += _live_families(live_weather.stats)
+    return PlainTextResponse(render(families), media_type=CONTENT_TYPE)
+
+
+def _upstream_families(policy) -> list[MetricFamily]:
+    latency = MetricFamily(
+        "upstream_request_duration_seconds", "histogram", "Upstream attempt latency by endpoint"
+    )
+    counters = {
+        "calls": MetricFamily("upstream_calls_total", "counter", "Upstream calls by endpoint"),
+        "retries": MetricFamily(
+            "upstream_retries_total", "counter", "Upstream attempts retried after an error"
+        ),
+        "timeouts": MetricFamily(
+            "upstream_timeouts_total", "counter", "Upstream attempts that timed out"
+        ),
+        "deadline_exceeded": MetricFamily(
+            "upstream_deadline_exceeded_total", "counter", "Upstream calls out of latency budget"
+        ),
+        "errors": MetricFamily(
+            "upstream_errors_total", "counter", "Upstream calls that failed after all attempts"
+        ),
+        "rejected": MetricFamily(
+            "upstream_circuit_rejections_total", "counter", "Calls failed fast by an open circuit"
+        ),
+    }
+    circuit_open = MetricFamily(
+        "upstream_circuit_open", "gauge", "Whether the endpoint's circuit is open (1) or not (0)"
+    )
+    for endpoint, stats in sorted(policy.call_stats.items()):
+        latency.add_histogram(stats.latency, endpoint=endpoint)
+        for name, family in counters.items():
+            family.add(getattr(stats, name), endpoint=endpoint)
+    for endpoint, circuit in sorted(policy.stats.items()):
+        circuit_open.add(int(circuit.state != "closed"), endpoint=endpoint)
+    return [latency, *counters.values(), circuit_open]
+
+
+def _cache_families(state) -> list[MetricFamily]:
+    caches = {}
+    if (weather_provider := getattr(state, "weather_provider", None)) is not None:
+        caches["weather"] = weather_provider.cache_stats
+        caches["forecast"] = weather_provider.forecast_cache_stats
+        for name, stats in weather_provider.shared_cache_stats.items():
+            caches[f"shared_{name}"] = stats
+    if (geocoding_service := getattr(state, "geocoding_service", None)) is not None:
+        caches["shared_geocode"] = geocoding_service.shared_cache_stats
+
+    hits = MetricFamily("cache_hits_total", "counter", "Fresh cache hits")
+    stale_hits = MetricFamily("cache_stale_hits_total", "counter", "Stale entries served")
+    misses = MetricFamily("cache_misses_total", "counter", "Cache misses")
+    hit_ratio = MetricFamily("cache_hit_ratio", "gauge", "Fraction of lookups served from cache")
+    for name, stats in caches.items():
+        if stats is None:
+            continue
+        hits.add(stats.hits, cache=name)
+        stale_hits.add(stats.stale_hits, cache=name)
+        misses.add(stats.misses, cache=name)
+        hit_ratio.add(round(stats.hit_ratio, 4), cache=name)
+    return [hits, stale_hits, misses, hit_ratio]
+
+
+def _pool_families(stats) -> list[MetricFamily]:
+    connections = MetricFamily(
+        "upstream_pool_connections", "gauge", "Open upstream connections by state"
+    )
+    # The transport's pool can't always be inspected; omit what isn't known
+    # rather than report zero connections
+    if stats.connections is not None:
+        connections.add(stats.active_connections, state="active")
+        connections.add(stats.idle_connections, state="idle")
+    in_flight = MetricFamily(
+        "upstream_requests_in_flight", "gauge", "Upstream requests currently in flight"
+    )
+    in_flight.add(stats.in_flight)
+    utilization = MetricFamily(
+        "upstream_pool_utilization", "gauge", "Fraction of the connection limit in use"
+    )
+    if stats.utilization is not None:
+        utilization.add(round(stats.utilization, 4))
+    return [connections, in_flight, utilization]
+
+
+def _rate_limit_families(stats) -> list[MetricFamily]:
+    remaining = MetricFamily(
+        "upstream_rate_limit_remaining", "gauge", "Upstream calls left in each budget"
+    )
+    if stats.minute_remaining is not None:
+        remaining.add(stats.minute_remaining, window="minute")
+    if stats.day_remaining is not None:
+        remaining.add(stats.day_remaining, window="day")
+    outcomes = MetricFamily(
+        "upstream_rate_limit_total", "counter", "Rate limiter decisions by outcome"
+    )
+    for outcome in ("granted", "waited", "throttled", "dropped"):
+        outcomes.add(getattr(stats, outcome), outcome=outcome)
+    return [remaining, outcomes]
+
+
+def _hedge_families(stats) -> list[MetricFamily]:
+    hedges = MetricFamily("upstream_hedges_total", "counter", "Hedging decisions by outcome")
+    hedges.add(stats.hedged, outcome="sent")
+    hedges.add(stats.hedge_wins, outcome="won")
+    hedges.add(stats.capped, outcome="capped")
+    return [hedges]
+
+
+def _prewarm_families(stats) -> list[MetricFamily]:
+    refreshes = MetricFamily(
+        "prewarm_refreshes_total", "counter", "Background refreshes of popular entries by outcome"
+    )
+    refreshes.add(stats.refreshed, outcome="refreshed")
+    refreshes.add(stats.shared, outcome="shared")
+    refreshes.add(stats.deferred, outcome="deferred")
+    refreshes.add(stats.failed, outcome="failed")
+    return [refreshes]
+
+
+def _live_families(stats) -> list[MetricFamily]:
+    subscribers = MetricFamily("live_subscribers", "gauge", "Open live weather streams")
+    subscribers.add(stats.subscribers)
+    channels = MetricFamily("live_channels", "gauge", "Locations polled for live streams")
+    channels.add(stats.channels)
+    polls = MetricFamily("live_polls_total", "counter", "Live weather polls by outcome")
+    polls.add(stats.polls - stats.changes - stats.failed, outcome="unchanged")
+    polls.add(stats.changes, outcome="changed")
+    polls.add(stats.failed, outcome="failed")
+    pushes = MetricFamily(
+        "live_pushes_total", "counter", "Observations handed to live subscribers by outcome"
+    )
+    pushes.add(stats.pushed - stats.coalesced, outcome="delivered")
+    pushes.add(stats.coalesced, outcome="coalesced")
+    return [subscribers, channels, polls, pushes]
@@ -0,0 +1,241 @@
+import hashlib
+import math
+import types
+import typing
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel
+
+from config import settings
+from models.weather import CurrentWeather, ForecastResponse
+from services.rate_limit import RateLimitExceeded
+from services.timing import mark_handler_returned
+
+# Bumped when response models change shape, so old ETags stop matching
+ETAG_SCHEMA = "1"
+
+
+class ModelJSONResponse(Response):
+    """JSON response serialized straight from a Pydantic model by pydantic-core."""
+
+    media_type = "application/json"
+
+    def __init__(self, content: BaseModel, include: dict | None = None, **kwargs):
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.model_dump_json(include=self.include).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Fields selected with `fields=`, as a pydantic include spec."""
+
+    include: dict
+    # Canonical form of the selection, for ETags
+    key: str
+
+
+def _nested_model(annotation) -> tuple[type[BaseModel] | None, bool]:
+    """The model inside a field annotation (through Optional and list), and whether it is a list."""
+    is_list = False
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin in (typing.Union, types.UnionType):
+            args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+            if len(args) != 1:
+                return None, is_list
+            annotation = args[0]
+        elif origin is list:
+            is_list = True
+            annotation = typing.get_args(annotation)[0]
+        else:
+            break
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list
+    return None, is_list
+
+
+def _select(include: dict, model: type[BaseModel], parts: list[str], path: str) -> None:
+    name, rest = parts[0], parts[1:]
+    field = model.model_fields.get(name)
+    if field is None:
+        raise ValueError(f"Unknown field '{path}'")
+    if not rest:
+        include[name] = True
+        return
+    nested, is_list = _nested_model(field.annotation)
+    if nested is None:
+        raise ValueError(f"Field '{'.'.join(path.split('.')[: -len(rest)])}' has no subfields")
+    selected = include.setdefault(name, {})
+    if selected is True:
+        return
+    if is_list:
+        selected = selected.setdefault("__all__", {})
+    _select(selected, nested, rest, path)
+
+
+@lru_cache(maxsize=256)
+def parse_fields(model: type[BaseModel], fields: str) -> Projection:
+    """
+    Parse a comma-separated list of dotted field paths against a model.
+
+    Paths go through nested models and lists, e.g. `daily.temp_max` selects
+    `temp_max` in every daily forecast.
+
+    Raises:
+        ValueError: If a path doesn't name a field of the model
+    """
+    paths = sorted({path.strip() for path in fields.split(",") if path.strip()})
+    if not paths:
+        raise ValueError("No fields selected")
+    include: dict = {}
+    for path in paths:
+        _select(include, model, path.split("."), path)
+    return Projection(include, ",".join(paths))
+
+
+class FieldSelection:
+    """Dependency parsing the `fields` query parameter for a response model."""
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+
+    def __call__(
+        self,
+        fields: str | None = Query(
+            None,
+            description="Comma-separated fields to return, dotted for nested fields "
+            "(e.g. daily.date,daily.temp_max); all fields if omitted",
+        ),
+    ) -> Projection | None:
+        if fields is None:
+            return None
+        try:
+            return parse_fields(self.model, fields)
+        except ValueError as e:
+            # Reported like FastAPI's own query validation errors
+            raise RequestValidationError(
+                [{"type": "value_error", "loc": ("query", "fields"), "msg": str(e), "input": fields}]
+            )
+
+
+def model_response(model: BaseModel, fields: Projection | None = None) -> BaseModel | Response:
+    """
+    Return a model from an endpoint, optionally skipping FastAPI's re-processing.
+
+    Returning a model normally makes FastAPI validate it against the route's
+    `response_model`, convert it to Python objects and encode those with the
+    stdlib `json` module. With `FAST_JSON_RESPONSES` enabled the model, which
+    the services already built and validated, is serialized to bytes in one
+    step instead. The route's `response_model` still documents the schema.
+    Responses projected to selected fields always take the direct path, as
+    they no longer match the `response_model`. Serialization time is
+    reported in the Server-Timing header either way.
+    """
+    mark_handler_returned()
+    if fields is not None:
+        return ModelJSONResponse(model, include=fields.include)
+    if settings.fast_json_responses:
+        return ModelJSONResponse(model)
+    return model
+
+
+def entity_tag(*parts: object) -> str:
+    """
+    ETag for the representation identified by parts.
+
+    The tag is weak: it identifies the content, which is the same whether
+    the body is sent as is or compressed, so 200 and 304 responses carry
+    the same tag however the client negotiates encoding.
+    """
+    key = "\x1f".join(str(part) for part in (ETAG_SCHEMA, *parts))
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+def current_version(weather: CurrentWeather) -> tuple:
+    """Identify a current-weather observation without serializing it."""
+    return (weather.location_name, weather.lat, weather.lon, weather.timestamp.timestamp())
+
+
+def forecast_version(forecast: ForecastResponse) -> str:
+    """Identify a forecast by the upstream payload it was built from."""
+    if forecast._version is not None:
+        return forecast._version
+    # Built elsewhere than ForecastSeries: fall back to its content
+    return hashlib.blake2b(forecast.model_dump_json().encode(), digest_size=12).hexdigest()
+
+
+def cache_control(ttl: float, stale_while_revalidate: float = 0.0) -> str:
+    """
+    Cache-Control value letting clients and CDNs reuse a response as long as the server would.
+
+    Args:
+        ttl: Seconds the response stays fresh, i.e. what is left of the
+            server's own cache entry rather than the full cache TTL
+        stale_while_revalidate: Seconds a stale response may still be used
+            while it is refreshed
+    """
+    if ttl <= 0:
+        return "no-cache"
+    value = f"public, max-age={int(ttl)}"
+    if stale_while_revalidate > 0:
+        value += f", stale-while-revalidate={int(stale_while_revalidate)}"
+    return value
+
+
+def quota_exceeded(error: RateLimitExceeded) -> HTTPException:
+    """503 for a request refused by our own upstream budget, with when to retry."""
+    retry_after = error.retry_after if error.retry_after is not None else 60
+    return HTTPException(
+        status_code=503,
+        detail="Upstream request budget exhausted, retry later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches etag, using weak comparison."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    model: BaseModel,
+    etag: str,
+    cache_control: str,
+    fields: Projection | None = None,
+) -> BaseModel | Response:
+    """
+    Return a model with validators and caching headers, or a bare 304.
+
+    The client's If-None-Match is checked before the model is serialized,
+    so a revalidation that matches costs no serialization.
+
+    Args:
+        request: Incoming request
+        response: The endpoint's injected response, for headers on the model
+        model: Response body
+        etag: ETag identifying the body (see `entity_tag`)
+        cache_control: Cache-Control header value
+        fields: Fields to project the body to; the ETag then covers them too
+    """
+    if fields is not None:
+        etag = entity_tag(etag, fields.key)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        mark_handler_returned()
+        return Response(status_code=304, headers=headers)
+    result = model_response(model, fields)
+    (result if isinstance(result, Response) else response).headers.update(headers)
+    return result
@@ -1,6 +1,32 @@
-from fastapi import APIRouter, HTTPException, Query, Request
+import asyncio
 
-from models.weather import CurrentWeather, ForecastResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from config import settings
+from models.units import normalize_units
+from models.weather import (
+    CurrentWeather,
+    CurrentWeatherBatchItem,
+    CurrentWeatherBatchRequest,
+    CurrentWeatherBatchResponse,
+    ForecastResponse,
+    WeatherBundle,
+)
+from routers.responses import (
+    FieldSelection,
+    Projection,
+    cache_control,
+    conditional_response,
+    current_version,
+    entity_tag,
+    forecast_version,
+    model_response,
+    quota_exceeded,
+)
+from services.live import Subscription, TooManySubscribers
+from services.rate_limit import RateLimitExceeded
 
 router = APIRouter(prefix="/api/weather", tags=["weather"])
 
@@ -8,39 +34,195 @@ router = APIRouter(prefix="/api/weather", tags=["weather"])
 @router.get("/current", response_model=CurrentWeather)
 async def get_current_weather(
     request: Request,
+    response: Response,
     lat: float = Query(..., ge=-90, le=90, description="Latitude"),
     lon: float = Query(..., ge=-180, le=180, description="Longitude"),
     units: str = Query("metric", description="Units: metric, imperial, standard"),
+    fields: Projection | None = Depends(FieldSelection(CurrentWeather)),
 ) -> CurrentWeather:
     """
     Get current weather for a location.
 
-    Returns temperature, humidity, wind, and weather conditions.
+    Returns temperature, humidity, wind, and weather conditions. Responses
+    carry an ETag for the upstream observation and may be revalidated with
+    If-None-Match.
     """
     weather_provider = request.app.state.weather_provider
 
     try:
-        return await weather_provider.get_current(lat, lon, units=units)
+        weather = await weather_provider.get_current(lat, lon, units=units)
+    except RateLimitExceeded as e:
+        raise quota_exceeded(e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Weather service error: {str(e)}")
+    return conditional_response(
+        request,
+        response,
+        weather,
+        entity_tag("current", *current_version(weather), normalize_units(units)),
+        cache_control(
+            weather_provider.fresh_for("current", lat, lon),
+            settings.weather_cache_stale_while_revalidate,
+        ),
+        fields=fields,
+    )
+
+
+@router.post("/current:batch", response_model=CurrentWeatherBatchResponse)
+async def get_current_weather_batch(
+    request: Request,
+    body: CurrentWeatherBatchRequest,
+    fields: Projection | None = Depends(FieldSelection(CurrentWeatherBatchResponse)),
+) -> CurrentWeatherBatchResponse:
+    """
+    Get current weather for up to 200 locations.
+
+    Each result carries either the weather or an error, so one failing
+    location doesn't fail the whole batch.
+    """
+    weather_provider = request.app.state.weather_provider
+
+    locations = [(loc.lat, loc.lon) for loc in body.locations]
+    results = await weather_provider.get_current_many(locations, units=body.units)
+    response = CurrentWeatherBatchResponse(
+        results=[
+            CurrentWeatherBatchItem(lat=lat, lon=lon, error=f"Weather service error: {result}")
+            if isinstance(result, Exception)
+            else CurrentWeatherBatchItem(lat=lat, lon=lon, weather=result)
+            for (lat, lon), result in zip(locations, results)
+        ]
+    )
+    return model_response(response, fields)
 
 
 @router.get("/forecast", response_model=ForecastResponse)
 async def get_forecast(
     request: Request,
+    response: Response,
     lat: float = Query(..., ge=-90, le=90, description="Latitude"),
     lon: float = Query(..., ge=-180, le=180, description="Longitude"),
     days: int = Query(5, ge=1, le=5, description="Number of days"),
     units: str = Query("metric", description="Units: metric, imperial, standard"),
+    fields: Projection | None = Depends(FieldSelection(ForecastResponse)),
 ) -> ForecastResponse:
     """
     Get weather forecast for a location.
 
-    Returns daily forecasts for the specified number of days.
+    Returns daily forecasts for the specified number of days. Responses carry
+    an ETag for the upstream forecast and may be revalidated with
+    If-None-Match.
     """
     weather_provider = request.app.state.weather_provider
 
     try:
-        return await weather_provider.get_forecast(lat, lon, days=days, units=units)
+        forecast = await weather_provider.get_forecast(lat, lon, days=days, units=units)
+    except RateLimitExceeded as e:
+        raise quota_exceeded(e)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Weather service error: {str(e)}")
+    return conditional_response(
+        request,
+        response,
+        forecast,
+        entity_tag("forecast", forecast_version(forecast), normalize_units(units)),
+        cache_control(
+            weather_provider.fresh_for("forecast", lat, lon),
+            settings.weather_cache_stale_while_revalidate,
+        ),
+        fields=fields,
+    )
+
+
+@router.get("/bundle", response_model=WeatherBundle)
+async def get_weather_bundle(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    days: int = Query(5, ge=1, le=5, description="Number of forecast days"),
+    units: str = Query("metric", description="Units: metric, imperial, standard"),
+    fields: Projection | None = Depends(FieldSelection(WeatherBundle)),
+) -> WeatherBundle:
+    """
+    Get current weather and forecast for a location in one request.
+
+    Both upstream fetches run concurrently. Responses carry an ETag and may
+    be revalidated with If-None-Match.
+    """
+    weather_provider = request.app.state.weather_provider
+
+    try:
+        current, forecast = await asyncio.gather(
+            weather_provider.get_current(lat, lon, units=units),
+            weather_provider.get_forecast(lat, lon, days=days, units=units),
+        )
+    except RateLimitExceeded as e:
+        raise quota_exceeded(e)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Weather service error: {str(e)}")
+    return conditional_response(
+        request,
+        response,
+        WeatherBundle(current=current, forecast=forecast),
+        entity_tag(
+            "bundle",
+            *current_version(current),
+            forecast_version(forecast),
+            normalize_units(units),
+        ),
+        cache_control(
+            min(
+                weather_provider.fresh_for("current", lat, lon),
+                weather_provider.fresh_for("forecast", lat, lon),
+            ),
+            settings.weather_cache_stale_while_revalidate,
+        ),
+        fields=fields,
+    )
+
+
+@router.get("/live", response_class=StreamingResponse, include_in_schema=False)
+async def stream_current_weather(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    units: str = Query("metric", description="Units: metric, imperial, standard"),
+    fields: Projection | None = Depends(FieldSelection(CurrentWeather)),
+) -> StreamingResponse:
+    """
+    Stream current weather for a location as server-sent events.
+
+    Sends the latest observation on connect and then each changed one as a
+    `current` event. All clients of a location share one upstream poll, and
+    a client that falls behind only gets the newest observation.
+    """
+    live_weather = getattr(request.app.state, "live_weather", None)
+    if live_weather is None:
+        raise HTTPException(status_code=404, detail="Live weather is disabled")
+    try:
+        subscription = live_weather.subscribe(lat, lon, units=units)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live weather subscribers",
+            headers={"Retry-After": str(round(settings.live_poll_interval))},
+        )
+    return StreamingResponse(
+        _live_events(subscription, fields),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs however the stream ends, even if it never started
+        background=BackgroundTask(live_weather.unsubscribe, subscription),
+    )
+
+
+async def _live_events(subscription: Subscription, fields: Projection | None):
+    include = fields.include if fields is not None else None
+    while True:
+        weather = await subscription.next(timeout=settings.live_heartbeat)
+        if subscription.closed:
+            return
+        if weather is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: current\ndata: {weather.model_dump_json(include=include)}\n\n"
@@ -1,4 +1,35 @@
+from .cache import TTLCache
+from .gazetteer import Gazetteer
 from .geocoding import GeocodingService
+from .hedging import Hedger
+from .http_pool import UpstreamPool
+from .live import LiveWeatherHub, TooManySubscribers
+from .prefix_cache import PrefixCache
+from .prewarm import PopularityTracker, PrewarmScheduler
+from .rate_limit import RateLimiter
+from .recording import ReplayTransport, TrafficArchive, load_archive
+from .resilience import UpstreamPolicy
+from .shared_cache import CacheBackend, SharedCache, open_backend
 from .weather_provider import WeatherProvider
 
-__all__ = ["GeocodingService", "WeatherProvider"]
+__all__ = [
+    "CacheBackend",
+    "Gazetteer",
+    "GeocodingService",
+    "Hedger",
+    "LiveWeatherHub",
+    "PopularityTracker",
+    "PrefixCache",
+    "PrewarmScheduler",
+    "RateLimiter",
+    "ReplayTransport",
+    "SharedCache",
+    "TTLCache",
+    "TooManySubscribers",
+    "TrafficArchive",
+    "UpstreamPolicy",
+    "UpstreamPool",
+    "WeatherProvider",
+    "load_archive",
+    "open_backend",
+]
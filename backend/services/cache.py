@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+
+def snap_coords(lat: float, lon: float, grid: float) -> tuple[float, float]:
+    """
+    Snap coordinates to the center of a fixed-size grid cell.
+
+    Near-identical coordinates (e.g. two users in the same neighbourhood)
+    map to the same cell, so they can share one cache entry.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        grid: Cell size in degrees (e.g. 0.01 is roughly 1 km)
+
+    Returns:
+        Tuple of (lat, lon) snapped to the grid
+    """
+    if grid <= 0:
+        return lat, lon
+    # Round away float noise so every point in a cell yields the same key.
+    return (
+        round(round(lat / grid) * grid, 10),
+        round(round(lon / grid) * grid, 10),
+    )
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+
+class TTLCache:
+    """
+    In-process cache with per-entry expiry and LRU eviction.
+
+    Entries are fresh for `ttl` seconds, then kept for a further `stale_ttl`
+    seconds so callers can choose to serve them stale (see `get_entry`).
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._stats = CacheStats()
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value for key, or None if missing or expired."""
+        entry = self._lookup(key)
+        if entry is None or entry[1] >= 0:
+            self._stats.misses += 1
+            return None
+
+        self._stats.hits += 1
+        return entry[0]
+
+    def get_entry(self, key: Hashable) -> tuple[Any, float] | None:
+        """
+        Return the cached value for key along with its staleness.
+
+        Returns:
+            Tuple of (value, seconds since expiry), where a negative
+            staleness means the entry is still fresh; None if missing or
+            past the stale window
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            self._stats.misses += 1
+        elif entry[1] >= 0:
+            self._stats.stale_hits += 1
+        else:
+            self._stats.hits += 1
+        return entry
+
+    def expires_in(self, key: Hashable) -> float | None:
+        """
+        Seconds until key's entry expires, without counting a lookup.
+
+        Returns:
+            Seconds left (negative once stale), or None if missing or past
+            the stale window
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_in = entry[0] - self._clock()
+        return expires_in if -expires_in < self.stale_ttl else None
+
+    def _lookup(self, key: Hashable) -> tuple[Any, float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        stale_for = self._clock() - expires_at
+        if stale_for >= self.stale_ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value, stale_for
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store value under key, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds the entry is fresh, if not the cache's `ttl` (e.g.
+                the time left on an entry copied from another cache)
+        """
+        self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            stale_hits=self._stats.stale_hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            size=len(self._entries),
+        )
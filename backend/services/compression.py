@@ -0,0 +1,149 @@
+"""
+Negotiated response compression: brotli when the optional `brotli` package
+is installed and the client accepts it, gzip otherwise.
+
+Only complete JSON and text bodies of at least `minimum_size` bytes are
+compressed, and every such response, compressed or not, says it varies by
+`Accept-Encoding`. Streamed responses (e.g. server-sent events) pass
+through untouched as soon as they start.
+"""
+
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.timing import phase
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    brotli = None
+
+HAVE_BROTLI = brotli is not None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str, available: tuple[str, ...]) -> str | None:
+    """
+    Pick the content coding to use from an Accept-Encoding header.
+
+    Codings are ranked by their q-value; on a tie the earlier entry of
+    `available` wins. `*` stands for any available coding not listed.
+
+    Returns:
+        A coding from `available`, or None to send the body as is
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies the client can decode."""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        """
+        Args:
+            app: ASGI application
+            minimum_size: Smallest body worth compressing, in bytes
+            gzip_level: gzip compression level (1-9)
+            brotli_quality: brotli quality (0-11); low values suit dynamic content
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if HAVE_BROTLI else ("gzip",)
+
+    def negotiable(self, status: int, headers: MutableHeaders) -> bool:
+        """Whether the response's body is sent compressed to clients that accept it."""
+        if status == 304:
+            # Carries the Vary of the 200 it stands in for
+            return True
+        return (
+            # Without a length the body is streamed, and not held to compress
+            "content-length" in headers
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if not self.negotiable(message["status"], headers):
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if (
+                    encoding is None
+                    or message["status"] == 304
+                    or int(headers["content-length"]) < self.minimum_size
+                ):
+                    await send(message)
+                    return
+                # Held until the compressed body's length is known
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            # e.g. sent in several parts, or no body for a HEAD request
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            with phase("compress"):
+                body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            # The compressed bytes differ, so a strong validator becomes weak
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+
+from models.weather import DailyForecast, WeatherCondition
+
+SECONDS_PER_DAY = 86400
+
+
+class _DayAccumulator:
+    """Running per-day statistics over 3-hour forecast items."""
+
+    __slots__ = (
+        "count",
+        "temp_sum",
+        "temp_min",
+        "temp_max",
+        "temp_last",
+        "feels_like_sum",
+        "humidity_sum",
+        "wind_speed_sum",
+        "wind_deg_sum",
+        "clouds_sum",
+        "pop_max",
+        "rain_sum",
+        "snow_sum",
+        "weathers",
+    )
+
+    def __init__(self, temp: float):
+        self.count = 0
+        self.temp_sum = 0
+        self.temp_min = temp
+        self.temp_max = temp
+        self.temp_last = temp
+        self.feels_like_sum = 0
+        self.humidity_sum = 0
+        self.wind_speed_sum = 0
+        self.wind_deg_sum = 0
+        self.clouds_sum = 0
+        self.pop_max = None
+        self.rain_sum = 0
+        self.snow_sum = 0
+        self.weathers: list[dict] = []
+
+
+def aggregate_daily(items: list[dict], tz_offset: int) -> list[DailyForecast]:
+    """
+    Aggregate 3-hour forecast items into daily forecasts in one pass.
+
+    Items are grouped by local day index, `(dt + tz_offset) // 86400`, and
+    every statistic is accumulated as the item is visited. The output is
+    identical to grouping by local date string and calling
+    `DailyForecast.from_openweathermap_3h` for each day.
+
+    Args:
+        items: The "list" array of the 5-day/3-hour forecast payload
+        tz_offset: Location UTC offset in seconds
+
+    Returns:
+        Daily forecasts in date order
+    """
+    days: dict[int, _DayAccumulator] = {}
+
+    for item in items:
+        main = item["main"]
+        wind = item["wind"]
+        temp = main["temp"]
+
+        day = (item["dt"] + tz_offset) // SECONDS_PER_DAY
+        acc = days.get(day)
+        if acc is None:
+            acc = days[day] = _DayAccumulator(temp)
+
+        acc.count += 1
+        acc.temp_sum += temp
+        if temp < acc.temp_min:
+            acc.temp_min = temp
+        if temp > acc.temp_max:
+            acc.temp_max = temp
+        acc.temp_last = temp
+        acc.feels_like_sum += main["feels_like"]
+        acc.humidity_sum += main["humidity"]
+        acc.wind_speed_sum += wind["speed"]
+        acc.wind_deg_sum += wind.get("deg", 0)
+        acc.clouds_sum += item["clouds"]["all"]
+        pop = item.get("pop", 0)
+        if acc.pop_max is None or pop > acc.pop_max:
+            acc.pop_max = pop
+        if "rain" in item:
+            acc.rain_sum += item["rain"].get("3h", 0)
+        if "snow" in item:
+            acc.snow_sum += item["snow"].get("3h", 0)
+        acc.weathers.append(item["weather"][0])
+
+    location_tz = timezone(timedelta(seconds=tz_offset))
+    daily_forecasts: list[DailyForecast] = []
+    for day in sorted(days):
+        acc = days[day]
+        count = acc.count
+        # Midday item for condition
+        weather = acc.weathers[count // 2]
+        daily_forecasts.append(
+            DailyForecast(
+                date=datetime.fromtimestamp(day * SECONDS_PER_DAY - tz_offset, tz=location_tz),
+                temp_day=acc.temp_sum / count,
+                temp_min=acc.temp_min,
+                temp_max=acc.temp_max,
+                temp_night=acc.temp_last,
+                feels_like_day=acc.feels_like_sum / count,
+                humidity=int(acc.humidity_sum / count),
+                wind_speed=acc.wind_speed_sum / count,
+                wind_deg=int(acc.wind_deg_sum / count),
+                clouds=int(acc.clouds_sum / count),
+                pop=acc.pop_max,
+                rain=acc.rain_sum if acc.rain_sum else None,
+                snow=acc.snow_sum if acc.snow_sum else None,
+                condition=WeatherCondition(
+                    id=weather["id"],
+                    main=weather["main"],
+                    description=weather["description"],
+                    icon=weather["icon"],
+                ),
+            )
+        )
+    return daily_forecasts
@@ -0,0 +1,422 @@
+"""
+Offline gazetteer backed by a memory-mapped, sorted prefix index.
+
+The index is built once from a GeoNames-style cities file
+(https://download.geonames.org/export/dump/, e.g. ``cities15000.txt``) and
+optionally an ``admin1CodesASCII.txt`` file for state names. Lookups binary
+search the mapped key table, so a query costs a few microseconds and no
+network round trip. Prefixes shared by too many keys to scan per query
+(e.g. one or two letters) are answered from their most populous cities,
+ranked when the index is built.
+
+Build an index from the command line with:
+
+    python -m services.gazetteer cities15000.txt gazetteer.idx --admin1 admin1CodesASCII.txt
+"""
+
+import argparse
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import unicodedata
+from pathlib import Path
+
+from models.geocoding import GeoLocation
+
+MAGIC = b"GZT2"
+
+# magic, record count, key count, key table offset, string blob offset,
+# ranked prefix count, ranked prefix table offset, ranked record ids offset,
+# max keys scanned per query
+_HEADER = struct.Struct("<4sIIQQIQQI")
+# lat, lon, population, name offset/len, state offset/len, country code
+_RECORD = struct.Struct("<ddIIHIH2s")
+# key offset/len, record index
+_KEY = struct.Struct("<IHI")
+# prefix offset/len, first ranked record id, ranked record count
+_RANKED = struct.Struct("<IHIH")
+_RECORD_ID = struct.Struct("<I")
+
+# GeoNames cities file columns
+_COL_NAME = 1
+_COL_ASCII_NAME = 2
+_COL_ALTERNATE_NAMES = 3
+_COL_LAT = 4
+_COL_LON = 5
+_COL_COUNTRY = 8
+_COL_ADMIN1 = 10
+_COL_POPULATION = 14
+
+
+def normalize(text: str) -> str:
+    """Fold case, strip accents and collapse whitespace for index lookups."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _load_admin1(path: Path) -> dict[str, str]:
+    names: dict[str, str] = {}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) >= 2:
+                names[cols[0]] = cols[1]
+    return names
+
+
+def _ranked_prefixes(
+    keys: list[tuple[bytes, int]], populations: list[int], max_scan: int, top_k: int
+) -> list[tuple[bytes, list[int]]]:
+    """
+    The most populous records for every prefix shared by more than max_scan keys.
+
+    Groups of sorted keys sharing a prefix are split one byte further until
+    they are small enough to scan, so every prefix too broad to scan is
+    listed, in key order.
+    """
+    ranked = []
+    groups = [(1, 0, len(keys))]
+    while groups:
+        depth, lo, hi = groups.pop()
+        start = lo
+        while start < hi:
+            prefix = keys[start][0][:depth]
+            end = start
+            while end < hi and keys[end][0][:depth] == prefix:
+                end += 1
+            # Keys shorter than depth are their own group and never need splitting
+            if end - start > max_scan and len(prefix) == depth:
+                records = {record_index for _, record_index in keys[start:end]}
+                ranked.append(
+                    (prefix, heapq.nlargest(top_k, records, key=populations.__getitem__))
+                )
+                groups.append((depth + 1, start, end))
+            start = end
+    ranked.sort()
+    return ranked
+
+
+def build_index(
+    cities_path: str | Path,
+    index_path: str | Path,
+    admin1_path: str | Path | None = None,
+    include_alternate_names: bool = True,
+    max_prefix_scan: int = 5000,
+    ranked_top_k: int = 32,
+) -> int:
+    """
+    Build a gazetteer index file from a GeoNames-style cities file.
+
+    Args:
+        cities_path: Tab-separated GeoNames cities file
+        index_path: Destination for the binary index
+        admin1_path: Optional GeoNames admin1 codes file for state names
+        include_alternate_names: Also index the alternate names column
+        max_prefix_scan: Most keys a lookup scans; broader prefixes are
+            answered from their most populous cities instead
+        ranked_top_k: Cities kept for each prefix broader than max_prefix_scan
+
+    Returns:
+        Number of cities indexed
+    """
+    admin1 = _load_admin1(Path(admin1_path)) if admin1_path else {}
+
+    strings = bytearray()
+    string_offsets: dict[str, tuple[int, int]] = {}
+
+    def intern(value: str) -> tuple[int, int]:
+        if value not in string_offsets:
+            encoded = value.encode("utf-8")[:0xFFFF]
+            string_offsets[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[value]
+
+    records = bytearray()
+    populations: list[int] = []
+    keys: list[tuple[bytes, int]] = []
+    count = 0
+
+    with Path(cities_path).open(encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= _COL_POPULATION:
+                continue
+
+            name = cols[_COL_NAME]
+            country = cols[_COL_COUNTRY]
+            state = admin1.get(f"{country}.{cols[_COL_ADMIN1]}", "")
+            name_ref = intern(name)
+            state_ref = intern(state)
+            population = min(int(cols[_COL_POPULATION] or 0), 0xFFFFFFFF)
+            populations.append(population)
+            records.extend(
+                _RECORD.pack(
+                    float(cols[_COL_LAT]),
+                    float(cols[_COL_LON]),
+                    population,
+                    *name_ref,
+                    *state_ref,
+                    country.encode("ascii", "replace")[:2].ljust(2),
+                )
+            )
+
+            names = {name, cols[_COL_ASCII_NAME]}
+            if include_alternate_names and cols[_COL_ALTERNATE_NAMES]:
+                names.update(cols[_COL_ALTERNATE_NAMES].split(","))
+            for key in {normalize(n) for n in names if n}:
+                keys.append((key.encode("utf-8"), count))
+            count += 1
+
+    keys = sorted((key[:0xFFFF], record_index) for key, record_index in keys)
+    key_table = bytearray()
+    for key, record_index in keys:
+        key_table.extend(_KEY.pack(len(strings), len(key), record_index))
+        strings.extend(key)
+
+    ranked = _ranked_prefixes(keys, populations, max_prefix_scan, ranked_top_k)
+    ranked_table = bytearray()
+    record_ids = bytearray()
+    for prefix, record_indexes in ranked:
+        ranked_table.extend(
+            _RANKED.pack(
+                len(strings), len(prefix), len(record_ids) // _RECORD_ID.size, len(record_indexes)
+            )
+        )
+        strings.extend(prefix)
+        for record_index in record_indexes:
+            record_ids.extend(_RECORD_ID.pack(record_index))
+
+    keys_offset = _HEADER.size + len(records)
+    ranked_offset = keys_offset + len(key_table)
+    record_ids_offset = ranked_offset + len(ranked_table)
+    strings_offset = record_ids_offset + len(record_ids)
+    # Written beside the destination and renamed into place, so workers that
+    # have the old index mapped keep reading it rather than a truncated file
+    index_path = Path(index_path)
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(
+                _HEADER.pack(
+                    MAGIC,
+                    count,
+                    len(keys),
+                    keys_offset,
+                    strings_offset,
+                    len(ranked),
+                    ranked_offset,
+                    record_ids_offset,
+                    max_prefix_scan,
+                )
+            )
+            f.write(records)
+            f.write(key_table)
+            f.write(ranked_table)
+            f.write(record_ids)
+            f.write(strings)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return count
+
+
+class _SortedView:
+    """Sequence view over a sorted table in the index, for use with bisect."""
+
+    def __init__(self, length: int, get):
+        self._length = length
+        self._get = get
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._get(index)[0]
+
+
+class Gazetteer:
+    """Read-only city lookup over a memory-mapped index file."""
+
+    def __init__(self, index_path: str | Path):
+        self._file = Path(index_path).open("rb")
+        try:
+            # Raises ValueError for an empty file
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        if self._mm[: len(MAGIC)] != MAGIC or len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Not a gazetteer index: {index_path}")
+        (
+            _,
+            self._n_records,
+            self._n_keys,
+            self._keys_offset,
+            self._strings_offset,
+            self._n_ranked,
+            self._ranked_offset,
+            self._record_ids_offset,
+            # Prefixes with more keys than this are answered from the ranked table
+            self.max_prefix_scan,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        self._keys = _SortedView(self._n_keys, self._key)
+        self._ranked = _SortedView(self._n_ranked, self._ranked_prefix)
+
+    @classmethod
+    def load(
+        cls,
+        cities_path: str | Path,
+        index_path: str | Path,
+        admin1_path: str | Path | None = None,
+    ) -> "Gazetteer":
+        """Open index_path, (re)building it first if it is missing or older than the sources."""
+        index = Path(index_path)
+        sources = [Path(cities_path)] + ([Path(admin1_path)] if admin1_path else [])
+        if not index.exists() or any(
+            s.stat().st_mtime > index.stat().st_mtime for s in sources
+        ):
+            build_index(cities_path, index, admin1_path)
+            return cls(index)
+        try:
+            return cls(index)
+        except ValueError:
+            # Built by an older version of this module
+            build_index(cities_path, index, admin1_path)
+            return cls(index)
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self._n_records
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._mm[start : start + length].decode("utf-8")
+
+    def _key(self, index: int) -> tuple[bytes, int]:
+        offset, length, record_index = _KEY.unpack_from(
+            self._mm, self._keys_offset + index * _KEY.size
+        )
+        start = self._strings_offset + offset
+        return self._mm[start : start + length], record_index
+
+    def _ranked_prefix(self, index: int) -> tuple[bytes, list[int]]:
+        offset, length, first, count = _RANKED.unpack_from(
+            self._mm, self._ranked_offset + index * _RANKED.size
+        )
+        start = self._strings_offset + offset
+        ids = self._record_ids_offset + first * _RECORD_ID.size
+        record_ids = self._mm[ids : ids + count * _RECORD_ID.size]
+        return self._mm[start : start + length], [i for (i,) in _RECORD_ID.iter_unpack(record_ids)]
+
+    def _record(self, index: int) -> tuple[float, float, int, str, str, str]:
+        lat, lon, population, name_off, name_len, state_off, state_len, country = (
+            _RECORD.unpack_from(self._mm, _HEADER.size + index * _RECORD.size)
+        )
+        return (
+            lat,
+            lon,
+            population,
+            self._string(name_off, name_len),
+            self._string(state_off, state_len),
+            country.decode("ascii").strip(),
+        )
+
+    def search(self, query: str, limit: int = 5) -> list[GeoLocation]:
+        """
+        Find cities whose name starts with the query.
+
+        Accepts OpenWeatherMap-style queries ("Paris", "Paris,FR",
+        "Paris,Texas,US"): the first part is matched as a name prefix and any
+        further parts must match the state or country code.
+
+        Args:
+            query: Location name or prefix to search for
+            limit: Maximum number of results
+
+        Returns:
+            Matches ranked by exact name match, then population; empty if
+            there are none, or if a prefix too broad to scan has fewer
+            ranked matches than requested, as more may exist
+        """
+        name, *qualifiers = [normalize(part) for part in query.split(",")]
+        qualifiers = [q for q in qualifiers if q]
+        if not name:
+            return []
+
+        prefix = name.encode("utf-8")
+        start = bisect.bisect_left(self._keys, prefix)
+        # Keys are UTF-8, which never contains 0xFF, so this sorts after every extension
+        end = bisect.bisect_left(self._keys, prefix + b"\xff", lo=start)
+        broad = end - start > self.max_prefix_scan
+
+        # record index -> whether any of its names matched exactly
+        matches: dict[int, bool] = {}
+        if broad:
+            # Exact keys sort first in the range; the rest come from the
+            # prefix's most populous cities, ranked at build time
+            for i in range(start, bisect.bisect_right(self._keys, prefix, lo=start)):
+                matches[self._key(i)[1]] = True
+            ranked = bisect.bisect_left(self._ranked, prefix)
+            if ranked == self._n_ranked or self._ranked[ranked] != prefix:
+                return []
+            for record_index in self._ranked_prefix(ranked)[1]:
+                matches.setdefault(record_index, False)
+        else:
+            for i in range(start, end):
+                key, record_index = self._key(i)
+                matches[record_index] = matches.get(record_index, False) or key == prefix
+
+        candidates = []
+        for record_index, exact in matches.items():
+            lat, lon, population, city, state, country = self._record(record_index)
+            if qualifiers and not all(
+                q == country.casefold() or normalize(state).startswith(q) for q in qualifiers
+            ):
+                continue
+            candidates.append((not exact, -population, city, lat, lon, country, state))
+
+        if broad and len(candidates) < limit:
+            # Cities outside the ranked ones may match the qualifiers too
+            return []
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return [
+            GeoLocation.from_openweathermap(
+                {"name": city, "lat": lat, "lon": lon, "country": country, "state": state or None}
+            )
+            for _, _, city, lat, lon, country, state in candidates[:limit]
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build an offline gazetteer index.")
+    parser.add_argument("cities", help="GeoNames cities file (e.g. cities15000.txt)")
+    parser.add_argument("index", help="Output index path")
+    parser.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt for state names")
+    parser.add_argument(
+        "--no-alternate-names",
+        action="store_true",
+        help="Index only the primary and ASCII names",
+    )
+    args = parser.parse_args()
+
+    count = build_index(
+        args.cities,
+        args.index,
+        admin1_path=args.admin1,
+        include_alternate_names=not args.no_alternate_names,
+    )
+    print(f"Indexed {count} cities into {args.index}")
+
+
+if __name__ == "__main__":
+    main()
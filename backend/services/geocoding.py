@@ -1,7 +1,16 @@
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from models.geocoding import GeoLocation
+from services.cache import CacheStats
+from services.gazetteer import Gazetteer
+from services.hedging import Hedger
+from services.prefix_cache import PrefixCache
+from services import json_codec
+from services.rate_limit import RateLimiter
+from services.resilience import UpstreamPolicy, upstream_get
+from services.shared_cache import CacheBackend, SharedCache
+from services.singleflight import SingleFlight
+from services.timing import phase
 
 
 class GeocodingService:
@@ -10,28 +19,59 @@ class GeocodingService:
     BASE_URL = "https://api.openweathermap.org/geo/1.0"
     TIMEOUT = 10.0
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        gazetteer: Gazetteer | None = None,
+        prefix_cache: PrefixCache | None = None,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        policy: UpstreamPolicy | None = None,
+        hedger: Hedger | None = None,
+        shared_cache: CacheBackend | None = None,
+        shared_cache_ttl: float = 86400.0,
+        base_url: str | None = None,
+    ):
         self.api_key = api_key
-        self._client: httpx.AsyncClient | None = None
+        self.base_url = base_url or self.BASE_URL
+        self._gazetteer = gazetteer
+        self._prefix_cache = prefix_cache
+        # A shared client is owned by whoever created it; otherwise one is
+        # created on first use and closed with the service
+        self._client = client
+        self._owns_client = client is None
+        self._rate_limiter = rate_limiter
+        self._policy = policy or UpstreamPolicy()
+        self._hedger = hedger
+        # Results are shared with other workers; locations rarely change
+        self._shared_cache = None
+        if shared_cache is not None:
+            self._shared_cache = SharedCache(
+                shared_cache,
+                "geocode.v1",
+                shared_cache_ttl,
+                encode=lambda results: json_codec.dumps([r.model_dump() for r in results]),
+                decode=lambda data: [GeoLocation.model_validate(r) for r in json_codec.loads(data)],
+            )
+        self._inflight = SingleFlight()
 
     async def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
+        if self._owns_client and (self._client is None or self._client.is_closed):
             self._client = httpx.AsyncClient(timeout=self.TIMEOUT)
         return self._client
 
     async def close(self) -> None:
-        if self._client and not self._client.is_closed:
+        if self._owns_client and self._client and not self._client.is_closed:
             await self._client.aclose()
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=4),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-        reraise=True,
-    )
+    @property
+    def shared_cache_stats(self) -> CacheStats | None:
+        """Hit/miss counters for the shared results tier, if enabled."""
+        return self._shared_cache.stats if self._shared_cache is not None else None
+
     async def search(self, query: str, limit: int = 5) -> list[GeoLocation]:
         """
-        Search for locations by name.
+        Search for locations by name, as `search_entry` without the freshness.
 
         Args:
             query: Location name to search for
@@ -40,19 +80,79 @@ class GeocodingService:
         Returns:
             List of matching GeoLocation objects
         """
+        return (await self.search_entry(query, limit))[0]
+
+    async def search_entry(self, query: str, limit: int = 5) -> tuple[list[GeoLocation], float]:
+        """
+        Search for locations by name, along with how long the results stay fresh.
+
+        When an offline gazetteer is configured it is consulted first, and the
+        upstream API is only called on a local miss. Otherwise the typeahead
+        prefix cache may answer from earlier results. Concurrent searches for
+        the same query (ignoring case and surrounding whitespace) are
+        coalesced into a single upstream call.
+
+        Results only stay fresh for a set time when they come from, or were
+        just stored in, the shared results tier; otherwise freshness is 0.
+
+        Args:
+            query: Location name to search for
+            limit: Maximum number of results (1-5)
+
+        Returns:
+            Tuple of (matching GeoLocation objects, seconds the shared
+            results tier keeps them fresh)
+        """
         if not query or not query.strip():
-            return []
+            return [], 0.0
+
+        query = query.strip()
+        limit = min(max(limit, 1), 5)
+        if self._gazetteer is not None and (local := self._gazetteer.search(query, limit=limit)):
+            return local, 0.0
+        if self._prefix_cache is not None:
+            if (cached := self._prefix_cache.get(query, limit)) is not None:
+                return cached, 0.0
+
+        key = (query.casefold(), limit)
+        return await self._inflight.do(key, lambda: self._load(key, query, limit))
 
-        client = await self._get_client()
-        response = await client.get(
-            f"{self.BASE_URL}/direct",
+    async def _load(self, key: tuple, query: str, limit: int) -> tuple[list[GeoLocation], float]:
+        fresh_for = 0.0
+        if self._shared_cache is not None and (entry := await self._shared_cache.get_entry(key)):
+            results, fresh_for = entry[0], max(-entry[1], 0.0)
+        else:
+            results = await self._fetch(query, limit)
+            if self._shared_cache is not None:
+                await self._shared_cache.set(key, results)
+                fresh_for = self._shared_cache.ttl
+        if self._prefix_cache is not None:
+            self._prefix_cache.add(query, limit, results)
+        return results, fresh_for
+
+    async def _request(self, path: str, params: dict) -> httpx.Response:
+        """GET an upstream endpoint under the rate limiter, circuit breaker and deadline."""
+        return await upstream_get(
+            await self._get_client(),
+            f"{self.base_url}/{path}",
+            params,
+            self._policy,
+            rate_limiter=self._rate_limiter,
+            hedger=self._hedger,
+            timeout=self.TIMEOUT,
+        )
+
+    async def _fetch(self, query: str, limit: int) -> list[GeoLocation]:
+        """Fetch geocoding results from the upstream API."""
+        response = await self._request(
+            "direct",
             params={
-                "q": query.strip(),
-                "limit": min(max(limit, 1), 5),
+                "q": query,
+                "limit": limit,
                 "appid": self.api_key,
             },
         )
-        response.raise_for_status()
-        data = response.json()
-
-        return [GeoLocation.from_openweathermap(item) for item in data]
+        with phase("parse"):
+            return [
+                GeoLocation.from_openweathermap(item) for item in json_codec.loads(response.content)
+            ]
@@ -0,0 +1,186 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls to one endpoint."""
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Number of recent latencies kept
+        """
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """Nearest-rank `q` percentile (0-1) of recent latencies, if any."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+@dataclass
+class HedgeStats:
+    """Hedging counters and current hedge delays per endpoint."""
+
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    capped: int = 0
+    delays: dict[str, float] = field(default_factory=dict)
+
+
+class Hedger:
+    """
+    Hedged requests: duplicate a call that is slower than usual.
+
+    A call that hasn't completed after the `percentile` latency of recent
+    calls to the same endpoint gets an identical second request, and
+    whichever succeeds first wins; the other is cancelled. Each call earns
+    `max_rate` of a hedge, and a hedge spends one, so no more than that
+    fraction of calls are ever duplicated.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_rate: float = 0.1,
+        min_delay: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            percentile: Latency percentile (0-1) after which a call is hedged
+            max_rate: Maximum fraction of calls that may be hedged
+            min_delay: Minimum seconds before hedging, however fast upstream is
+            window: Recent latencies kept per endpoint
+            min_samples: Latencies needed before an endpoint is hedged
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self._clock = clock
+        self._trackers: dict[str, LatencyTracker] = {}
+        self._budget = 1.0
+        self._stats = HedgeStats()
+
+    def tracker(self, endpoint: str) -> LatencyTracker:
+        if endpoint not in self._trackers:
+            self._trackers[endpoint] = LatencyTracker(self.window)
+        return self._trackers[endpoint]
+
+    def delay(self, endpoint: str) -> float | None:
+        """Seconds after which a call to endpoint is hedged, if it is."""
+        tracker = self.tracker(endpoint)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    async def call(
+        self,
+        endpoint: str,
+        request: Callable[[float], Awaitable[T]],
+        timeout: float,
+        before_hedge: Callable[[], Awaitable[None]] | None = None,
+    ) -> T:
+        """
+        Run a request, hedging it if it is slow.
+
+        Args:
+            endpoint: Name of the endpoint, one latency history per name
+            request: Coroutine function performing one request, given its timeout
+            timeout: Seconds the call may take; the hedge gets what is left
+            before_hedge: Optional coroutine function awaited before sending
+                the hedge (e.g. a rate limiter); if it raises, no hedge is sent
+
+        Returns:
+            The result of the first request to succeed
+
+        Raises:
+            The primary request's exception if every request fails
+        """
+        tracker = self.tracker(endpoint)
+        delay = self.delay(endpoint)
+        self._stats.requests += 1
+        self._budget = min(1.0, self._budget + self.max_rate)
+
+        async def timed(timeout: float) -> T:
+            started = self._clock()
+            result = await request(timeout)
+            tracker.record(self._clock() - started)
+            return result
+
+        started = self._clock()
+        primary = asyncio.ensure_future(timed(timeout))
+        tasks = [primary]
+        try:
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if await self._admit_hedge(before_hedge):
+                        remaining = timeout - (self._clock() - started)
+                        tasks.append(asyncio.ensure_future(timed(remaining)))
+            return await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _admit_hedge(self, before_hedge: Callable[[], Awaitable[None]] | None) -> bool:
+        if self._budget < 1.0:
+            self._stats.capped += 1
+            return False
+        if before_hedge is not None:
+            try:
+                await before_hedge()
+            except Exception:
+                self._stats.capped += 1
+                return False
+        self._budget -= 1.0
+        self._stats.hedged += 1
+        return True
+
+    async def _first_success(self, tasks: list[asyncio.Task]) -> T:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        self._stats.hedge_wins += 1
+                    return task.result()
+        # Every request failed; report the primary's error
+        for task in tasks[1:]:
+            task.exception()
+        return tasks[0].result()
+
+    @property
+    def stats(self) -> HedgeStats:
+        delays = {}
+        for endpoint in self._trackers:
+            if (delay := self.delay(endpoint)) is not None:
+                delays[endpoint] = delay
+        return HedgeStats(
+            requests=self._stats.requests,
+            hedged=self._stats.hedged,
+            hedge_wins=self._stats.hedge_wins,
+            capped=self._stats.capped,
+            delays=delays,
+        )
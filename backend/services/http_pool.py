@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import httpx
+
+from services.recording import RecordingTransport, TrafficArchive
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """Connection and request counters for an upstream pool."""
+
+    max_connections: int
+    # None when the transport's connection pool can't be inspected
+    connections: int | None = None
+    idle_connections: int | None = None
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    requests: int = 0
+
+    @property
+    def active_connections(self) -> int | None:
+        if self.connections is None or self.idle_connections is None:
+            return None
+        return self.connections - self.idle_connections
+
+    @property
+    def utilization(self) -> float | None:
+        """Fraction of the connection limit currently serving requests, if known."""
+        if self.active_connections is None:
+            return None
+        return self.active_connections / self.max_connections if self.max_connections else 0.0
+
+
+def pool_connections(transport: httpx.AsyncBaseTransport) -> tuple[int, int] | None:
+    """
+    Open and idle connections in an httpx transport's pool.
+
+    httpx doesn't expose its connection pool, so this reads httpcore's
+    internals. Other transports (e.g. replay) and internals that have
+    changed shape give None rather than an error.
+
+    Returns:
+        Tuple of (open, idle) connections, or None if the pool can't be read
+    """
+    connections = getattr(getattr(transport, "_pool", None), "connections", None)
+    if connections is None:
+        return None
+    try:
+        return len(connections), sum(1 for c in connections if c.is_idle())
+    except (AttributeError, TypeError):
+        return None
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport to count requests in flight."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class UpstreamPool:
+    """
+    One HTTP client shared by every upstream service.
+
+    Services that share the pool reuse each other's keep-alive connections,
+    and the connection limit caps the sockets opened toward upstream APIs
+    however many requests are in flight. `prewarm` opens connections ahead
+    of the first requests so they don't pay for DNS, TCP and TLS setup.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        compression: bool = True,
+        timeout: float = 10.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        archive: TrafficArchive | None = None,
+    ):
+        """
+        Args:
+            max_connections: Maximum concurrent connections across all hosts
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Negotiate HTTP/2 (requires the optional `h2` package)
+            compression: Accept compressed upstream responses
+            timeout: Default request timeout in seconds
+            transport: Send requests here instead of the network (e.g. a
+                ReplayTransport); the connection settings are then unused
+            archive: Record every upstream exchange to this archive
+        """
+        self.max_connections = max_connections
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                http2=http2,
+            )
+        self._base_transport = transport
+        if archive is not None:
+            transport = RecordingTransport(transport, archive)
+        self._transport = _CountingTransport(transport)
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=timeout,
+            headers=None if compression else {"Accept-Encoding": "identity"},
+        )
+
+    async def prewarm(self, urls: list[str], connections: int = 1) -> int:
+        """
+        Open connections to upstream hosts before they are needed.
+
+        Sends `connections` concurrent HEAD requests to each URL, so that many
+        connections per host are left open in the pool. Failures are logged
+        and otherwise ignored.
+
+        Args:
+            urls: One URL per upstream host
+            connections: Connections to open per host
+
+        Returns:
+            Number of requests that completed
+        """
+
+        async def head(url: str) -> bool:
+            try:
+                await self.client.head(url)
+                return True
+            except httpx.HTTPError as e:
+                logger.warning("Pre-warming %s failed: %s", url, e)
+                return False
+
+        results = await asyncio.gather(*(head(url) for url in urls for _ in range(connections)))
+        return sum(results)
+
+    @property
+    def stats(self) -> PoolStats:
+        connections, idle = pool_connections(self._base_transport) or (None, None)
+        return PoolStats(
+            max_connections=self.max_connections,
+            connections=connections,
+            idle_connections=idle,
+            in_flight=self._transport.in_flight,
+            peak_in_flight=self._transport.peak_in_flight,
+            requests=self._transport.requests,
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,24 @@
+"""JSON parsing for upstream response bodies, using orjson when it is installed."""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+
+def loads(data: bytes) -> object:
+    """Parse a JSON document from raw bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: object) -> bytes:
+    """Serialize an object to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
@@ -0,0 +1,223 @@
+"""
+Push current weather to many clients from one upstream poll per location.
+
+LiveWeatherHub keeps a channel per location, snapped to the cache grid. The
+first subscriber to a location starts its poller, which fetches the current
+weather every `interval` seconds and hands each changed observation to all
+of the location's subscribers; the last subscriber leaving stops it. A
+subscription holds only the latest observation its client hasn't read, so a
+slow client skips intermediate observations instead of buffering them.
+"""
+
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from models.units import convert_current_weather, normalize_units
+from models.weather import CurrentWeather
+from services.cache import snap_coords
+
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    """Raised when the hub is already serving its maximum number of subscribers."""
+
+
+@dataclass
+class LiveStats:
+    """Counters for live weather channels."""
+
+    channels: int = 0
+    subscribers: int = 0
+    polls: int = 0
+    # Polls that returned a different observation than the last one
+    changes: int = 0
+    pushed: int = 0
+    # Observations replaced before a slow subscriber read them
+    coalesced: int = 0
+    failed: int = 0
+
+
+class Subscription:
+    """A client's subscription to a location: the latest observation it hasn't read."""
+
+    def __init__(self, key: tuple[float, float], units: str):
+        self.key = key
+        self.units = units
+        self.closed = False
+        self._pending: CurrentWeather | None = None
+        self._ready = asyncio.Event()
+
+    def offer(self, weather: CurrentWeather) -> bool:
+        """
+        Make weather the next observation read, replacing any unread one.
+
+        Returns:
+            True if an unread observation was replaced
+        """
+        replaced = self._pending is not None
+        self._pending = weather
+        self._ready.set()
+        return replaced
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float | None = None) -> CurrentWeather | None:
+        """
+        Wait for an observation the client hasn't read yet.
+
+        Args:
+            timeout: Seconds to wait, or None to wait until one arrives
+
+        Returns:
+            The observation, or None if the timeout passed or the
+            subscription was closed first
+        """
+        if self._pending is None and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        weather, self._pending = self._pending, None
+        return weather
+
+
+class _Channel:
+    """Subscribers to one location and the poller feeding them."""
+
+    def __init__(self, lat: float, lon: float):
+        self.lat = lat
+        self.lon = lon
+        self.subscribers: set[Subscription] = set()
+        self.latest: CurrentWeather | None = None
+        self.task: asyncio.Task | None = None
+
+
+class LiveWeatherHub:
+    """
+    Shares one upstream poll per location between all of its live subscribers.
+
+    Polls go through the WeatherProvider, so they are served from its cache
+    when fresh, coalesced with concurrent requests, and rate limited like
+    any other lookup.
+    """
+
+    def __init__(
+        self,
+        provider,
+        interval: float = 60.0,
+        grid: float = 0.01,
+        max_subscribers: int = 1000,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            provider: WeatherProvider polled for current weather
+            interval: Seconds between polls of a location
+            grid: Cell size in degrees; subscribers in one cell share a channel
+            max_subscribers: Subscriptions served at once across all locations
+            sleep: Coroutine function used to wait (injectable for tests)
+        """
+        self._provider = provider
+        self.interval = interval
+        self.grid = grid
+        self.max_subscribers = max_subscribers
+        self._sleep = sleep
+        self._channels: dict[tuple[float, float], _Channel] = {}
+        self._subscribers = 0
+        self._stats = LiveStats()
+
+    def subscribe(self, lat: float, lon: float, units: str = "metric") -> Subscription:
+        """
+        Subscribe to changes of a location's current weather.
+
+        The latest known observation, if any, is ready to read at once.
+
+        Raises:
+            TooManySubscribers: If `max_subscribers` are already subscribed
+        """
+        if self._subscribers >= self.max_subscribers:
+            raise TooManySubscribers(f"{self._subscribers} live subscribers")
+        key = snap_coords(lat, lon, self.grid)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel(*key)
+            # A fresh context keeps the poller out of the subscribing request's
+            # timings and priority
+            channel.task = asyncio.create_task(
+                self._run(channel), context=contextvars.Context()
+            )
+        subscription = Subscription(key, normalize_units(units))
+        channel.subscribers.add(subscription)
+        self._subscribers += 1
+        if channel.latest is not None:
+            subscription.offer(convert_current_weather(channel.latest, subscription.units))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Close a subscription, stopping its location's poller if it was the last one."""
+        channel = self._channels.get(subscription.key)
+        subscription.close()
+        if channel is None or subscription not in channel.subscribers:
+            return
+        channel.subscribers.discard(subscription)
+        self._subscribers -= 1
+        if not channel.subscribers:
+            del self._channels[subscription.key]
+            channel.task.cancel()
+
+    async def _run(self, channel: _Channel) -> None:
+        while True:
+            await self._poll(channel)
+            await self._sleep(self.interval)
+
+    async def _poll(self, channel: _Channel) -> None:
+        self._stats.polls += 1
+        try:
+            weather = await self._provider.get_current(channel.lat, channel.lon)
+        except Exception as e:
+            self._stats.failed += 1
+            logger.warning("Live poll of %s,%s failed: %s", channel.lat, channel.lon, e)
+            return
+        if weather == channel.latest:
+            return
+        channel.latest = weather
+        self._stats.changes += 1
+        # Convert once per unit system rather than once per subscriber
+        converted: dict[str, CurrentWeather] = {}
+        for subscription in channel.subscribers:
+            if subscription.units not in converted:
+                converted[subscription.units] = convert_current_weather(weather, subscription.units)
+            if subscription.offer(converted[subscription.units]):
+                self._stats.coalesced += 1
+            self._stats.pushed += 1
+
+    async def run_once(self) -> None:
+        """Poll every subscribed location once."""
+        await asyncio.gather(*(self._poll(channel) for channel in list(self._channels.values())))
+
+    async def close(self) -> None:
+        """Close every subscription and stop all pollers."""
+        channels, self._channels = list(self._channels.values()), {}
+        self._subscribers = 0
+        for channel in channels:
+            for subscription in channel.subscribers:
+                subscription.close()
+            channel.task.cancel()
+        await asyncio.gather(*(channel.task for channel in channels), return_exceptions=True)
+
+    @property
+    def stats(self) -> LiveStats:
+        return LiveStats(
+            **{
+                **vars(self._stats),
+                "channels": len(self._channels),
+                "subscribers": self._subscribers,
+            }
+        )
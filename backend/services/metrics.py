@@ -0,0 +1,199 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Hot paths only bump plain counters and histogram buckets; everything else
+(cache, pool, limiter and circuit state) is read from the components'
+`stats` when /metrics is scraped.
+"""
+
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from starlette.datastructures import Headers
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Event stream durations in seconds, from a page glance to a dashboard left open
+STREAM_BUCKETS = (1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """(upper bound, observations at or below it) per bucket, ending with +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, float("inf")), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+@dataclass
+class MetricFamily:
+    """One metric with its samples, ready to be rendered."""
+
+    name: str
+    type: str
+    help: str
+    samples: list[tuple[str, dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, value: float, suffix: str = "", **labels: str) -> None:
+        self.samples.append((suffix, labels, value))
+
+    def add_histogram(self, histogram: Histogram, **labels: str) -> None:
+        for bound, count in histogram.cumulative():
+            self.add(count, "_bucket", **labels, le=_format_value(bound))
+        self.add(histogram.sum, "_sum", **labels)
+        self.add(histogram.count, "_count", **labels)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families: list[MetricFamily]) -> str:
+    """Render metric families in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for suffix, labels, value in family.samples:
+            label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            name = family.name + suffix
+            if label_text:
+                name = f"{name}{{{label_text}}}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """
+    Latency, response counts and in-flight requests per API route.
+
+    Event streams stay open for as long as their clients listen, so they are
+    counted apart from requests: an open stream isn't in flight, and how long
+    it lasted isn't a request latency.
+    """
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        stream_buckets: tuple[float, ...] = STREAM_BUCKETS,
+    ):
+        self.buckets = buckets
+        self.stream_buckets = stream_buckets
+        self.in_flight = 0
+        self.streams_open = 0
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.stream_duration: dict[tuple[str, str], Histogram] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, stream: bool = False
+    ) -> None:
+        histograms, buckets = (
+            (self.stream_duration, self.stream_buckets) if stream else (self.latency, self.buckets)
+        )
+        histogram = histograms.get((method, route))
+        if histogram is None:
+            histogram = histograms[(method, route)] = Histogram(buckets)
+        histogram.observe(seconds)
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def families(self) -> list[MetricFamily]:
+        in_flight = MetricFamily(
+            "http_requests_in_flight", "gauge", "API requests currently being served"
+        )
+        in_flight.add(self.in_flight)
+        latency = MetricFamily(
+            "http_request_duration_seconds", "histogram", "API request latency by route"
+        )
+        for (method, route), histogram in sorted(self.latency.items()):
+            latency.add_histogram(histogram, method=method, route=route)
+        streams_open = MetricFamily(
+            "http_streams_open", "gauge", "Event streams currently open"
+        )
+        streams_open.add(self.streams_open)
+        stream_duration = MetricFamily(
+            "http_stream_duration_seconds", "histogram", "Event stream duration by route"
+        )
+        for (method, route), histogram in sorted(self.stream_duration.items()):
+            stream_duration.add_histogram(histogram, method=method, route=route)
+        responses = MetricFamily(
+            "http_responses_total", "counter", "API responses by route and status code"
+        )
+        for (method, route, status), count in sorted(self.responses.items()):
+            responses.add(count, method=method, route=route, status=str(status))
+        return [in_flight, latency, streams_open, stream_duration, responses]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into a RequestMetrics.
+
+    Requests are labelled with their route template (e.g.
+    `/api/weather/current`), so path parameters and unknown paths can't
+    create unbounded label values.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stream = False
+        metrics = self.metrics
+
+        async def send_with_status(message):
+            nonlocal status, stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type", "")
+                if content_type.startswith("text/event-stream"):
+                    # Served from here on as a stream, not a request
+                    stream = True
+                    metrics.in_flight -= 1
+                    metrics.streams_open += 1
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            if stream:
+                metrics.streams_open -= 1
+            else:
+                metrics.in_flight -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.observe(scope["method"], path, status, elapsed, stream=stream)
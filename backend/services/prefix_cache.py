@@ -0,0 +1,190 @@
+import sys
+from collections import OrderedDict
+
+from models.geocoding import GeoLocation
+from services.cache import CacheStats
+from services.gazetteer import normalize
+
+LocationKey = tuple[str, str, str | None, float, float]
+
+
+def _location_key(location: GeoLocation) -> LocationKey:
+    return (
+        location.name,
+        location.country,
+        location.state,
+        round(location.lat, 4),
+        round(location.lon, 4),
+    )
+
+
+def _estimate_size(query: str, results: list[GeoLocation]) -> int:
+    """Rough in-memory footprint of one cached query, in bytes."""
+    size = sys.getsizeof(query) + 64
+    for location in results:
+        size += 200 + sum(
+            sys.getsizeof(s)
+            for s in (location.name, location.country, location.state, location.display_name)
+            if s
+        )
+    return size
+
+
+class _TrieNode:
+    __slots__ = ("children", "locations")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.locations: set[LocationKey] = set()
+
+
+class PrefixCache:
+    """
+    Typeahead cache of past geocoding results.
+
+    Every search result is indexed in a trie by its normalized name, so a
+    later query for a prefix ("Par") can be answered from the locations seen
+    for longer queries ("Paris") once at least `limit` completions are
+    known. Repeated identical queries are served from their stored results.
+    Entries are evicted least recently used first, bounded by both query
+    count and estimated memory.
+    """
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # normalized query -> (requested limit, results, estimated size)
+        self._queries: OrderedDict[str, tuple[int, list[GeoLocation], int]] = OrderedDict()
+        # location -> (location, number of cached queries referencing it)
+        self._locations: dict[LocationKey, tuple[GeoLocation, int]] = {}
+        self._root = _TrieNode()
+        self._bytes = 0
+        self._stats = CacheStats()
+
+    def get(self, query: str, limit: int) -> list[GeoLocation] | None:
+        """
+        Answer a query from cached results, or return None on a miss.
+
+        Args:
+            query: Location search query
+            limit: Maximum number of results
+
+        Returns:
+            Cached results, or None if the cache can't answer completely
+        """
+        key = normalize(query)
+        if not key:
+            return None
+
+        if (entry := self._queries.get(key)) is not None:
+            stored_limit, results, _ = entry
+            # A short answer is exhaustive, so it also satisfies larger limits
+            if stored_limit >= limit or len(results) < stored_limit:
+                self._queries.move_to_end(key)
+                self._stats.hits += 1
+                return results[:limit]
+
+        # Qualified queries ("Paris,US") can't be answered from names alone
+        if "," not in key and (completions := self._complete(key, limit)) is not None:
+            self._stats.hits += 1
+            return completions
+
+        self._stats.misses += 1
+        return None
+
+    def add(self, query: str, limit: int, results: list[GeoLocation]) -> None:
+        """Record the upstream results for a query."""
+        key = normalize(query)
+        if not key:
+            return
+
+        if key in self._queries:
+            self._remove(key)
+
+        size = _estimate_size(key, results)
+        self._queries[key] = (limit, results, size)
+        self._bytes += size
+        for location in results:
+            loc_key = _location_key(location)
+            if loc_key in self._locations:
+                existing, refs = self._locations[loc_key]
+                self._locations[loc_key] = (existing, refs + 1)
+            else:
+                self._locations[loc_key] = (location, 1)
+                self._trie_insert(normalize(location.name), loc_key)
+
+        while self._queries and (
+            len(self._queries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._queries)))
+            self._stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, results, size = self._queries.pop(key)
+        self._bytes -= size
+        for location in results:
+            loc_key = _location_key(location)
+            existing, refs = self._locations[loc_key]
+            if refs > 1:
+                self._locations[loc_key] = (existing, refs - 1)
+            else:
+                del self._locations[loc_key]
+                self._trie_remove(normalize(existing.name), loc_key)
+
+    def _trie_insert(self, name: str, loc_key: LocationKey) -> None:
+        node = self._root
+        for char in name:
+            node = node.children.setdefault(char, _TrieNode())
+        node.locations.add(loc_key)
+
+    def _trie_remove(self, name: str, loc_key: LocationKey) -> None:
+        path = [self._root]
+        for char in name:
+            path.append(path[-1].children[char])
+        path[-1].locations.discard(loc_key)
+        # Prune nodes that no longer lead to any location
+        for depth in range(len(name), 0, -1):
+            node = path[depth]
+            if node.locations or node.children:
+                break
+            del path[depth - 1].children[name[depth - 1]]
+
+    def _complete(self, prefix: str, limit: int) -> list[GeoLocation] | None:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+
+        # (is exact name match, popularity, location)
+        candidates: list[tuple[bool, int, GeoLocation]] = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for loc_key in current.locations:
+                location, refs = self._locations[loc_key]
+                candidates.append((current is node, refs, location))
+            stack.extend(current.children.values())
+
+        if len(candidates) < limit:
+            return None
+
+        candidates.sort(key=lambda c: (not c[0], -c[1]))
+        return [location for _, _, location in candidates[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            size=len(self._queries),
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory held by cached results."""
+        return self._bytes
@@ -0,0 +1,201 @@
+"""
+Keep popular weather entries fresh before anyone asks for them.
+
+WeatherProvider records each cached lookup in a PopularityTracker, a
+decayed LFU count per cache key. PrewarmScheduler wakes up periodically and
+refreshes the most popular entries that are about to expire, so hot
+locations are reloaded in the background instead of on a user's request.
+Refreshes run at background priority under the shared rate limiter, and
+are further capped by the scheduler's own per-minute budget.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable
+
+from services.rate_limit import RateLimitExceeded, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Stored scores are rescaled before they grow past this
+_MAX_WEIGHT = 1e100
+
+
+class PopularityTracker:
+    """
+    Access counts per key that halve every `half_life` seconds.
+
+    Uses forward decay: each access adds a weight that grows exponentially
+    with time, so stored scores never need updating to stay comparable.
+    Only the `max_keys` most popular keys are kept.
+    """
+
+    def __init__(
+        self,
+        half_life: float = 3600.0,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._clock = clock
+        self._epoch = clock()
+        self._scores: dict[Hashable, float] = {}
+
+    def _weight(self) -> float:
+        return 2 ** ((self._clock() - self._epoch) / self.half_life)
+
+    def record(self, key: Hashable) -> None:
+        weight = self._weight()
+        if weight > _MAX_WEIGHT:
+            self._scores = {k: score / weight for k, score in self._scores.items()}
+            self._epoch = self._clock()
+            weight = 1.0
+        self._scores[key] = self._scores.get(key, 0.0) + weight
+        # Prune in batches so recording stays amortized O(1)
+        if len(self._scores) > 2 * self.max_keys:
+            keep = heapq.nlargest(self.max_keys, self._scores.items(), key=lambda kv: kv[1])
+            self._scores = dict(keep)
+
+    def score(self, key: Hashable) -> float:
+        """Decayed access count of key."""
+        return self._scores.get(key, 0.0) / self._weight()
+
+    def top(self, n: int, min_score: float = 0.0) -> list[tuple[Hashable, float]]:
+        """The n most popular keys with their decayed counts, most popular first."""
+        weight = self._weight()
+        return [
+            (key, score / weight)
+            for key, score in heapq.nlargest(n, self._scores.items(), key=lambda kv: kv[1])
+            if score / weight >= min_score
+        ]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+@dataclass
+class PrewarmStats:
+    """Counters for background refreshes of popular entries."""
+
+    cycles: int = 0
+    refreshed: int = 0
+    # Entries another worker had already refreshed in the shared cache
+    shared: int = 0
+    # Refreshes postponed for lack of budget or to leave it to interactive calls
+    deferred: int = 0
+    failed: int = 0
+
+
+class PrewarmScheduler:
+    """
+    Periodically refreshes popular entries that are about to expire.
+
+    Each cycle walks the most popular keys, hottest first, and refreshes the
+    ones expiring within `lead_time` (or already gone from the cache). With
+    several workers, an entry another worker has already refreshed is taken
+    from the shared cache without an upstream call or budget. A
+    cycle ends early when the scheduler's budget runs out or the rate limiter
+    drops a background call, which it does while interactive calls wait.
+    """
+
+    def __init__(
+        self,
+        provider,
+        tracker: PopularityTracker,
+        top_n: int = 50,
+        min_score: float = 3.0,
+        lead_time: float = 30.0,
+        max_calls_per_minute: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            provider: WeatherProvider whose caches are kept warm
+            tracker: Popularity of the provider's cache keys
+            top_n: Most popular keys considered each cycle
+            min_score: Decayed access count below which keys aren't refreshed
+            lead_time: Seconds before expiry that entries are refreshed; cycles
+                run three times per lead time
+            max_calls_per_minute: Upstream calls the scheduler may make (0 for
+                no limit beyond the rate limiter)
+            clock: Monotonic time source (injectable for tests)
+            sleep: Coroutine function used to wait (injectable for tests)
+        """
+        self._provider = provider
+        self._tracker = tracker
+        self.top_n = top_n
+        self.min_score = min_score
+        self.lead_time = lead_time
+        self.interval = lead_time / 3
+        self._budget = (
+            TokenBucket(max_calls_per_minute, 60, clock) if max_calls_per_minute > 0 else None
+        )
+        self._sleep = sleep
+        self._task: asyncio.Task | None = None
+        self._stats = PrewarmStats()
+
+    async def run_once(self) -> int:
+        """
+        Refresh popular entries close to expiry.
+
+        Returns:
+            Number of entries refreshed from upstream
+        """
+        self._stats.cycles += 1
+        refreshed = 0
+        for key, _ in self._tracker.top(self.top_n, self.min_score):
+            expires_in = self._provider.expires_in(key)
+            if expires_in is not None and expires_in > self.lead_time:
+                continue
+            if self._budget is not None and self._budget.tokens < 1:
+                self._stats.deferred += 1
+                break
+            fetched = True
+            try:
+                fetched = await self._provider.refresh(key, lead_time=self.lead_time)
+            except RateLimitExceeded:
+                self._stats.deferred += 1
+                break
+            except Exception as e:
+                self._stats.failed += 1
+                logger.warning("Pre-warming %s failed: %s", key, e)
+            else:
+                if fetched:
+                    refreshed += 1
+                else:
+                    self._stats.shared += 1
+            # Only upstream calls count against the budget
+            if fetched and self._budget is not None:
+                self._budget.take()
+        self._stats.refreshed += refreshed
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            await self._sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Pre-warming cycle failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def stats(self) -> PrewarmStats:
+        return PrewarmStats(**vars(self._stats))
@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Awaitable, Callable
+
+from services.timing import phase
+
+
+class Priority(IntEnum):
+    """Upstream call priority; lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Priority of upstream calls made from the current task. Background work
+# (cache refreshes, prefetching) sets this so the limiter can tell it apart.
+upstream_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "upstream_priority", default=Priority.INTERACTIVE
+)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an upstream call would exceed the configured quota."""
+
+    def __init__(
+        self,
+        message: str,
+        priority: Priority = Priority.INTERACTIVE,
+        retry_after: float | None = None,
+    ):
+        super().__init__(message)
+        # Priority of the refused call; background calls are dropped while
+        # interactive ones could still be served
+        self.priority = priority
+        # Seconds until the budget allows the call, when known
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket holding up to `capacity` tokens, refilled continuously."""
+
+    def __init__(self, capacity: float, period: float, clock: Callable[[], float]):
+        """
+        Args:
+            capacity: Maximum tokens (calls allowed in one burst)
+            period: Seconds to refill from empty to full
+            clock: Monotonic time source
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+    def time_until(self, tokens: float) -> float:
+        """Seconds until the bucket holds at least `tokens` tokens."""
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+@dataclass
+class RateLimitStats:
+    """Remaining upstream budget and limiter counters."""
+
+    minute_remaining: int | None = None
+    day_remaining: int | None = None
+    granted: int = 0
+    waited: int = 0
+    throttled: int = 0
+    dropped: int = 0
+
+
+def worker_share(quota: int, workers: int) -> int:
+    """
+    Part of an account quota one of `workers` processes may use.
+
+    Each process limits its own calls, so the quota is split evenly and the
+    processes together stay within it. A quota smaller than the worker count
+    still allows each worker one call.
+
+    Args:
+        quota: Calls the upstream account allows (0 for no limit)
+        workers: Worker processes sharing the account
+
+    Returns:
+        Calls this process may make (0 for no limit)
+    """
+    if quota <= 0:
+        return 0
+    return max(1, quota // max(1, workers))
+
+
+class RateLimiter:
+    """
+    Quota-aware limiter shared by every upstream call in this process.
+
+    The budget isn't shared with other worker processes; give each worker
+    its share of the account quota (see `worker_share`).
+
+    Per-minute and per-day budgets are token buckets; a call needs a token
+    from each. Interactive calls wait up to `max_wait` for a token before
+    failing. Background calls never wait: they are dropped while interactive
+    calls are waiting or once the budget falls to the reserved fraction, so
+    background work runs out of budget before interactive traffic does.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = 0,
+        per_day: int = 0,
+        max_wait: float = 2.0,
+        background_reserve: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            per_minute: Calls allowed per minute (0 for no limit)
+            per_day: Calls allowed per day (0 for no limit)
+            max_wait: Seconds an interactive call may wait for a token
+            background_reserve: Fraction of each budget background calls
+                may not use
+            clock: Monotonic time source (injectable for tests)
+            sleep: Coroutine function used to wait (injectable for tests)
+        """
+        self._minute = TokenBucket(per_minute, 60, clock) if per_minute > 0 else None
+        self._day = TokenBucket(per_day, 86400, clock) if per_day > 0 else None
+        self._buckets = [b for b in (self._minute, self._day) if b is not None]
+        self.max_wait = max_wait
+        self.background_reserve = background_reserve
+        self._clock = clock
+        self._sleep = sleep
+        self._waiting = 0
+        self._stats = RateLimitStats()
+
+    def _try_take(self, reserve: float) -> bool:
+        if all(b.tokens >= 1 + reserve * b.capacity for b in self._buckets):
+            for bucket in self._buckets:
+                bucket.take()
+            self._stats.granted += 1
+            return True
+        return False
+
+    async def acquire(self, priority: Priority | None = None) -> None:
+        """
+        Take one call from the budget, waiting if the call is interactive.
+
+        Args:
+            priority: Call priority; defaults to the current task's
+                `upstream_priority`
+
+        Raises:
+            RateLimitExceeded: If the call is dropped or would wait too long
+        """
+        if priority is None:
+            priority = upstream_priority.get()
+
+        if priority is Priority.BACKGROUND:
+            if self._waiting or not self._try_take(self.background_reserve):
+                self._stats.dropped += 1
+                raise RateLimitExceeded(
+                    "Upstream budget reserved for interactive requests", Priority.BACKGROUND
+                )
+            return
+
+        if self._try_take(0.0):
+            return
+        deadline = self._clock() + self.max_wait
+        self._waiting += 1
+        self._stats.waited += 1
+        try:
+            while not self._try_take(0.0):
+                wait = max(b.time_until(1) for b in self._buckets)
+                if self._clock() + wait > deadline:
+                    self._stats.throttled += 1
+                    raise RateLimitExceeded("Upstream rate limit exceeded", retry_after=wait)
+                with phase("ratelimit"):
+                    await self._sleep(wait)
+        finally:
+            self._waiting -= 1
+
+    @property
+    def stats(self) -> RateLimitStats:
+        return RateLimitStats(
+            minute_remaining=int(self._minute.tokens) if self._minute else None,
+            day_remaining=int(self._day.tokens) if self._day else None,
+            granted=self._stats.granted,
+            waited=self._stats.waited,
+            throttled=self._stats.throttled,
+            dropped=self._stats.dropped,
+        )
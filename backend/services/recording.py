@@ -0,0 +1,256 @@
+"""
+Record upstream traffic to an archive and replay it offline.
+
+RecordingTransport wraps the upstream transport and appends every exchange
+(request, response or transport error, and how long it took) to a
+TrafficArchive: gzip-compressed JSON lines, one gzip member per recording
+session, so archives only ever grow and can be concatenated. Each process
+writes its own file, named after the archive path with its process id
+(``upstream.1234.jsonl.gz``), so workers never interleave their writes;
+load_archive reads them all back. API keys are stripped from recorded URLs.
+
+ReplayTransport serves requests from a loaded archive instead of the
+network, with the recorded latencies optionally scaled, so a day of real
+traffic can be replayed through the app to compare versions.
+"""
+
+import asyncio
+import base64
+import gzip
+import logging
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from services import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Query parameters never written to an archive
+REDACTED_PARAMS = ("appid",)
+
+# Response headers that describe the wire encoding rather than the body
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _request_key(method: str, url: httpx.URL) -> str:
+    """Method and path with sorted query, minus secrets; independent of the host."""
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in REDACTED_PARAMS)
+    query = str(httpx.QueryParams(params))
+    return f"{method} {url.path}?{query}" if query else f"{method} {url.path}"
+
+
+def _split_name(path: Path) -> tuple[str, str]:
+    """A file name's stem and suffixes, e.g. ("upstream", ".jsonl.gz")."""
+    stem, dot, suffixes = path.name.partition(".")
+    return stem, dot + suffixes
+
+
+def _process_path(path: str | Path, pid: int) -> Path:
+    """The file a process records to for archive path, with pid before the suffixes."""
+    path = Path(path)
+    stem, suffixes = _split_name(path)
+    return path.with_name(f"{stem}.{pid}{suffixes}")
+
+
+def _archive_files(path: str | Path) -> list[Path]:
+    """path itself, if it exists, then every process's file for it, sorted by name."""
+    path = Path(path)
+    stem, suffixes = _split_name(path)
+    pattern = re.compile(rf"{re.escape(stem)}\.\d+{re.escape(suffixes)}")
+    files = [path] if path.exists() else []
+    if path.parent.is_dir():
+        files.extend(sorted(f for f in path.parent.iterdir() if pattern.fullmatch(f.name)))
+    return files
+
+
+@dataclass
+class Exchange:
+    """One recorded upstream request and its outcome."""
+
+    # Seconds since the recording session started
+    at: float
+    key: str
+    elapsed: float
+    status: int | None = None
+    headers: list[tuple[str, str]] | None = None
+    body: bytes = b""
+    # Name of the httpx exception raised instead of a response
+    error: str | None = None
+
+    def to_json(self) -> bytes:
+        record = {"at": round(self.at, 6), "key": self.key, "elapsed": round(self.elapsed, 6)}
+        if self.error is not None:
+            record["error"] = self.error
+        else:
+            record["status"] = self.status
+            record["headers"] = self.headers
+            try:
+                record["body"] = self.body.decode()
+            except UnicodeDecodeError:
+                record["body_b64"] = base64.b64encode(self.body).decode()
+        return json_codec.dumps(record)
+
+    @classmethod
+    def from_json(cls, line: bytes) -> "Exchange":
+        record = json_codec.loads(line)
+        if "body_b64" in record:
+            body = base64.b64decode(record["body_b64"])
+        else:
+            body = record.get("body", "").encode()
+        return cls(
+            at=record["at"],
+            key=record["key"],
+            elapsed=record["elapsed"],
+            status=record.get("status"),
+            headers=[tuple(h) for h in record.get("headers") or []],
+            body=body,
+            error=record.get("error"),
+        )
+
+
+class TrafficArchive:
+    """Append-only, gzip-compressed log of this process's upstream exchanges."""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            path: Archive path; this process records to its own file beside it
+                (see _process_path), created if missing and appended
+                to otherwise
+            clock: Monotonic clock for exchange offsets
+        """
+        self.path = str(_process_path(path, os.getpid()))
+        self._clock = clock
+        self._started = clock()
+        self._file = gzip.open(self.path, "ab")
+        self.recorded = 0
+
+    def offset(self) -> float:
+        """Seconds since this recording session started."""
+        return self._clock() - self._started
+
+    def append(self, exchange: Exchange) -> None:
+        self._file.write(exchange.to_json() + b"\n")
+        self.recorded += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_archive(path: str) -> list[Exchange]:
+    """
+    Read every exchange in an archive and its per-process files.
+
+    Each file's exchanges are in recorded order, one file after another. A
+    session cut off before it was closed loses only its unflushed tail.
+    """
+    files = _archive_files(path)
+    if not files:
+        raise FileNotFoundError(f"No upstream archive at {path}")
+    exchanges = []
+    for file in files:
+        with gzip.open(file, "rb") as f:
+            try:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        exchanges.append(Exchange.from_json(line))
+            except EOFError:
+                logger.warning("Archive %s ends in a truncated session", file)
+    return exchanges
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to append every exchange to a TrafficArchive."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, archive: TrafficArchive):
+        self.transport = transport
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        at = self.archive.offset()
+        key = _request_key(request.method, request.url)
+        try:
+            response = await self.transport.handle_async_request(request)
+            # Read through the transport's stream so the body is decoded once
+            # here and handed on as plain content
+            decoded = httpx.Response(
+                response.status_code, headers=response.headers, stream=response.stream
+            )
+            body = await decoded.aread()
+        except httpx.HTTPError as e:
+            self.archive.append(
+                Exchange(at, key, self.archive.offset() - at, error=type(e).__name__)
+            )
+            raise
+        headers = [(k, v) for k, v in response.headers.items() if k not in _HOP_HEADERS]
+        self.archive.append(
+            Exchange(at, key, self.archive.offset() - at, response.status_code, headers, body)
+        )
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=body,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+        self.archive.close()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves requests from recorded exchanges instead of the network.
+
+    Requests are matched on method, path and query, ignoring the host and
+    API key. Repeats of a request get its recorded outcomes in order,
+    cycling when they run out; requests never recorded get a 404.
+    """
+
+    def __init__(
+        self,
+        exchanges: list[Exchange],
+        latency_scale: float = 1.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            exchanges: Recorded exchanges, e.g. from load_archive
+            latency_scale: Multiplier for recorded latencies (0 answers at once)
+            sleep: Async sleep, injectable for tests
+        """
+        self.latency_scale = latency_scale
+        self._sleep = sleep
+        self._exchanges: dict[str, list[Exchange]] = {}
+        for exchange in exchanges:
+            self._exchanges.setdefault(exchange.key, []).append(exchange)
+        self._next: Counter[str] = Counter()
+        self.served = 0
+        self.missing = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = _request_key(request.method, request.url)
+        recorded = self._exchanges.get(key)
+        if not recorded:
+            self.missing += 1
+            return httpx.Response(
+                404, json={"cod": "404", "message": "not in replay archive"}, request=request
+            )
+        exchange = recorded[self._next[key] % len(recorded)]
+        self._next[key] += 1
+        self.served += 1
+        if self.latency_scale > 0:
+            await self._sleep(exchange.elapsed * self.latency_scale)
+        if exchange.error is not None:
+            error = getattr(httpx, exchange.error, httpx.TransportError)
+            raise error(f"replayed {exchange.error}", request=request)
+        return httpx.Response(
+            exchange.status, headers=exchange.headers, content=exchange.body, request=request
+        )
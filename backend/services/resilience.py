@@ -0,0 +1,356 @@
+"""
+Circuit breakers and latency-budgeted retries for upstream calls.
+
+Each upstream endpoint gets a circuit breaker. After `failure_threshold`
+consecutive failures the circuit opens and calls fail immediately with
+CircuitOpenError; after `recovery_time` one probe call is let through
+(half-open), and its outcome closes or re-opens the circuit. Retries share
+one deadline per call, so a degraded upstream costs at most `deadline`
+seconds however many attempts or timeouts it takes.
+
+upstream_get is how the providers call upstream: one GET under the rate
+limiter, the endpoint's circuit and deadline, and optional hedging.
+"""
+
+import asyncio
+import enum
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from services.hedging import Hedger
+from services.metrics import Histogram
+from services.rate_limit import Priority, RateLimiter
+from services.timing import phase
+
+T = TypeVar("T")
+
+# Errors worth retrying: the request may not have reached upstream
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream endpoint whose circuit is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an upstream call runs out of its latency budget."""
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether an error indicates an unhealthy upstream (not a bad request)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one upstream endpoint."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_time: Seconds the circuit stays open before a probe
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def failures(self) -> int:
+        """Consecutive failures since the last success."""
+        return self._failures
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.recovery_time
+        ):
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Admit a call, or fail fast.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                probe already in flight
+        """
+        state = self.state
+        if state is CircuitState.OPEN or (state is CircuitState.HALF_OPEN and self._probing):
+            raise CircuitOpenError("Upstream circuit open")
+        if state is CircuitState.HALF_OPEN:
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = CircuitState.OPEN
+            self._opened_at = self._clock()
+        self._probing = False
+
+    def record_neutral(self) -> None:
+        """End a call whose outcome says nothing about upstream health."""
+        self._probing = False
+
+
+@dataclass
+class CircuitStats:
+    """State of one endpoint's circuit."""
+
+    state: str
+    failures: int
+
+
+@dataclass
+class UpstreamCallStats:
+    """Attempt latency and outcome counters for one endpoint."""
+
+    latency: Histogram = field(default_factory=Histogram)
+    calls: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    deadline_exceeded: int = 0
+    errors: int = 0
+    rejected: int = 0
+
+
+class UpstreamPolicy:
+    """
+    Breakers and retry budget shared by the services calling one upstream.
+
+    `call` runs a request function with a per-attempt timeout equal to the
+    time left in the deadline, retrying transient errors with exponential
+    backoff while time remains. The timeout is passed to the request, and
+    also enforced around it: httpx applies its timeout to each phase
+    (connect, each read) separately, so a slowly sent body could otherwise
+    outlast the deadline.
+    """
+
+    def __init__(
+        self,
+        deadline: float = 10.0,
+        attempts: int = 3,
+        backoff: float = 0.25,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Args:
+            deadline: Total seconds a call may take, across all attempts
+            attempts: Maximum attempts per call
+            backoff: Initial delay between attempts, doubled after each
+            failure_threshold: Consecutive failures that open a circuit
+            recovery_time: Seconds a circuit stays open before a probe
+            clock: Monotonic time source (injectable for tests)
+            sleep: Coroutine function used to back off (injectable for tests)
+        """
+        self.deadline = deadline
+        self.attempts = attempts
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._clock = clock
+        self._sleep = sleep
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._calls: dict[str, UpstreamCallStats] = {}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(
+                self.failure_threshold, self.recovery_time, self._clock
+            )
+        return self._breakers[endpoint]
+
+    async def call(
+        self,
+        endpoint: str,
+        request: Callable[[float], Awaitable[T]],
+        before_attempt: Callable[[], Awaitable[None]] | None = None,
+    ) -> T:
+        """
+        Call an upstream endpoint within the deadline.
+
+        Args:
+            endpoint: Name of the endpoint, one circuit per name
+            request: Coroutine function performing one attempt, given the
+                seconds left as its timeout
+            before_attempt: Optional coroutine function awaited before each
+                attempt once the circuit admits it (e.g. a rate limiter);
+                time it takes counts against the deadline
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open
+            DeadlineExceeded: If the deadline passes before an attempt succeeds
+        """
+        breaker = self.breaker(endpoint)
+        stats = self._calls.get(endpoint)
+        if stats is None:
+            stats = self._calls[endpoint] = UpstreamCallStats()
+        stats.calls += 1
+        try:
+            return await self._call(endpoint, breaker, stats, request, before_attempt)
+        except CircuitOpenError:
+            stats.rejected += 1
+            raise
+        except DeadlineExceeded:
+            stats.deadline_exceeded += 1
+            stats.errors += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+
+    async def _call(
+        self,
+        endpoint: str,
+        breaker: CircuitBreaker,
+        stats: UpstreamCallStats,
+        request: Callable[[float], Awaitable[T]],
+        before_attempt: Callable[[], Awaitable[None]] | None,
+    ) -> T:
+        deadline = self._clock() + self.deadline
+        delay = self.backoff
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                if before_attempt is not None:
+                    await before_attempt()
+                started = self._clock()
+                remaining = deadline - started
+                if remaining <= 0:
+                    raise DeadlineExceeded(
+                        f"Upstream {endpoint} exceeded {self.deadline:g}s budget"
+                    )
+                attempt_timeout = asyncio.timeout(remaining)
+                try:
+                    async with attempt_timeout:
+                        result = await request(remaining)
+                except TimeoutError as e:
+                    if not attempt_timeout.expired():
+                        raise
+                    # Handled like httpx's own timeouts: retried while time is left
+                    raise httpx.TimeoutException(
+                        f"Upstream {endpoint} attempt exceeded {remaining:.3g}s"
+                    ) from e
+                finally:
+                    stats.latency.observe(self._clock() - started)
+            except asyncio.CancelledError:
+                breaker.record_neutral()
+                raise
+            except Exception as e:
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_neutral()
+                if isinstance(e, httpx.TimeoutException):
+                    stats.timeouts += 1
+                if not isinstance(e, RETRYABLE_ERRORS) or attempt == self.attempts:
+                    raise
+                if deadline - self._clock() <= delay:
+                    raise DeadlineExceeded(
+                        f"Upstream {endpoint} failed within {self.deadline:g}s budget: {e}"
+                    ) from e
+                stats.retries += 1
+                with phase("backoff"):
+                    await self._sleep(delay)
+                delay *= 2
+            else:
+                breaker.record_success()
+                return result
+
+    @property
+    def call_stats(self) -> dict[str, UpstreamCallStats]:
+        """Latency and outcome counters per endpoint (live, not copies)."""
+        return dict(self._calls)
+
+    @property
+    def stats(self) -> dict[str, CircuitStats]:
+        return {
+            endpoint: CircuitStats(state=breaker.state.value, failures=breaker.failures)
+            for endpoint, breaker in self._breakers.items()
+        }
+
+
+async def upstream_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict,
+    policy: UpstreamPolicy,
+    rate_limiter: RateLimiter | None = None,
+    hedger: Hedger | None = None,
+    timeout: float = 10.0,
+) -> httpx.Response:
+    """
+    GET an upstream endpoint under the rate limiter, circuit breaker and deadline.
+
+    Args:
+        client: HTTP client to send the request with
+        url: Full upstream URL; its path names the endpoint's circuit
+        params: Query parameters
+        policy: Circuit breakers and retry deadline
+        rate_limiter: Optional quota limiter, acquired before each attempt at
+            the current task's priority
+        hedger: Optional hedging of slow attempts
+        timeout: Longest any single request may take, within the deadline
+
+    Returns:
+        The successful response
+
+    Raises:
+        httpx.HTTPStatusError: If upstream answers with an error status
+    """
+    endpoint = httpx.URL(url).path
+
+    async def send(remaining: float) -> httpx.Response:
+        response = await client.get(url, params=params, timeout=min(remaining, timeout))
+        response.raise_for_status()
+        return response
+
+    async def acquire_hedge() -> None:
+        # Hedges are optional, so they only use budget background work may use
+        if rate_limiter is not None:
+            await rate_limiter.acquire(Priority.BACKGROUND)
+
+    async def attempt(remaining: float) -> httpx.Response:
+        if hedger is None:
+            return await send(remaining)
+        return await hedger.call(endpoint, send, remaining, before_hedge=acquire_hedge)
+
+    before_attempt = rate_limiter.acquire if rate_limiter is not None else None
+    with phase("upstream"):
+        return await policy.call(endpoint, attempt, before_attempt=before_attempt)
@@ -0,0 +1,356 @@
+"""
+Cache tier shared across worker processes.
+
+Each uvicorn worker has its own TTLCache, so without a shared tier every
+worker pays for its own upstream calls. A SharedCache keeps encoded entries
+in a CacheBackend that all workers can reach:
+
+- MemoryBackend: in-process LRU, for a single worker and for tests
+- SQLiteBackend: a WAL-mode database file shared by the workers on one host
+- RedisBackend: any server speaking the Redis protocol, shared across hosts
+
+Backends store bytes with an expiry; SharedCache adds freshness, encoding
+and stats on top, with the same `get_entry` semantics as TTLCache.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+from urllib.parse import urlsplit
+
+from services.cache import CacheStats
+from services.timing import phase
+
+logger = logging.getLogger(__name__)
+
+# Entries are prefixed with the wall-clock time they stay fresh until
+_HEADER = struct.Struct("<d")
+
+
+class CacheBackend(ABC):
+    """Byte store for a SharedCache. Entries disappear `ttl` seconds after set."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under key, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store value under key for `ttl` seconds."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU backend; entries are only shared within one process."""
+
+    def __init__(self, max_entries: int = 10_000, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Backend in a SQLite database in WAL mode, shared by processes on one host.
+
+    WAL lets workers read while another writes. Queries run one at a time on
+    a dedicated thread, so waiting up to `busy_timeout` for another
+    process's write lock, or purging expired rows every `purge_every`
+    writes, never stalls the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        busy_timeout: float = 0.1,
+        purge_every: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: Database file, created if missing
+            busy_timeout: Seconds to wait for another process's write lock
+            purge_every: Writes between purges of expired rows
+            clock: Wall-clock time source, shared by all processes
+        """
+        self.purge_every = purge_every
+        self._clock = clock
+        self._writes = 0
+        # Workers start together, so allow time to wait for each other's setup
+        self._db = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._db.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        # One thread owns the connection, which also serializes its queries
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._run(self._get, key, self._clock())
+
+    def _get(self, key: str, now: float) -> bytes | None:
+        row = self._db.execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._writes += 1
+        purge = self._writes % self.purge_every == 0
+        await self._run(self._set, key, value, self._clock(), ttl, purge)
+
+    def _set(self, key: str, value: bytes, now: float, ttl: float, purge: bool) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl),
+        )
+        if purge:
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    async def close(self) -> None:
+        await self._run(self._db.close)
+        self._executor.shutdown()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend on a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Speaks RESP over one connection, so no client library is needed.
+    Commands are serialized on the connection; a failed or timed-out command
+    drops it, and the next command reconnects.
+    """
+
+    def __init__(
+        self, host: str = "localhost", port: int = 6379, db: int = 0, timeout: float = 0.5
+    ):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            db: Database number selected on connect
+            timeout: Seconds to wait for a connection or a reply
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._command(b"GET", key.encode())
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._command(b"SET", key.encode(), value, b"PX", b"%d" % max(1, int(ttl * 1000)))
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._disconnect()
+
+    async def _command(self, *args: bytes) -> Any:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await asyncio.wait_for(self._connect(), self.timeout)
+                self._send(args)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_reply(), self.timeout)
+            except RedisError:
+                raise
+            except BaseException:
+                # The reply may be partly read, so the connection can't be reused
+                self._disconnect()
+                raise
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.db:
+            self._send((b"SELECT", b"%d" % self.db))
+            await self._writer.drain()
+            await self._read_reply()
+
+    def _send(self, args: tuple[bytes, ...]) -> None:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._writer.write(b"".join(parts))
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readuntil(b"\r\n")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RedisError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def open_backend(url: str) -> CacheBackend:
+    """
+    Open a cache backend from a URL.
+
+    Supported URLs are `memory://`, `sqlite:///path/to/cache.db` and
+    `redis://host:port/db`.
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    parts = urlsplit(url)
+    if parts.scheme == "memory":
+        return MemoryBackend()
+    if parts.scheme == "sqlite":
+        return SQLiteBackend(parts.path)
+    if parts.scheme == "redis":
+        return RedisBackend(
+            host=parts.hostname or "localhost",
+            port=parts.port or 6379,
+            db=int(parts.path.lstrip("/") or 0),
+        )
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+class SharedCache:
+    """
+    Cache tier stored in a CacheBackend.
+
+    Entries are fresh for `ttl` seconds and kept for a further `stale_ttl`,
+    as in TTLCache, but measured on the wall clock so every process agrees.
+    Backend errors are logged and treated as misses, so an unavailable
+    backend only costs upstream calls.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        encode: Callable[[Any], bytes] = bytes,
+        decode: Callable[[bytes], Any] = bytes,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            backend: Where entries are stored
+            namespace: Key prefix; bump it when the encoding changes
+            ttl: Seconds an entry is fresh
+            stale_ttl: Seconds an entry is kept after it expires
+            encode: Serializes a value to bytes
+            decode: Rebuilds a value from `encode`'s bytes
+            clock: Wall-clock time source
+        """
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._encode = encode
+        self._decode = decode
+        self._clock = clock
+        self._stats = CacheStats()
+
+    def _key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([self.namespace, *map(str, parts)])
+
+    async def get_entry(self, key: Hashable) -> tuple[Any, float] | None:
+        """
+        Return the cached value for key along with its staleness.
+
+        Returns:
+            Tuple of (value, seconds since expiry), where a negative
+            staleness means the entry is still fresh; None if missing, past
+            the stale window or unreadable
+        """
+        try:
+            with phase("cache"):
+                data = await self.backend.get(self._key(key))
+            if data is not None:
+                (fresh_until,) = _HEADER.unpack_from(data)
+                stale_for = self._clock() - fresh_until
+                if stale_for < self.stale_ttl:
+                    value = self._decode(data[_HEADER.size:])
+                    if stale_for < 0:
+                        self._stats.hits += 1
+                    else:
+                        self._stats.stale_hits += 1
+                    return value, stale_for
+        except Exception as e:
+            logger.warning("Shared cache read of %s failed: %s", key, e)
+        self._stats.misses += 1
+        return None
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key; failures are logged and ignored."""
+        data = _HEADER.pack(self._clock() + self.ttl) + self._encode(value)
+        try:
+            with phase("cache"):
+                await self.backend.set(self._key(key), data, self.ttl + self.stale_ttl)
+        except Exception as e:
+            logger.warning("Shared cache write of %s failed: %s", key, e)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            stale_hits=self._stats.stale_hits,
+            misses=self._stats.misses,
+        )
@@ -0,0 +1,120 @@
+"""
+Per-request phase timings, reported in a Server-Timing response header.
+
+ServerTimingMiddleware starts a RequestTimings for each HTTP request, and
+code on the request path wraps its phases in `phase(name)`. Outside a
+request (background refreshes, tests) `phase` records nothing.
+"""
+
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Timings of the request being served by the current task, if any
+request_timings: contextvars.ContextVar["RequestTimings | None"] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """Total seconds and count per phase of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, list] = {}
+        self.handler_returned: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.phases.get(name)
+        if entry is None:
+            self.phases[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def mark_handler_returned(self) -> None:
+        """Mark the end of the endpoint; the rest until the response is serialization."""
+        self.handler_returned = time.perf_counter()
+
+    def header(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        now = time.perf_counter()
+        if self.handler_returned is not None:
+            self.add("serialize", now - self.handler_returned)
+        metrics = []
+        for name, (seconds, count) in self.phases.items():
+            metric = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                metric += f';desc="{count}x"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={(now - self.started) * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+class phase:
+    """Context manager adding the time spent in its block to a request phase."""
+
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.timings = request_timings.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.started)
+
+
+def mark_handler_returned() -> None:
+    """Mark the end of the current request's endpoint, if timings are enabled."""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.mark_handler_returned()
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header to every HTTP response.
+
+    Phases shared by coalesced requests are reported on the request that
+    ran them; the others only report their total.
+    """
+
+    def __init__(self, app, log: bool = False):
+        """
+        Args:
+            app: ASGI application
+            log: Also log each request's timings
+        """
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                header = timings.header()
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", header.encode("latin-1")),
+                ]
+                if self.log:
+                    logger.info("%s %s %s", scope["method"], scope["path"], header)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
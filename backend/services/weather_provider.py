@@ -1,10 +1,26 @@
-from collections import defaultdict
-from datetime import datetime, timezone, timedelta
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from models.weather import CurrentWeather, DailyForecast, ForecastResponse
+from models.units import CANONICAL_UNITS, convert_current_weather, convert_forecast
+from models.weather import CurrentWeather, ForecastResponse
+from services.cache import CacheStats, TTLCache, snap_coords
+from services.forecast_aggregation import aggregate_daily
+from services.hedging import Hedger
+from services.prewarm import PopularityTracker
+from services import json_codec
+from services.rate_limit import Priority, RateLimiter, RateLimitExceeded, upstream_priority
+from services.resilience import UpstreamPolicy, upstream_get
+from services.shared_cache import CacheBackend, SharedCache
+from services.singleflight import SingleFlight
+from services.timing import phase, request_timings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 class WeatherProvider:
@@ -13,29 +29,246 @@ class WeatherProvider:
     BASE_URL = "https://api.openweathermap.org/data/2.5"
     TIMEOUT = 10.0
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        current_cache: TTLCache | None = None,
+        forecast_cache: TTLCache | None = None,
+        cache_grid: float = 0.01,
+        stale_while_revalidate: float = 0.0,
+        stale_if_error: float = 0.0,
+        batch_concurrency: int = 10,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        policy: UpstreamPolicy | None = None,
+        hedger: Hedger | None = None,
+        shared_cache: CacheBackend | None = None,
+        base_url: str | None = None,
+        popularity: PopularityTracker | None = None,
+    ):
+        """
+        Args:
+            api_key: OpenWeatherMap API key
+            current_cache: Optional cache for current weather
+            forecast_cache: Optional cache for forecasts
+            cache_grid: Grid cell size in degrees for cache keys
+            stale_while_revalidate: Seconds past expiry an entry is served
+                immediately while it is refreshed in the background
+            stale_if_error: Seconds past expiry an entry is served when the
+                upstream call fails
+            batch_concurrency: Maximum concurrent lookups in get_current_many
+            client: Shared HTTP client (e.g. UpstreamPool.client); it is not
+                closed by `close`
+            rate_limiter: Upstream quota limiter; background refreshes run at
+                background priority
+            policy: Circuit breakers and retry deadline for upstream calls
+            hedger: Optional hedging of slow upstream requests
+            shared_cache: Backend shared with other workers, consulted when
+                an entry is missing or stale in the local caches
+            base_url: Upstream API base URL, if not BASE_URL
+            popularity: Records each cached lookup, for pre-warming popular
+                entries (see `expires_in` and `refresh`)
+        """
         self.api_key = api_key
-        self._client: httpx.AsyncClient | None = None
+        self.base_url = base_url or self.BASE_URL
+        # A shared client is owned by whoever created it; otherwise one is
+        # created on first use and closed with the service
+        self._client = client
+        self._owns_client = client is None
+        self._rate_limiter = rate_limiter
+        self._policy = policy or UpstreamPolicy()
+        self._hedger = hedger
+        self._current_cache = current_cache
+        self._forecast_cache = forecast_cache
+        self._shared_current = _shared_tier(
+            shared_cache,
+            current_cache,
+            "weather.v1",
+            encode=lambda weather: weather.model_dump_json().encode(),
+            decode=CurrentWeather.model_validate_json,
+        )
+        self._shared_forecast = _shared_tier(
+            shared_cache,
+            forecast_cache,
+            "forecast.v1",
+            encode=lambda series: json_codec.dumps(series.data),
+            decode=lambda data: ForecastSeries(json_codec.loads(data)),
+        )
+        self._cache_grid = cache_grid
+        self._stale_while_revalidate = stale_while_revalidate
+        self._stale_if_error = stale_if_error
+        self._batch_concurrency = batch_concurrency
+        self._popularity = popularity
+        self._inflight = SingleFlight()
+        self._revalidations: set[asyncio.Task] = set()
 
     async def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
+        if self._owns_client and (self._client is None or self._client.is_closed):
             self._client = httpx.AsyncClient(timeout=self.TIMEOUT)
         return self._client
 
     async def close(self) -> None:
-        if self._client and not self._client.is_closed:
+        for task in self._revalidations:
+            task.cancel()
+        if self._owns_client and self._client and not self._client.is_closed:
             await self._client.aclose()
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=4),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-        reraise=True,
-    )
+    @property
+    def cache_stats(self) -> CacheStats | None:
+        """Hit/miss counters for the current-weather cache, if enabled."""
+        return self._current_cache.stats if self._current_cache is not None else None
+
+    @property
+    def forecast_cache_stats(self) -> CacheStats | None:
+        """Hit/miss counters for the forecast cache, if enabled."""
+        return self._forecast_cache.stats if self._forecast_cache is not None else None
+
+    @property
+    def shared_cache_stats(self) -> dict[str, CacheStats | None]:
+        """Hit/miss counters for the shared weather and forecast tiers, if enabled."""
+        return {
+            "weather": self._shared_current.stats if self._shared_current is not None else None,
+            "forecast": self._shared_forecast.stats if self._shared_forecast is not None else None,
+        }
+
+    async def _get_cached(
+        self,
+        cache: TTLCache,
+        key: Hashable,
+        load: Callable[[], Awaitable[T]],
+        shared: SharedCache | None = None,
+    ) -> T:
+        """
+        Serve key from cache with stale-while-revalidate and stale-if-error.
+
+        When the local entry is missing or stale, the shared tier is checked
+        for a fresher one (e.g. stored by another worker), which is copied
+        into the local cache. Fresh entries are returned directly. Entries within the
+        stale-while-revalidate window are returned immediately while `load`
+        refreshes them in the background. Otherwise `load` runs inline, and
+        if it fails an entry within the stale-if-error window is returned
+        instead of the error.
+        """
+        entry = cache.get_entry(key)
+        if shared is not None and (entry is None or entry[1] >= 0):
+            shared_entry = await shared.get_entry(key)
+            if shared_entry is not None and (entry is None or shared_entry[1] < entry[1]):
+                entry = shared_entry
+                cache.set(key, entry[0], ttl=-entry[1])
+        if entry is not None:
+            value, stale_for = entry
+            if stale_for < 0:
+                return value
+            if stale_for < self._stale_while_revalidate:
+                self._revalidate(key, load)
+                return value
+
+        try:
+            return await self._join(key, load)
+        except Exception:
+            if entry is not None and entry[1] < self._stale_if_error:
+                logger.warning("Serving stale %s after upstream error", key, exc_info=True)
+                return entry[0]
+            raise
+
+    async def _join(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run load for key, or join the load already in flight for it.
+
+        A flight runs at the priority of the caller that started it. If that
+        was a background refresh the rate limiter dropped, an interactive
+        caller that joined it loads again at its own priority instead of
+        failing with it.
+        """
+        try:
+            return await self._inflight.do(key, load)
+        except RateLimitExceeded as e:
+            interactive = upstream_priority.get() is Priority.INTERACTIVE
+            if e.priority is Priority.BACKGROUND and interactive:
+                return await self._inflight.do(key, load)
+            raise
+
+    def _revalidate(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> None:
+        task = asyncio.ensure_future(self._background_load(key, load))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidation_done)
+
+    async def _background_load(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        # The task runs in a copy of the caller's context, so this only
+        # lowers the priority of calls made by the refresh itself, and keeps
+        # its phases out of the request's timings
+        upstream_priority.set(Priority.BACKGROUND)
+        request_timings.set(None)
+        return await self._inflight.do(key, load)
+
+    def _revalidation_done(self, task: asyncio.Task) -> None:
+        self._revalidations.discard(task)
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.warning("Background refresh failed: %s", error)
+
+    def expires_in(self, key: tuple) -> float | None:
+        """Seconds until a current-weather or forecast cache entry expires, if cached."""
+        cache = self._current_cache if key[0] == "current" else self._forecast_cache
+        return cache.expires_in(key) if cache is not None else None
+
+    def fresh_for(self, kind: str, lat: float, lon: float) -> float:
+        """
+        Seconds the cached current weather or forecast for a location stays fresh.
+
+        Args:
+            kind: "current" or "forecast"
+            lat: Latitude
+            lon: Longitude
+
+        Returns:
+            Time left on the location's cache entry; 0 without a cache, or
+            once the entry is stale or gone
+        """
+        cache = self._current_cache if kind == "current" else self._forecast_cache
+        if cache is None:
+            return 0.0
+        expires_in = cache.expires_in((kind, *snap_coords(lat, lon, self._cache_grid)))
+        return max(expires_in or 0.0, 0.0)
+
+    async def refresh(self, key: tuple, lead_time: float = 0.0) -> bool:
+        """
+        Reload a current-weather or forecast cache entry as background work.
+
+        Another worker may already have reloaded the entry into the shared
+        tier. If that copy stays fresh for more than `lead_time` seconds it
+        is copied into the local cache instead of calling upstream.
+
+        Args:
+            key: Cache key, as tracked by the popularity tracker
+            lead_time: Seconds a shared entry must stay fresh to be used
+
+        Returns:
+            Whether upstream was called
+        """
+        kind, lat, lon = key
+        if kind == "current":
+            cache, shared, load = self._current_cache, self._shared_current, self._load_current
+        else:
+            cache, shared, load = self._forecast_cache, self._shared_forecast, self._load_forecast
+        if shared is not None:
+            entry = await shared.get_entry(key)
+            if entry is not None and -entry[1] > lead_time:
+                cache.set(key, entry[0], ttl=-entry[1])
+                return False
+        await self._background_load(key, lambda: load(key, lat, lon))
+        return True
+
     async def get_current(self, lat: float, lon: float, units: str = "metric") -> CurrentWeather:
         """
         Get current weather for a location.
 
+        Upstream data is always fetched in metric units and converted locally,
+        so every unit system shares one cache entry and upstream call. When a
+        cache is configured, coordinates are snapped to the cache grid so
+        nearby requests share one upstream call, and expired entries may be
+        served stale (see `_get_cached`). Concurrent identical requests are
+        coalesced into a single upstream call.
+
         Args:
             lat: Latitude
             lon: Longitude
@@ -44,27 +277,88 @@ class WeatherProvider:
         Returns:
             CurrentWeather object with normalized data
         """
-        client = await self._get_client()
-        response = await client.get(
-            f"{self.BASE_URL}/weather",
+        if self._current_cache is None:
+            key = ("current", lat, lon)
+            weather = await self._inflight.do(key, lambda: self._fetch_current(lat, lon))
+        else:
+            lat, lon = snap_coords(lat, lon, self._cache_grid)
+            key = ("current", lat, lon)
+            if self._popularity is not None:
+                self._popularity.record(key)
+            weather = await self._get_cached(
+                self._current_cache,
+                key,
+                lambda: self._load_current(key, lat, lon),
+                self._shared_current,
+            )
+        return convert_current_weather(weather, units)
+
+    async def _load_current(self, key: tuple, lat: float, lon: float) -> CurrentWeather:
+        weather = await self._fetch_current(lat, lon)
+        self._current_cache.set(key, weather)
+        if self._shared_current is not None:
+            await self._shared_current.set(key, weather)
+        return weather
+
+    async def get_current_many(
+        self,
+        locations: list[tuple[float, float]],
+        units: str = "metric",
+    ) -> list[CurrentWeather | Exception]:
+        """
+        Get current weather for many locations.
+
+        Duplicate locations are fetched once, and at most `batch_concurrency`
+        lookups run at a time so a large batch can't exhaust the connection
+        pool or the upstream quota in one burst. Cached locations resolve
+        without waiting on upstream calls.
+
+        Args:
+            locations: (lat, lon) pairs
+            units: Temperature units (metric, imperial, standard)
+
+        Returns:
+            One CurrentWeather or the raised exception per input location, in order
+        """
+        semaphore = asyncio.Semaphore(self._batch_concurrency)
+
+        async def fetch(lat: float, lon: float) -> CurrentWeather:
+            async with semaphore:
+                return await self.get_current(lat, lon, units=units)
+
+        unique = list(dict.fromkeys(locations))
+        results = await asyncio.gather(
+            *(fetch(lat, lon) for lat, lon in unique), return_exceptions=True
+        )
+        by_location = dict(zip(unique, results))
+        return [by_location[location] for location in locations]
+
+    async def _request(self, path: str, params: dict) -> httpx.Response:
+        """GET an upstream endpoint under the rate limiter, circuit breaker and deadline."""
+        return await upstream_get(
+            await self._get_client(),
+            f"{self.base_url}/{path}",
+            params,
+            self._policy,
+            rate_limiter=self._rate_limiter,
+            hedger=self._hedger,
+            timeout=self.TIMEOUT,
+        )
+
+    async def _fetch_current(self, lat: float, lon: float) -> CurrentWeather:
+        """Fetch current weather in canonical units from the upstream API."""
+        response = await self._request(
+            "weather",
             params={
                 "lat": lat,
                 "lon": lon,
-                "units": units,
+                "units": CANONICAL_UNITS,
                 "appid": self.api_key,
             },
         )
-        response.raise_for_status()
-        data = response.json()
-
-        return CurrentWeather.from_openweathermap(data)
+        with phase("parse"):
+            return CurrentWeather.from_openweathermap(json_codec.loads(response.content))
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=4),
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
-        reraise=True,
-    )
     async def get_forecast(
         self, lat: float, lon: float, days: int = 5, units: str = "metric"
     ) -> ForecastResponse:
@@ -72,6 +366,9 @@ class WeatherProvider:
         Get weather forecast for a location.
 
         Uses the free 5-day/3-hour forecast API and aggregates into daily forecasts.
+        The raw 3-hour series is fetched and cached once per location, and
+        every `days` value is derived from it. Unit conversion, caching, stale
+        serving and coalescing behave as in `get_current`.
 
         Args:
             lat: Latitude
@@ -82,44 +379,94 @@ class WeatherProvider:
         Returns:
             ForecastResponse with daily forecasts
         """
-        client = await self._get_client()
-        response = await client.get(
-            f"{self.BASE_URL}/forecast",
+        if self._forecast_cache is None:
+            key = ("forecast", lat, lon)
+            series = await self._inflight.do(key, lambda: self._fetch_forecast(lat, lon))
+        else:
+            lat, lon = snap_coords(lat, lon, self._cache_grid)
+            key = ("forecast", lat, lon)
+            if self._popularity is not None:
+                self._popularity.record(key)
+            series = await self._get_cached(
+                self._forecast_cache,
+                key,
+                lambda: self._load_forecast(key, lat, lon),
+                self._shared_forecast,
+            )
+        return convert_forecast(series.for_days(days), units)
+
+    async def _load_forecast(self, key: tuple, lat: float, lon: float) -> "ForecastSeries":
+        series = await self._fetch_forecast(lat, lon)
+        self._forecast_cache.set(key, series)
+        if self._shared_forecast is not None:
+            await self._shared_forecast.set(key, series)
+        return series
+
+    async def _fetch_forecast(self, lat: float, lon: float) -> "ForecastSeries":
+        """Fetch the raw 3-hour forecast series in canonical units."""
+        response = await self._request(
+            "forecast",
             params={
                 "lat": lat,
                 "lon": lon,
-                "units": units,
+                "units": CANONICAL_UNITS,
                 "appid": self.api_key,
             },
         )
-        response.raise_for_status()
-        data = response.json()
-
-        # Get timezone offset from API (seconds from UTC)
-        tz_offset_seconds = data["city"].get("timezone", 0)
-        location_tz = timezone(timedelta(seconds=tz_offset_seconds))
-
-        # Group 3-hour forecasts by date in the location's timezone
-        daily_items: dict[str, list[dict]] = defaultdict(list)
-        for item in data["list"]:
-            # Convert UTC timestamp to location's local time for grouping
-            dt_utc = datetime.fromtimestamp(item["dt"], tz=timezone.utc)
-            dt_local = dt_utc.astimezone(location_tz)
-            date_key = dt_local.strftime("%Y-%m-%d")
-            daily_items[date_key].append(item)
-
-        # Convert to daily forecasts
-        daily_forecasts: list[DailyForecast] = []
-        sorted_dates = sorted(daily_items.keys())[:days]
-
-        for date_key in sorted_dates:
-            items = daily_items[date_key]
-            date = datetime.strptime(date_key, "%Y-%m-%d").replace(tzinfo=location_tz)
-            daily_forecasts.append(DailyForecast.from_openweathermap_3h(items, date))
-
-        return ForecastResponse(
-            lat=data["city"]["coord"]["lat"],
-            lon=data["city"]["coord"]["lon"],
-            timezone=data["city"].get("timezone"),
-            daily=daily_forecasts,
-        )
+
+        with phase("parse"):
+            data = json_codec.loads(response.content)
+        return ForecastSeries(data)
+
+
+def _shared_tier(
+    backend: CacheBackend | None,
+    cache: TTLCache | None,
+    namespace: str,
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+) -> SharedCache | None:
+    """Build the shared tier behind a local cache, with the same freshness windows."""
+    if backend is None or cache is None:
+        return None
+    return SharedCache(backend, namespace, cache.ttl, cache.stale_ttl, encode, decode)
+
+
+class ForecastSeries:
+    """
+    Raw 5-day/3-hour forecast for one location.
+
+    Daily aggregation runs once, when the series is created (so malformed
+    payloads fail before they are cached), and the response for each `days`
+    value is memoized, so serving a different number of days never needs
+    another upstream call.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+        with phase("aggregate"):
+            self._daily = aggregate_daily(data["list"], data["city"].get("timezone", 0))
+        self._responses: dict[int, ForecastResponse] = {}
+        self._version: str | None = None
+
+    @property
+    def version(self) -> str:
+        """Digest of the upstream payload, the same in every worker that holds it."""
+        if self._version is None:
+            digest = hashlib.blake2b(json_codec.dumps(self.data), digest_size=12)
+            self._version = digest.hexdigest()
+        return self._version
+
+    def for_days(self, days: int) -> ForecastResponse:
+        """Return the forecast for the first `days` local days."""
+        if (response := self._responses.get(days)) is None:
+            city = self.data["city"]
+            response = ForecastResponse(
+                lat=city["coord"]["lat"],
+                lon=city["coord"]["lon"],
+                timezone=city.get("timezone"),
+                daily=self._daily[:days],
+            )
+            response._version = f"{self.version}:{days}"
+            self._responses[days] = response
+        return response
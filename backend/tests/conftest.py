@@ -36,10 +36,45 @@ def create_test_app(mock_geocoding_service, mock_weather_provider):
     return test_app
 
 
+class FakeClock:
+    """Manually advanced monotonic clock for cache expiry tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock():
+    """Create a manually advanced clock."""
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_sleep(fake_clock):
+    """Sleep that advances the fake clock instead of waiting."""
+    sleeps = []
+
+    async def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        fake_clock.now += seconds
+
+    sleep.calls = sleeps
+    return sleep
+
+
 @pytest.fixture
 def mock_geocoding_service():
     """Create a mock geocoding service."""
     service = AsyncMock(spec=GeocodingService)
+
+    async def search_entry(query, limit=5):
+        # Tests mock `search`; its results are not fresh for any time
+        return await service.search(query, limit=limit), 0.0
+
+    service.search_entry.side_effect = search_entry
     return service
 
 
@@ -47,6 +82,7 @@ def mock_geocoding_service():
 def mock_weather_provider():
     """Create a mock weather provider."""
     provider = AsyncMock(spec=WeatherProvider)
+    provider.fresh_for.return_value = 0.0
     return provider
 
 
@@ -1,10 +1,22 @@
 """Integration tests for API endpoints using FastAPI TestClient."""
 
+import asyncio
+import json
+
 import pytest
-from datetime import datetime
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from config import settings
 
 from models.geocoding import GeoLocation
 from models.weather import CurrentWeather, ForecastResponse, DailyForecast, WeatherCondition
+from services.compression import CompressionMiddleware
+from services.live import LiveWeatherHub
+from services.rate_limit import RateLimitExceeded
+from services.weather_provider import ForecastSeries
+from tests.conftest import create_test_app
 
 
 class TestHealthEndpoint:
@@ -69,6 +81,15 @@ class TestGeocodeEndpoint:
         assert response.status_code == 502
         assert "Geocoding service error" in response.json()["detail"]
 
+    def test_geocode_quota_exhausted(self, test_client, mock_geocoding_service):
+        """Test running out of upstream budget returns 503 with Retry-After."""
+        mock_geocoding_service.search.side_effect = RateLimitExceeded("limit", retry_after=0.2)
+
+        response = test_client.get("/api/geocode", params={"q": "Paris"})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
     def test_geocode_respects_limit(self, test_client, mock_geocoding_service):
         """Test geocode endpoint passes limit parameter."""
         mock_geocoding_service.search.return_value = []
@@ -158,6 +179,81 @@ class TestCurrentWeatherEndpoint:
         assert response.status_code == 502
         assert "Weather service error" in response.json()["detail"]
 
+    def test_current_weather_quota_exhausted(self, test_client, mock_weather_provider):
+        """Test running out of upstream budget returns 503 with Retry-After."""
+        mock_weather_provider.get_current.side_effect = RateLimitExceeded(
+            "limit", retry_after=12.5
+        )
+
+        response = test_client.get(
+            "/api/weather/current",
+            params={"lat": 48.8566, "lon": 2.3522},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "13"
+
+
+class TestCurrentWeatherBatchEndpoint:
+    """Tests for the /api/weather/current:batch endpoint."""
+
+    def test_batch_returns_per_item_results(self, test_client, mock_weather_provider):
+        """Test batch endpoint returns weather or an error for each location."""
+        weather = CurrentWeather(
+            location_name="Paris",
+            lat=48.8566,
+            lon=2.3522,
+            timestamp=datetime(2024, 1, 1, 12, 0, 0),
+            temp=20.5,
+            feels_like=19.8,
+            temp_min=18.0,
+            temp_max=22.0,
+            humidity=65,
+            pressure=1015,
+            wind_speed=3.5,
+            wind_deg=180,
+            clouds=0,
+            condition=WeatherCondition(id=800, main="Clear", description="clear sky", icon="01d"),
+        )
+        mock_weather_provider.get_current_many.return_value = [weather, Exception("API error")]
+
+        response = test_client.post(
+            "/api/weather/current:batch",
+            json={
+                "locations": [{"lat": 48.8566, "lon": 2.3522}, {"lat": 0, "lon": 0}],
+                "units": "imperial",
+            },
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["weather"]["location_name"] == "Paris"
+        assert results[0]["error"] is None
+        assert results[1]["weather"] is None
+        assert "API error" in results[1]["error"]
+        mock_weather_provider.get_current_many.assert_called_once_with(
+            [(48.8566, 2.3522), (0, 0)], units="imperial"
+        )
+
+    def test_batch_validates_coordinates(self, test_client):
+        """Test batch endpoint rejects out-of-range coordinates."""
+        response = test_client.post(
+            "/api/weather/current:batch",
+            json={"locations": [{"lat": 100, "lon": 0}]},
+        )
+        assert response.status_code == 422
+
+    def test_batch_rejects_empty_and_oversized(self, test_client):
+        """Test batch endpoint requires 1-200 locations."""
+        response = test_client.post("/api/weather/current:batch", json={"locations": []})
+        assert response.status_code == 422
+
+        response = test_client.post(
+            "/api/weather/current:batch",
+            json={"locations": [{"lat": 0, "lon": 0}] * 201},
+        )
+        assert response.status_code == 422
+
 
 class TestForecastEndpoint:
     """Tests for the /api/weather/forecast endpoint."""
@@ -233,3 +329,459 @@ class TestForecastEndpoint:
 
         assert response.status_code == 502
         assert "Weather service error" in response.json()["detail"]
+
+
+class TestBundleEndpoint:
+    """Tests for the /api/weather/bundle endpoint."""
+
+    @pytest.fixture
+    def sample_current_weather(self):
+        """Sample CurrentWeather object."""
+        return CurrentWeather(
+            location_name="Paris",
+            lat=48.8566,
+            lon=2.3522,
+            timestamp=datetime(2024, 1, 1, 12, 0, 0),
+            temp=20.5,
+            feels_like=19.8,
+            temp_min=18.0,
+            temp_max=22.0,
+            humidity=65,
+            pressure=1015,
+            wind_speed=3.5,
+            wind_deg=180,
+            clouds=0,
+            condition=WeatherCondition(id=800, main="Clear", description="clear sky", icon="01d"),
+        )
+
+    @pytest.fixture
+    def sample_forecast(self):
+        """Sample ForecastResponse object."""
+        return ForecastResponse(lat=48.8566, lon=2.3522, timezone=3600, daily=[])
+
+    def test_bundle_returns_current_and_forecast(
+        self, test_client, mock_weather_provider, sample_current_weather, sample_forecast
+    ):
+        """Test bundle endpoint returns both payloads."""
+        mock_weather_provider.get_current.return_value = sample_current_weather
+        mock_weather_provider.get_forecast.return_value = sample_forecast
+
+        response = test_client.get(
+            "/api/weather/bundle",
+            params={"lat": 48.8566, "lon": 2.3522, "days": 3, "units": "imperial"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["current"]["location_name"] == "Paris"
+        assert data["forecast"]["timezone"] == 3600
+        mock_weather_provider.get_current.assert_called_once_with(48.8566, 2.3522, units="imperial")
+        mock_weather_provider.get_forecast.assert_called_once_with(
+            48.8566, 2.3522, days=3, units="imperial"
+        )
+
+    def test_bundle_service_error(self, test_client, mock_weather_provider, sample_forecast):
+        """Test bundle endpoint returns 502 if either fetch fails."""
+        mock_weather_provider.get_current.side_effect = Exception("API error")
+        mock_weather_provider.get_forecast.return_value = sample_forecast
+
+        response = test_client.get(
+            "/api/weather/bundle",
+            params={"lat": 48.8566, "lon": 2.3522},
+        )
+
+        assert response.status_code == 502
+        assert "Weather service error" in response.json()["detail"]
+
+
+class TestFastJSONResponses:
+    """Tests for the opt-in direct model serialization path."""
+
+    @pytest.fixture
+    def sample_forecast(self):
+        """Sample ForecastResponse object with timezone-aware dates."""
+        return ForecastResponse(
+            lat=48.8566,
+            lon=2.3522,
+            timezone=3600,
+            daily=[
+                DailyForecast(
+                    date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    temp_day=20.0,
+                    temp_min=15.0,
+                    temp_max=25.0,
+                    temp_night=16.0,
+                    feels_like_day=19.0,
+                    humidity=60,
+                    wind_speed=3.0,
+                    wind_deg=180,
+                    clouds=10,
+                    pop=0.2,
+                    rain=1.5,
+                    condition=WeatherCondition(
+                        id=500, main="Rain", description="light rain", icon="10d"
+                    ),
+                )
+            ],
+        )
+
+    def test_forecast_body_identical(self, test_client, mock_weather_provider, sample_forecast, monkeypatch):
+        """Test the fast path returns the same JSON as the default path."""
+        mock_weather_provider.get_forecast.return_value = sample_forecast
+        params = {"lat": 48.8566, "lon": 2.3522}
+
+        default = test_client.get("/api/weather/forecast", params=params)
+        monkeypatch.setattr(settings, "fast_json_responses", True)
+        fast = test_client.get("/api/weather/forecast", params=params)
+
+        assert fast.status_code == 200
+        assert fast.headers["content-type"] == "application/json"
+        assert fast.json() == default.json()
+
+    def test_geocode_body_identical(self, test_client, mock_geocoding_service, monkeypatch):
+        """Test the fast path works for geocoding, including non-ASCII names."""
+        mock_geocoding_service.search.return_value = [
+            GeoLocation(
+                name="São Paulo",
+                lat=-23.5475,
+                lon=-46.63611,
+                country="BR",
+                state="São Paulo",
+                display_name="São Paulo, São Paulo, BR",
+            )
+        ]
+
+        default = test_client.get("/api/geocode", params={"q": "Sao"})
+        monkeypatch.setattr(settings, "fast_json_responses", True)
+        fast = test_client.get("/api/geocode", params={"q": "Sao"})
+
+        assert fast.json() == default.json()
+        assert fast.json()["results"][0]["name"] == "São Paulo"
+
+    def test_errors_unchanged(self, test_client, mock_weather_provider, monkeypatch):
+        """Test service errors still map to 502 on the fast path."""
+        monkeypatch.setattr(settings, "fast_json_responses", True)
+        mock_weather_provider.get_current.side_effect = Exception("API error")
+
+        response = test_client.get("/api/weather/current", params={"lat": 0, "lon": 0})
+
+        assert response.status_code == 502
+
+
+class TestConditionalRequests:
+    """Tests for ETag, Cache-Control and 304 responses."""
+
+    @pytest.fixture
+    def sample_current_weather(self):
+        """Sample CurrentWeather object."""
+        return CurrentWeather(
+            location_name="Paris",
+            lat=48.8566,
+            lon=2.3522,
+            timestamp=datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+            temp=20.5,
+            feels_like=19.8,
+            temp_min=18.0,
+            temp_max=22.0,
+            humidity=65,
+            pressure=1015,
+            wind_speed=3.5,
+            wind_deg=180,
+            clouds=0,
+            condition=WeatherCondition(id=800, main="Clear", description="clear sky", icon="01d"),
+        )
+
+    @pytest.mark.parametrize("fast_json", [False, True])
+    def test_revalidation_returns_304(
+        self, test_client, mock_weather_provider, sample_current_weather, monkeypatch, fast_json
+    ):
+        """Test a matching If-None-Match gets an empty 304 with the same validators."""
+        monkeypatch.setattr(settings, "fast_json_responses", fast_json)
+        mock_weather_provider.get_current.return_value = sample_current_weather
+        mock_weather_provider.fresh_for.return_value = 120.5
+        params = {"lat": 48.8566, "lon": 2.3522}
+
+        first = test_client.get("/api/weather/current", params=params)
+        etag = first.headers["etag"]
+        second = test_client.get(
+            "/api/weather/current", params=params, headers={"If-None-Match": f'W/"x", {etag}'}
+        )
+
+        assert first.status_code == 200
+        # Cacheable for as long as the server's cache entry has left
+        assert first.headers["cache-control"] == (
+            "public, max-age=120, "
+            f"stale-while-revalidate={int(settings.weather_cache_stale_while_revalidate)}"
+        )
+        mock_weather_provider.fresh_for.assert_called_with("current", 48.8566, 2.3522)
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+    def test_etag_follows_observation_and_units(
+        self, test_client, mock_weather_provider, sample_current_weather
+    ):
+        """Test the ETag changes with the upstream observation and the units."""
+        params = {"lat": 48.8566, "lon": 2.3522}
+        mock_weather_provider.get_current.return_value = sample_current_weather
+        metric = test_client.get("/api/weather/current", params=params).headers["etag"]
+        imperial = test_client.get(
+            "/api/weather/current", params={**params, "units": "imperial"}
+        ).headers["etag"]
+        mock_weather_provider.get_current.return_value = sample_current_weather.model_copy(
+            update={"timestamp": datetime(2024, 1, 1, 12, 10, tzinfo=timezone.utc)}
+        )
+        newer = test_client.get("/api/weather/current", params=params).headers["etag"]
+
+        assert len({metric, imperial, newer}) == 3
+
+    def test_forecast_etag_from_upstream_payload(
+        self, test_client, mock_weather_provider, sample_forecast_response
+    ):
+        """Test forecast ETags identify the upstream payload and day count."""
+        params = {"lat": 48.8566, "lon": 2.3522}
+        series = ForecastSeries(sample_forecast_response)
+        mock_weather_provider.get_forecast.return_value = series.for_days(5)
+        etag = test_client.get("/api/weather/forecast", params=params).headers["etag"]
+
+        # The same payload fetched again, e.g. by another worker, has the same ETag
+        mock_weather_provider.get_forecast.return_value = ForecastSeries(
+            sample_forecast_response
+        ).for_days(5)
+        revalidated = test_client.get(
+            "/api/weather/forecast", params=params, headers={"If-None-Match": etag}
+        )
+        mock_weather_provider.get_forecast.return_value = series.for_days(1)
+        one_day = test_client.get("/api/weather/forecast", params={**params, "days": 1})
+
+        assert revalidated.status_code == 304
+        assert one_day.headers["etag"] != etag
+
+    def test_geocode_validators(self, test_client, mock_geocoding_service):
+        """Test geocoding results are cacheable for as long as the service keeps them fresh."""
+        mock_geocoding_service.search_entry.side_effect = lambda q, limit: ([], 3600.0)
+
+        first = test_client.get("/api/geocode", params={"q": "nowhere"})
+        second = test_client.get(
+            "/api/geocode", params={"q": "nowhere"}, headers={"If-None-Match": first.headers["etag"]}
+        )
+
+        assert first.headers["cache-control"] == "public, max-age=3600"
+        assert second.status_code == 304
+
+    def test_uncached_results_revalidated(self, test_client, mock_geocoding_service):
+        """Test results no cache keeps fresh must be revalidated before reuse."""
+        mock_geocoding_service.search.return_value = []
+
+        response = test_client.get("/api/geocode", params={"q": "nowhere"})
+
+        assert response.headers["cache-control"] == "no-cache"
+        assert "etag" in response.headers
+
+    def test_bundle_fresh_while_both_parts_are(
+        self, test_client, mock_weather_provider, sample_current_weather, sample_forecast_response
+    ):
+        """Test a bundle is only cacheable for as long as both of its parts."""
+        mock_weather_provider.get_current.return_value = sample_current_weather
+        mock_weather_provider.get_forecast.return_value = ForecastSeries(
+            sample_forecast_response
+        ).for_days(5)
+        mock_weather_provider.fresh_for.side_effect = lambda kind, lat, lon: (
+            250.0 if kind == "current" else 1500.0
+        )
+
+        response = test_client.get("/api/weather/bundle", params={"lat": 48.8566, "lon": 2.3522})
+
+        assert response.headers["cache-control"].startswith("public, max-age=250,")
+
+    @pytest.mark.parametrize("encoding", ["gzip", "identity"])
+    def test_revalidation_after_compressed_response(
+        self,
+        mock_geocoding_service,
+        mock_weather_provider,
+        sample_forecast_response,
+        encoding,
+    ):
+        """Test the ETag of a compressed response revalidates, whatever the later encoding."""
+        app = create_test_app(mock_geocoding_service, mock_weather_provider)
+        app.add_middleware(CompressionMiddleware, minimum_size=0)
+        mock_weather_provider.get_forecast.return_value = ForecastSeries(
+            sample_forecast_response
+        ).for_days(5)
+        params = {"lat": 48.8566, "lon": 2.3522}
+
+        with TestClient(app) as client:
+            compressed = client.get(
+                "/api/weather/forecast", params=params, headers={"Accept-Encoding": "gzip"}
+            )
+            revalidated = client.get(
+                "/api/weather/forecast",
+                params=params,
+                headers={"Accept-Encoding": encoding, "If-None-Match": compressed.headers["etag"]},
+            )
+
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == compressed.headers["etag"]
+
+    def test_errors_not_cacheable(self, test_client, mock_weather_provider):
+        """Test failed lookups carry no validators."""
+        mock_weather_provider.get_current.side_effect = Exception("API error")
+
+        response = test_client.get("/api/weather/current", params={"lat": 0, "lon": 0})
+
+        assert response.status_code == 502
+        assert "etag" not in response.headers
+
+
+class TestFieldSelection:
+    """Tests for projecting responses with `fields=`."""
+
+    @pytest.fixture
+    def forecast(self, sample_forecast_response):
+        return ForecastSeries(sample_forecast_response).for_days(5)
+
+    def test_projects_nested_fields(self, test_client, mock_weather_provider, forecast):
+        """Test only the selected fields of every daily forecast are returned."""
+        mock_weather_provider.get_forecast.return_value = forecast
+
+        response = test_client.get(
+            "/api/weather/forecast",
+            params={"lat": 48.8566, "lon": 2.3522, "fields": "daily.temp_max,daily.condition.icon"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data) == ["daily"]
+        assert data["daily"][0] == {
+            "temp_max": forecast.daily[0].temp_max,
+            "condition": {"icon": forecast.daily[0].condition.icon},
+        }
+
+    def test_projection_changes_etag(self, test_client, mock_weather_provider, forecast):
+        """Test projected responses have their own validators."""
+        mock_weather_provider.get_forecast.return_value = forecast
+        params = {"lat": 48.8566, "lon": 2.3522}
+
+        full = test_client.get("/api/weather/forecast", params=params).headers["etag"]
+        projected = test_client.get(
+            "/api/weather/forecast", params={**params, "fields": "daily.date"}
+        ).headers["etag"]
+        reordered = test_client.get(
+            "/api/weather/forecast", params={**params, "fields": "daily.date,daily.date"}
+        ).headers["etag"]
+
+        assert full != projected
+        assert projected == reordered
+
+    @pytest.mark.parametrize("fields", ["nope", "lat.value", "daily.nope", ","])
+    def test_rejects_unknown_fields(self, test_client, mock_weather_provider, fields):
+        """Test invalid selections fail before any upstream call."""
+        response = test_client.get(
+            "/api/weather/forecast", params={"lat": 0, "lon": 0, "fields": fields}
+        )
+
+        assert response.status_code == 422
+        mock_weather_provider.get_forecast.assert_not_called()
+
+    def test_batch_projection(self, test_client, mock_weather_provider):
+        """Test batch results can be projected too."""
+        mock_weather_provider.get_current_many.return_value = [Exception("boom")]
+
+        response = test_client.post(
+            "/api/weather/current:batch",
+            params={"fields": "results.error"},
+            json={"locations": [{"lat": 1, "lon": 2}]},
+        )
+
+        assert response.json() == {"results": [{"error": "Weather service error: boom"}]}
+
+
+async def read_stream(app, path: str, query: str, chunks: int) -> tuple[dict, list[str]]:
+    """Call an ASGI app and disconnect once it has sent the given number of body chunks."""
+    start, bodies = {}, []
+    enough = asyncio.Event()
+
+    async def receive():
+        await enough.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message.get("body"):
+            bodies.append(message["body"].decode())
+            if len(bodies) == chunks:
+                enough.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"testserver")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return start, bodies
+
+
+class TestLiveWeather:
+    """Tests for streaming current weather as server-sent events."""
+
+    def test_disabled(self, test_client):
+        """Test the stream is unavailable without a live weather hub."""
+        response = test_client.get("/api/weather/live", params={"lat": 1, "lon": 2})
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_streams_projected_observation(self, test_client, mock_weather_provider):
+        """Test subscribers get the current observation and are dropped on disconnect."""
+        mock_weather_provider.get_current.return_value = CurrentWeather(
+            location_name="Paris",
+            lat=48.8566,
+            lon=2.3522,
+            timestamp=datetime(2024, 1, 1, 12, 0, 0),
+            temp=20.5,
+            feels_like=19.8,
+            temp_min=18.0,
+            temp_max=22.0,
+            humidity=65,
+            pressure=1015,
+            wind_speed=3.5,
+            wind_deg=180,
+            clouds=0,
+            condition=WeatherCondition(id=800, main="Clear", description="clear sky", icon="01d"),
+        )
+        hub = LiveWeatherHub(mock_weather_provider, interval=3600)
+        test_client.app.state.live_weather = hub
+
+        start, events = await read_stream(
+            test_client.app, "/api/weather/live", "lat=48.8566&lon=2.3522&fields=temp", 1
+        )
+
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+        event, data = events[0].strip().split("\n")
+        assert event == "event: current"
+        assert json.loads(data.removeprefix("data: ")) == {"temp": 20.5}
+        assert hub.stats.subscribers == 0
+        await hub.close()
+
+    def test_too_many_subscribers(self, test_client, mock_weather_provider):
+        """Test clients past the subscriber limit are told to retry later."""
+        test_client.app.state.live_weather = LiveWeatherHub(
+            mock_weather_provider, max_subscribers=0
+        )
+
+        response = test_client.get("/api/weather/live", params={"lat": 1, "lon": 2})
+
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
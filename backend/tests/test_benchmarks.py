@@ -0,0 +1,31 @@
+"""Smoke tests for the benchmark scripts."""
+
+import importlib
+import sys
+
+import pytest
+
+from config import settings
+
+
+class TestBenchmarks:
+    """Test each benchmark's main runs end to end against the current app."""
+
+    @pytest.mark.parametrize(
+        "module, args",
+        [
+            ("benchmarks.bench_forecast_aggregation", ["--batch", "2", "--repeat", "1"]),
+            ("benchmarks.bench_hedging", ["--calls", "20"]),
+            ("benchmarks.bench_json_pipeline", ["--requests", "2"]),
+            ("benchmarks.load_test", ["--requests", "8", "--concurrency", "2"]),
+        ],
+    )
+    def test_main_runs(self, module, args, monkeypatch, capsys):
+        """Test the benchmark completes a short run and reports results."""
+        # Restored afterwards, since the JSON benchmark toggles it
+        monkeypatch.setattr(settings, "fast_json_responses", settings.fast_json_responses)
+        monkeypatch.setattr(sys, "argv", [module, *args])
+
+        importlib.import_module(module).main()
+
+        assert capsys.readouterr().out.strip()
@@ -0,0 +1,152 @@
+"""Tests for negotiated response compression."""
+
+import asyncio
+import gzip
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from services.compression import CompressionMiddleware, choose_encoding
+
+
+class TestChooseEncoding:
+    """Tests for Accept-Encoding negotiation."""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("*", "br"),
+            ("*;q=0.5, br;q=0", "gzip"),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_ranks_by_q_value(self, header, expected):
+        """Test the client's preferences decide, ties going to the server's order."""
+        assert choose_encoding(header, ("br", "gzip")) == expected
+
+
+class TestCompressionMiddleware:
+    """Tests for compressing response bodies."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+        @app.get("/big")
+        async def big():
+            return JSONResponse({"data": "x" * 500}, headers={"ETag": '"abc"'})
+
+        @app.get("/small")
+        async def small():
+            return {"data": "x"}
+
+        @app.get("/stream")
+        async def stream():
+            async def chunks():
+                yield "data: " + "x" * 500 + "\n\n"
+                yield "data: end\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        @app.get("/binary")
+        async def binary():
+            return PlainTextResponse("x" * 500, media_type="image/png")
+
+        @app.get("/not-modified")
+        async def not_modified():
+            return Response(status_code=304, headers={"ETag": '"abc"'})
+
+        return TestClient(app)
+
+    def test_compresses_large_json(self, client):
+        """Test large JSON bodies are gzipped with a weakened ETag."""
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"abc"'
+        assert int(response.headers["content-length"]) < 100
+        assert response.json() == {"data": "x" * 500}
+
+    @pytest.mark.parametrize(
+        "path, accept_encoding",
+        [
+            ("/small", "gzip"),
+            ("/stream", "gzip"),
+            ("/binary", "gzip"),
+            ("/big", "identity"),
+        ],
+    )
+    def test_passes_through(self, client, path, accept_encoding):
+        """Test small, streamed and non-text bodies, and unwilling clients, get no encoding."""
+        response = client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.parametrize(
+        "path, headers",
+        [
+            ("/small", {"Accept-Encoding": "gzip"}),
+            ("/big", {"Accept-Encoding": "identity"}),
+            ("/big", {"Accept-Encoding": ""}),
+            ("/not-modified", {"Accept-Encoding": "gzip"}),
+        ],
+    )
+    def test_uncompressed_eligible_responses_vary(self, client, path, headers):
+        """Test responses that could have been compressed say they vary by Accept-Encoding."""
+        response = client.get(path, headers=headers)
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    @pytest.mark.parametrize("path", ["/stream", "/binary"])
+    def test_ineligible_responses_do_not_vary(self, client, path):
+        """Test streamed and non-text responses don't vary by Accept-Encoding."""
+        assert "vary" not in client.get(path, headers={"Accept-Encoding": "gzip"}).headers
+
+    @pytest.mark.asyncio
+    async def test_stream_starts_immediately(self):
+        """Test a streamed response's headers are sent before its first chunk."""
+        first_chunk = asyncio.Event()
+        sent = []
+
+        async def app(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")],
+                }
+            )
+            await first_chunk.wait()
+            await send({"type": "http.response.body", "body": b"data: x\n\n", "more_body": True})
+
+        async def send(message):
+            sent.append(message["type"])
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        task = asyncio.create_task(CompressionMiddleware(app)(scope, None, send))
+        await asyncio.sleep(0)
+
+        assert sent == ["http.response.start"]
+        first_chunk.set()
+        await task
+        assert sent == ["http.response.start", "http.response.body"]
+
+    def test_raw_gzip_body(self, client):
+        """Test the body on the wire is valid gzip, identical for identical bodies."""
+        bodies = []
+        for _ in range(2):
+            with client.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as response:
+                bodies.append(b"".join(response.iter_raw()))
+
+        assert gzip.decompress(bodies[0]).startswith(b'{"data":"xxx')
+        assert bodies[0] == bodies[1]
@@ -0,0 +1,56 @@
+"""Smoke tests for the application lifespan."""
+
+import pytest
+import respx
+from fastapi.testclient import TestClient
+from httpx import Response
+
+import main
+from config import settings
+
+
+@pytest.fixture
+def upstream():
+    """Mock the upstream API; any request that isn't mocked fails the test."""
+    with respx.mock(base_url=settings.openweathermap_url) as mock:
+        yield mock
+
+
+class TestLifespan:
+    """Test starting and stopping the real application."""
+
+    def test_starts_without_api_key(self, monkeypatch, upstream):
+        """Test startup without an API key makes no upstream requests."""
+        monkeypatch.setattr(settings, "openweathermap_api_key", "")
+        monkeypatch.setattr(settings, "upstream_prewarm_connections", 2)
+
+        with TestClient(main.app) as client:
+            response = client.get("/health")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["upstream_pool"]["requests"] == 0
+        assert data["upstream_pool"]["connections"] == 0
+        assert "rate_limit" in data
+        assert not upstream.calls
+
+    def test_prewarms_with_api_key(self, monkeypatch, upstream):
+        """Test startup with an API key opens connections to the configured host."""
+        monkeypatch.setattr(settings, "openweathermap_api_key", "test-api-key")
+        monkeypatch.setattr(settings, "upstream_prewarm_connections", 1)
+        route = upstream.head("/").mock(return_value=Response(401))
+
+        with TestClient(main.app) as client:
+            assert client.get("/health").status_code == 200
+
+        assert route.call_count == 1
+
+    def test_no_prewarm_by_default(self, monkeypatch, upstream):
+        """Test the default settings don't reach out at startup even with a key."""
+        monkeypatch.setattr(settings, "openweathermap_api_key", "test-api-key")
+
+        with TestClient(main.app):
+            pass
+
+        assert not upstream.calls
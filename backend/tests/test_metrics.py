@@ -0,0 +1,191 @@
+"""Tests for in-process metrics and the /metrics endpoint."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import metrics_router, weather_router
+from services.cache import TTLCache
+from services.metrics import (
+    Histogram,
+    MetricFamily,
+    MetricsMiddleware,
+    RequestMetrics,
+    render,
+)
+from services.rate_limit import RateLimiter
+from services.resilience import UpstreamPolicy
+
+
+class TestHistogram:
+    """Tests for Histogram buckets."""
+
+    def test_cumulative_buckets(self):
+        """Test observations land in the first bucket at or above them."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(5.65)
+
+
+class TestRender:
+    """Tests for the text exposition format."""
+
+    def test_render_histogram(self):
+        """Test histograms render buckets, sum and count with labels."""
+        histogram = Histogram(buckets=(0.5,))
+        histogram.observe(0.25)
+        family = MetricFamily("latency_seconds", "histogram", "Latency")
+        family.add_histogram(histogram, route="/a")
+
+        assert render([family]) == (
+            "# HELP latency_seconds Latency\n"
+            "# TYPE latency_seconds histogram\n"
+            'latency_seconds_bucket{route="/a",le="0.5"} 1\n'
+            'latency_seconds_bucket{route="/a",le="+Inf"} 1\n'
+            'latency_seconds_sum{route="/a"} 0.25\n'
+            'latency_seconds_count{route="/a"} 1\n'
+        )
+
+    def test_escapes_label_values(self):
+        """Test quotes and backslashes in label values are escaped."""
+        family = MetricFamily("things_total", "counter", "Things")
+        family.add(1, name='a "b" \\c')
+
+        assert 'things_total{name="a \\"b\\" \\\\c"} 1' in render([family])
+
+
+class TestMetricsMiddleware:
+    """Tests for per-route request metrics."""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+        app.state.request_metrics = RequestMetrics()
+        app.add_middleware(MetricsMiddleware, metrics=app.state.request_metrics)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        return app
+
+    def test_labels_by_route_template(self, app):
+        """Test requests are grouped by route template and status code."""
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/items/nope")
+        client.get("/missing")
+
+        metrics = app.state.request_metrics
+        assert metrics.latency[("GET", "/items/{item_id}")].count == 3
+        assert metrics.responses == {
+            ("GET", "/items/{item_id}", 200): 2,
+            ("GET", "/items/{item_id}", 422): 1,
+            ("GET", "unmatched", 404): 1,
+        }
+        assert metrics.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_event_streams_counted_apart(self):
+        """Test an open event stream isn't in flight and its duration isn't a request latency."""
+        metrics = RequestMetrics()
+        first_chunk = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+                }
+            )
+            first_chunk.set()
+            await finish.wait()
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "method": "GET", "path": "/live"}
+        task = asyncio.create_task(MetricsMiddleware(app, metrics)(scope, None, send))
+        await first_chunk.wait()
+
+        assert (metrics.in_flight, metrics.streams_open) == (0, 1)
+        finish.set()
+        await task
+        assert (metrics.in_flight, metrics.streams_open) == (0, 0)
+        assert metrics.latency == {}
+        assert metrics.stream_duration[("GET", "unmatched")].count == 1
+        assert metrics.responses == {("GET", "unmatched", 200): 1}
+        assert "http_stream_duration_seconds_count" in render(metrics.families())
+
+
+class TestUpstreamCallStats:
+    """Tests for UpstreamPolicy latency and outcome counters."""
+
+    @pytest.mark.asyncio
+    async def test_counts_retries_and_timeouts(self, fake_clock, fake_sleep):
+        """Test attempts are timed and retries, timeouts and errors counted."""
+        policy = UpstreamPolicy(attempts=2, clock=fake_clock, sleep=fake_sleep)
+
+        async def request(timeout):
+            fake_clock.now += 0.2
+            raise httpx.ReadTimeout("slow")
+
+        with pytest.raises(httpx.ReadTimeout):
+            await policy.call("/data/2.5/weather", request)
+
+        stats = policy.call_stats["/data/2.5/weather"]
+        assert (stats.calls, stats.retries, stats.timeouts, stats.errors) == (1, 1, 2, 1)
+        assert stats.latency.count == 2
+        assert stats.latency.sum == pytest.approx(0.4)
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    def test_exposes_components(self, mock_weather_provider):
+        """Test the endpoint renders request, upstream, cache and quota metrics."""
+        cache = TTLCache(ttl=60)
+        cache.get("missing")
+        mock_weather_provider.cache_stats = cache.stats
+        mock_weather_provider.forecast_cache_stats = None
+        mock_weather_provider.shared_cache_stats = {"weather": None, "forecast": None}
+        mock_weather_provider.get_current.side_effect = RuntimeError("down")
+
+        app = FastAPI()
+        app.state.weather_provider = mock_weather_provider
+        app.state.upstream_policy = UpstreamPolicy()
+        app.state.rate_limiter = RateLimiter(per_minute=60)
+        app.state.request_metrics = RequestMetrics()
+        app.add_middleware(MetricsMiddleware, metrics=app.state.request_metrics)
+        app.include_router(weather_router)
+        app.include_router(metrics_router)
+        client = TestClient(app)
+
+        client.get("/api/weather/current", params={"lat": 1, "lon": 2})
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/api/weather/current"} 1'
+            in body
+        )
+        assert (
+            'http_responses_total{method="GET",route="/api/weather/current",status="502"} 1'
+            in body
+        )
+        assert 'cache_misses_total{cache="weather"} 1' in body
+        assert 'upstream_rate_limit_remaining{window="minute"} 60' in body
+        assert "# TYPE upstream_request_duration_seconds histogram" in body
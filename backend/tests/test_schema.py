@@ -20,7 +20,7 @@ schemathesis.experimental.OPEN_API_3_1.enable()
 def create_schema_test_app():
     """Create a test app with mocked services for schema tests."""
     mock_geocoding = AsyncMock(spec=GeocodingService)
-    mock_geocoding.search.return_value = [
+    mock_geocoding.search_entry.return_value = [
         GeoLocation(
             name="Test City",
             lat=40.0,
@@ -29,9 +29,10 @@ def create_schema_test_app():
             state="Test State",
             display_name="Test City, Test State, US",
         )
-    ]
+    ], 0.0
 
     mock_weather = AsyncMock(spec=WeatherProvider)
+    mock_weather.fresh_for.return_value = 0.0
     mock_weather.get_current.return_value = CurrentWeather(
         location_name="Test City",
         lat=40.0,
@@ -143,3 +144,10 @@ def test_forecast_schema(case):
     """Test forecast endpoint conforms to schema."""
     response = case.call_asgi()
     case.validate_response(response)
+
+
+@schema.parametrize(endpoint="/api/weather/bundle")
+def test_bundle_schema(case):
+    """Test bundle endpoint conforms to schema."""
+    response = case.call_asgi()
+    case.validate_response(response)
@@ -0,0 +1,119 @@
+"""Unit tests for the in-process TTL cache."""
+
+from services.cache import TTLCache, snap_coords
+
+
+class TestSnapCoords:
+    """Tests for snap_coords grid quantization."""
+
+    def test_nearby_points_share_cell(self):
+        """Test points within the same cell snap to the same coordinates."""
+        assert snap_coords(48.8566, 2.3522, 0.01) == snap_coords(48.8581, 2.3509, 0.01)
+
+    def test_distant_points_differ(self):
+        """Test points in different cells snap to different coordinates."""
+        assert snap_coords(48.8566, 2.3522, 0.01) != snap_coords(48.8766, 2.3522, 0.01)
+
+    def test_snapped_values_are_stable(self):
+        """Test snapped values have no float noise."""
+        assert snap_coords(48.8566, 2.3522, 0.01) == (48.86, 2.35)
+        assert snap_coords(-33.87, 151.21, 0.25) == (-33.75, 151.25)
+
+    def test_zero_grid_disables_snapping(self):
+        """Test a non-positive grid returns the input unchanged."""
+        assert snap_coords(48.8566, 2.3522, 0) == (48.8566, 2.3522)
+
+
+class TestTTLCache:
+    """Tests for TTLCache expiry, eviction and stats."""
+
+    def test_get_missing_counts_miss(self):
+        """Test a missing key returns None and counts a miss."""
+        cache = TTLCache(ttl=60)
+
+        assert cache.get("missing") is None
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 0
+
+    def test_get_hit(self):
+        """Test a stored key is returned and counts a hit."""
+        cache = TTLCache(ttl=60)
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert cache.stats.hits == 1
+        assert cache.stats.hit_ratio == 1.0
+
+    def test_entry_expires(self, fake_clock):
+        """Test entries expire after the TTL."""
+        cache = TTLCache(ttl=60, clock=fake_clock)
+        cache.set("key", "value")
+
+        fake_clock.now = 59
+        assert cache.get("key") == "value"
+
+        fake_clock.now = 60
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_get_entry_reports_staleness(self, fake_clock):
+        """Test get_entry returns stale entries within the stale window."""
+        cache = TTLCache(ttl=60, stale_ttl=30, clock=fake_clock)
+        cache.set("key", "value")
+
+        fake_clock.now = 10
+        assert cache.get_entry("key") == ("value", -50)
+
+        fake_clock.now = 70
+        assert cache.get_entry("key") == ("value", 10)
+        assert cache.stats.stale_hits == 1
+
+        fake_clock.now = 90
+        assert cache.get_entry("key") is None
+        assert len(cache) == 0
+
+    def test_expires_in(self, fake_clock):
+        """Test expires_in reports time to expiry without counting a lookup."""
+        cache = TTLCache(ttl=60, stale_ttl=30, clock=fake_clock)
+        cache.set("key", "value")
+
+        fake_clock.now = 50
+        assert cache.expires_in("key") == 10
+        fake_clock.now = 80
+        assert cache.expires_in("key") == -20
+        fake_clock.now = 90
+        assert cache.expires_in("key") is None
+        assert cache.expires_in("missing") is None
+        assert cache.stats.hits + cache.stats.stale_hits + cache.stats.misses == 0
+
+    def test_get_ignores_stale_entries(self, fake_clock):
+        """Test get treats stale entries as misses but keeps them."""
+        cache = TTLCache(ttl=60, stale_ttl=30, clock=fake_clock)
+        cache.set("key", "value")
+
+        fake_clock.now = 70
+        assert cache.get("key") is None
+        assert len(cache) == 1
+
+    def test_set_with_ttl(self, fake_clock):
+        """Test a per-entry ttl overrides the cache's, including already stale entries."""
+        cache = TTLCache(ttl=60, stale_ttl=30, clock=fake_clock)
+        cache.set("short", "value", ttl=5)
+        cache.set("stale", "value", ttl=-10)
+
+        assert cache.get_entry("short") == ("value", -5)
+        assert cache.get_entry("stale") == ("value", 10)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats.evictions == 1
+        assert cache.stats.size == 2
@@ -0,0 +1,56 @@
+"""Unit tests for the single-pass forecast aggregation engine."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.bench_forecast_aggregation import legacy_aggregate, make_forecast_payload
+from services.forecast_aggregation import aggregate_daily
+
+
+class TestAggregateDaily:
+    """Tests for aggregate_daily."""
+
+    @pytest.mark.parametrize("tz_offset", [-43200, -18000, 0, 3600, 19800, 50400])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_original_implementation(self, seed, tz_offset):
+        """Test output is identical to the original per-day aggregation."""
+        payload = make_forecast_payload(seed, tz_offset=tz_offset)
+
+        assert aggregate_daily(payload["list"], tz_offset) == legacy_aggregate(
+            payload["list"], tz_offset
+        )
+
+    def test_groups_by_local_day(self, sample_forecast_response):
+        """Test items are grouped by day in the location's timezone."""
+        # 23:00 UTC and 01:00 UTC the next day are both Jan 2 at UTC+2
+        items = [dict(sample_forecast_response["list"][0], dt=1704150000)]
+        items.append(dict(sample_forecast_response["list"][1], dt=1704157200))
+
+        result = aggregate_daily(items, 7200)
+
+        assert len(result) == 1
+        assert result[0].date == datetime(2024, 1, 2, tzinfo=timezone(timedelta(hours=2)))
+
+    def test_missing_optional_fields(self):
+        """Test missing deg, pop, rain and snow use their defaults."""
+        items = [
+            {
+                "dt": 1704067200,
+                "main": {"temp": 15.0, "feels_like": 14.0, "humidity": 60},
+                "weather": [{"id": 800, "main": "Clear", "description": "clear", "icon": "01d"}],
+                "clouds": {"all": 10},
+                "wind": {"speed": 5.0},
+            }
+        ]
+
+        result = aggregate_daily(items, 0)
+
+        assert result[0].wind_deg == 0
+        assert result[0].pop == 0
+        assert result[0].rain is None
+        assert result[0].snow is None
+
+    def test_empty_items(self):
+        """Test an empty series aggregates to no days."""
+        assert aggregate_daily([], 0) == []
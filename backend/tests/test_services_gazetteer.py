@@ -0,0 +1,189 @@
+"""Unit tests for the offline gazetteer."""
+
+from pathlib import Path
+
+import pytest
+
+from services.gazetteer import Gazetteer, build_index, normalize
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+CITIES_FILE = FIXTURES_DIR / "cities_sample.txt"
+ADMIN1_FILE = FIXTURES_DIR / "admin1_sample.txt"
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    """Gazetteer built from the bundled sample dataset."""
+    gazetteer = Gazetteer.load(CITIES_FILE, tmp_path / "cities.idx", admin1_path=ADMIN1_FILE)
+    yield gazetteer
+    gazetteer.close()
+
+
+class TestNormalize:
+    """Tests for index key normalization."""
+
+    def test_strips_accents_and_case(self):
+        """Test accents and case are folded."""
+        assert normalize("São Paulo") == "sao paulo"
+        assert normalize("ZÜRICH") == "zurich"
+
+    def test_collapses_whitespace(self):
+        """Test surrounding and repeated whitespace is collapsed."""
+        assert normalize("  New   York ") == "new york"
+
+
+class TestBuildIndex:
+    """Tests for build_index and Gazetteer.load."""
+
+    def test_build_returns_city_count(self, tmp_path):
+        """Test build_index reports the number of cities indexed."""
+        assert build_index(CITIES_FILE, tmp_path / "cities.idx") == 16
+
+    def test_load_builds_missing_index(self, tmp_path):
+        """Test Gazetteer.load builds the index when it does not exist."""
+        index_path = tmp_path / "cities.idx"
+
+        gazetteer = Gazetteer.load(CITIES_FILE, index_path)
+
+        assert index_path.exists()
+        assert len(gazetteer) == 16
+        gazetteer.close()
+
+    def test_load_rebuilds_outdated_index(self, tmp_path):
+        """Test Gazetteer.load rebuilds an index written in an older format."""
+        index_path = tmp_path / "cities.idx"
+        index_path.write_bytes(b"GZT1" + b"\0" * 60)
+
+        gazetteer = Gazetteer.load(CITIES_FILE, index_path)
+
+        assert len(gazetteer) == 16
+        gazetteer.close()
+
+    def test_rebuild_leaves_open_index_readable(self, tmp_path):
+        """Test rebuilding replaces the file rather than rewriting the one already mapped."""
+        index_path = tmp_path / "cities.idx"
+        gazetteer = Gazetteer.load(CITIES_FILE, index_path)
+
+        build_index(CITIES_FILE, index_path, ADMIN1_FILE)
+
+        assert gazetteer.search("paris")[0].name == "Paris"
+        assert [p.name for p in tmp_path.iterdir()] == ["cities.idx"]
+        gazetteer.close()
+
+    def test_load_rebuilds_empty_index(self, tmp_path, monkeypatch):
+        """Test an empty index file is rebuilt and the failed open closes its handle."""
+        index_path = tmp_path / "cities.idx"
+        index_path.write_bytes(b"")
+        opened = []
+        original_open = Path.open
+
+        def tracking_open(path, *args, **kwargs):
+            f = original_open(path, *args, **kwargs)
+            opened.append(f)
+            return f
+
+        monkeypatch.setattr(Path, "open", tracking_open)
+
+        gazetteer = Gazetteer.load(CITIES_FILE, index_path)
+
+        assert len(gazetteer) == 16
+        gazetteer.close()
+        assert all(f.closed for f in opened)
+
+    def test_rejects_non_index_file(self, tmp_path):
+        """Test opening a file that is not an index raises ValueError."""
+        bogus = tmp_path / "bogus.idx"
+        bogus.write_bytes(b"\0" * 64)
+
+        with pytest.raises(ValueError):
+            Gazetteer(bogus)
+
+
+class TestGazetteerSearch:
+    """Tests for Gazetteer.search."""
+
+    def test_exact_match_returns_geolocation(self, gazetteer):
+        """Test an exact name returns the same shape as the upstream API."""
+        results = gazetteer.search("Paris", limit=1)
+
+        assert len(results) == 1
+        assert results[0].name == "Paris"
+        assert results[0].country == "FR"
+        assert results[0].state == "Île-de-France"
+        assert results[0].display_name == "Paris, Île-de-France, FR"
+        assert results[0].lat == pytest.approx(48.85341)
+
+    def test_prefix_ranked_by_population(self, gazetteer):
+        """Test prefix matches are ranked by population."""
+        results = gazetteer.search("par")
+
+        assert [(r.country, r.state) for r in results] == [
+            ("FR", "Île-de-France"),
+            ("US", "Texas"),
+            ("US", "Tennessee"),
+        ]
+
+    def test_exact_match_ranked_before_prefix(self, tmp_path):
+        """Test exact name matches outrank more populous prefix matches."""
+        cities = tmp_path / "cities.txt"
+        cities.write_text(
+            "1\tLyon\tLyon\t\t45.75\t4.85\tP\tPPLA\tFR\t\t84\t\t\t\t522969\t\t\t\t\n"
+            "2\tLy\tLy\t\t10.0\t20.0\tP\tPPL\tXX\t\t00\t\t\t\t120\t\t\t\t\n",
+            encoding="utf-8",
+        )
+        gazetteer = Gazetteer.load(cities, tmp_path / "cities.idx")
+
+        assert [r.name for r in gazetteer.search("ly")] == ["Ly", "Lyon"]
+        gazetteer.close()
+
+    def test_ascii_and_alternate_names(self, gazetteer):
+        """Test ASCII and alternate names resolve to the primary name."""
+        assert gazetteer.search("Munich")[0].name == "München"
+        assert gazetteer.search("sao paulo")[0].name == "São Paulo"
+        assert gazetteer.search("NYC")[0].name == "New York City"
+
+    def test_country_and_state_qualifiers(self, gazetteer):
+        """Test comma-separated qualifiers filter by country code or state."""
+        assert {r.country for r in gazetteer.search("Paris,US")} == {"US"}
+        assert [r.state for r in gazetteer.search("Paris, Texas, US")] == ["Texas"]
+
+    def test_respects_limit(self, gazetteer):
+        """Test the number of results is capped by limit."""
+        assert len(gazetteer.search("Paris", limit=2)) == 2
+
+    def test_miss_returns_empty(self, gazetteer):
+        """Test unknown names return no results."""
+        assert gazetteer.search("Atlantis") == []
+        assert gazetteer.search(" , ") == []
+
+
+class TestBroadPrefixSearch:
+    """Tests for prefixes shared by more keys than a lookup scans."""
+
+    @pytest.fixture
+    def gazetteer(self, tmp_path):
+        """Gazetteer that scans at most two keys, ranking two cities per broader prefix."""
+        index_path = tmp_path / "cities.idx"
+        build_index(CITIES_FILE, index_path, ADMIN1_FILE, max_prefix_scan=2, ranked_top_k=2)
+        gazetteer = Gazetteer(index_path)
+        yield gazetteer
+        gazetteer.close()
+
+    def test_ranked_by_population_across_whole_prefix(self, gazetteer):
+        """Test the most populous cities win even when their keys sort late."""
+        results = gazetteer.search("p", limit=2)
+
+        assert [(r.name, r.state) for r in results] == [
+            ("Paris", "Île-de-France"),
+            ("Portland", "Oregon"),
+        ]
+
+    def test_exact_matches_found(self, gazetteer):
+        """Test exact name matches are found even if not among the ranked cities."""
+        results = gazetteer.search("Paris", limit=3)
+
+        assert [r.state for r in results] == ["Île-de-France", "Texas", "Tennessee"]
+
+    def test_too_few_ranked_matches_is_a_miss(self, gazetteer):
+        """Test qualifiers matching fewer ranked cities than requested give no results."""
+        assert gazetteer.search("p, Tennessee", limit=1) == []
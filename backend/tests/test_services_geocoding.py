@@ -1,11 +1,17 @@
 """Unit tests for the geocoding service."""
 
+import asyncio
+
+from pathlib import Path
+
 import pytest
 import httpx
 import respx
 from httpx import Response
 
+from services.gazetteer import Gazetteer
 from services.geocoding import GeocodingService
+from services.prefix_cache import PrefixCache
 from models.geocoding import GeoLocation
 
 
@@ -139,6 +145,28 @@ class TestGeocodingService:
         with pytest.raises(httpx.HTTPStatusError):
             await service.search("Paris")
 
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_concurrent_searches_coalesced(self, service, sample_geocoding_response):
+        """Test concurrent searches differing only in case/whitespace share one call."""
+
+        async def slow_response(request):
+            await asyncio.sleep(0.01)
+            return Response(200, json=sample_geocoding_response)
+
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            side_effect=slow_response
+        )
+
+        results = await asyncio.gather(
+            service.search("Paris"),
+            service.search("paris "),
+            service.search(" PARIS"),
+        )
+
+        assert route.call_count == 1
+        assert all(len(r) == 2 for r in results)
+
     @pytest.mark.asyncio
     async def test_close_client(self, service):
         """Test closing the HTTP client."""
@@ -153,3 +181,78 @@ class TestGeocodingService:
     async def test_close_without_client(self, service):
         """Test closing when no client exists doesn't raise."""
         await service.close()  # Should not raise
+
+
+class TestGeocodingServiceGazetteer:
+    """Tests for GeocodingService with an offline gazetteer."""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        """Create a geocoding service backed by the sample gazetteer."""
+        fixtures = Path(__file__).parent / "fixtures"
+        gazetteer = Gazetteer.load(fixtures / "cities_sample.txt", tmp_path / "cities.idx")
+        yield GeocodingService(api_key="test-api-key", gazetteer=gazetteer)
+        gazetteer.close()
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_local_hit_skips_upstream(self, service):
+        """Test a gazetteer hit is returned without an upstream call."""
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=[])
+        )
+
+        results = await service.search("Berlin")
+
+        assert results[0].name == "Berlin"
+        assert results[0].country == "DE"
+        assert not route.called
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_local_miss_falls_back_to_upstream(self, service, sample_geocoding_response):
+        """Test a gazetteer miss falls back to the upstream API."""
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+
+        results = await service.search("Springfield")
+
+        assert route.call_count == 1
+        assert len(results) == 2
+
+
+class TestGeocodingServicePrefixCache:
+    """Tests for GeocodingService with a typeahead prefix cache."""
+
+    @pytest.fixture
+    def service(self):
+        """Create a geocoding service with a prefix cache."""
+        return GeocodingService(api_key="test-api-key", prefix_cache=PrefixCache())
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_prefix_answered_from_earlier_results(self, service, sample_geocoding_response):
+        """Test a shorter prefix is served from an earlier full query."""
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+
+        await service.search("Paris", limit=2)
+        results = await service.search("Pari", limit=2)
+
+        assert route.call_count == 1
+        assert {r.country for r in results} == {"FR", "US"}
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_insufficient_completions_go_upstream(self, service, sample_geocoding_response):
+        """Test a prefix with too few known completions calls upstream."""
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+
+        await service.search("Paris", limit=2)
+        await service.search("Pa", limit=5)
+
+        assert route.call_count == 2
@@ -0,0 +1,204 @@
+"""Unit tests for hedged upstream requests."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from services.hedging import Hedger, LatencyTracker
+from services.weather_provider import WeatherProvider
+
+
+def warmed_hedger(latency: float = 0.01, **kwargs) -> Hedger:
+    """Create a hedger whose "weather" endpoint already has a latency history."""
+    hedger = Hedger(min_delay=0.0, min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.tracker("weather").record(latency)
+    return hedger
+
+
+class TestLatencyTracker:
+    """Tests for LatencyTracker percentiles."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles over the recorded latencies."""
+        tracker = LatencyTracker()
+        for ms in range(1, 101):
+            tracker.record(ms / 1000)
+
+        assert tracker.percentile(0.95) == pytest.approx(0.095)
+        assert tracker.percentile(0.5) == pytest.approx(0.05)
+        assert tracker.percentile(1.0) == pytest.approx(0.1)
+
+    def test_window_keeps_recent(self):
+        """Test only the most recent latencies are kept."""
+        tracker = LatencyTracker(window=3)
+        for seconds in (5.0, 1.0, 1.0, 1.0):
+            tracker.record(seconds)
+
+        assert len(tracker) == 3
+        assert tracker.percentile(1.0) == 1.0
+
+    def test_empty(self):
+        """Test an empty tracker has no percentile."""
+        assert LatencyTracker().percentile(0.95) is None
+
+
+class TestHedger:
+    """Tests for Hedger."""
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_history(self):
+        """Test calls aren't hedged until enough latencies are known."""
+        hedger = Hedger(min_samples=5)
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        assert await hedger.call("weather", request, timeout=1.0) == "ok"
+        assert len(calls) == 1
+        assert hedger.delay("weather") is None
+
+    @pytest.mark.asyncio
+    async def test_slow_request_hedged(self):
+        """Test a slow request is duplicated and the faster response wins."""
+        hedger = warmed_hedger()
+        primary_cancelled = asyncio.Event()
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    primary_cancelled.set()
+                    raise
+            return len(calls)
+
+        assert await hedger.call("weather", request, timeout=5.0) == 2
+        await asyncio.sleep(0)
+
+        assert primary_cancelled.is_set()
+        assert calls[1] < calls[0]
+        stats = hedger.stats
+        assert (stats.requests, stats.hedged, stats.hedge_wins) == (1, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_fast_request_not_hedged(self):
+        """Test a request faster than the hedge delay is sent once."""
+        hedger = warmed_hedger(latency=1.0)
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            return "ok"
+
+        await hedger.call("weather", request, timeout=5.0)
+
+        assert len(calls) == 1
+        assert hedger.stats.hedged == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_rate_capped(self):
+        """Test no more than max_rate of calls are hedged."""
+        # Hedge at the fastest recorded latency, so slow calls don't raise the delay
+        hedger = warmed_hedger(max_rate=0.5, percentile=0.0)
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            await asyncio.sleep(0.03)
+            return "ok"
+
+        for _ in range(3):
+            await hedger.call("weather", request, timeout=5.0)
+
+        stats = hedger.stats
+        assert stats.hedged == 2
+        assert stats.capped == 1
+        assert len(calls) == 5
+
+    @pytest.mark.asyncio
+    async def test_hedge_skipped_when_before_hedge_fails(self):
+        """Test a hedge refused by before_hedge leaves the primary running."""
+        hedger = warmed_hedger()
+        calls = []
+
+        async def refuse():
+            raise RuntimeError("no budget")
+
+        async def request(timeout):
+            calls.append(timeout)
+            await asyncio.sleep(0.03)
+            return "ok"
+
+        assert await hedger.call("weather", request, 5.0, before_hedge=refuse) == "ok"
+        assert len(calls) == 1
+        assert hedger.stats.capped == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        """Test the hedge's result is used when the primary fails after it was sent."""
+        hedger = warmed_hedger()
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                await asyncio.sleep(0.03)
+                raise httpx.ReadError("reset")
+            await asyncio.sleep(0.06)
+            return "hedge"
+
+        assert await hedger.call("weather", request, timeout=5.0) == "hedge"
+
+    @pytest.mark.asyncio
+    async def test_all_failed_raises_primary_error(self):
+        """Test the primary's error is raised when every request fails."""
+        hedger = warmed_hedger()
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            attempt = len(calls)
+            await asyncio.sleep(0.03)
+            raise httpx.ReadError(f"attempt {attempt}")
+
+        with pytest.raises(httpx.ReadError, match="attempt 1"):
+            await hedger.call("weather", request, timeout=5.0)
+        assert len(calls) == 2
+
+
+class TestWeatherProviderHedging:
+    """Tests for WeatherProvider with a hedger."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_slow_upstream_hedged(self, sample_current_weather_response):
+        """Test a slow upstream response is raced by a second request."""
+        calls = []
+
+        async def respond(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return Response(200, json=sample_current_weather_response)
+
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(side_effect=respond)
+        hedger = Hedger(min_delay=0.0, min_samples=5)
+        for _ in range(5):
+            hedger.tracker("/data/2.5/weather").record(0.01)
+        provider = WeatherProvider(api_key="test-api-key", hedger=hedger)
+
+        weather = await provider.get_current(48.8566, 2.3522)
+        await provider.close()
+
+        assert weather.temp == 20.5
+        assert len(calls) == 2
+        assert hedger.stats.hedge_wins == 1
@@ -0,0 +1,147 @@
+"""Unit tests for the shared upstream HTTP pool."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from services.geocoding import GeocodingService
+from services.http_pool import PoolStats, UpstreamPool
+from services.weather_provider import WeatherProvider
+
+
+class TestPoolStats:
+    """Tests for PoolStats derived values."""
+
+    def test_utilization(self):
+        """Test utilization counts only connections serving requests."""
+        stats = PoolStats(max_connections=10, connections=4, idle_connections=1)
+
+        assert stats.active_connections == 3
+        assert stats.utilization == pytest.approx(0.3)
+
+    def test_utilization_without_limit(self):
+        """Test utilization is zero when there is no connection limit."""
+        assert PoolStats(max_connections=0, connections=0, idle_connections=0).utilization == 0.0
+
+    def test_unknown_connections(self):
+        """Test connection counts that couldn't be read stay unknown."""
+        stats = PoolStats(max_connections=10)
+
+        assert stats.active_connections is None
+        assert stats.utilization is None
+
+
+class TestUpstreamPool:
+    """Tests for UpstreamPool."""
+
+    @pytest.fixture
+    async def pool(self):
+        """Create a pool and close it after the test."""
+        pool = UpstreamPool(max_connections=10)
+        yield pool
+        await pool.aclose()
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_services_share_client(
+        self, pool, sample_geocoding_response, sample_current_weather_response
+    ):
+        """Test both services send requests through the shared pool."""
+        respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        geocoding = GeocodingService(api_key="test-api-key", client=pool.client)
+        weather = WeatherProvider(api_key="test-api-key", client=pool.client)
+
+        await geocoding.search("Paris")
+        await weather.get_current(48.8566, 2.3522)
+
+        assert await geocoding._get_client() is pool.client
+        assert await weather._get_client() is pool.client
+        assert pool.stats.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_services_do_not_close_shared_client(self, pool):
+        """Test closing a service leaves the shared client open."""
+        await GeocodingService(api_key="test-api-key", client=pool.client).close()
+        await WeatherProvider(api_key="test-api-key", client=pool.client).close()
+
+        assert not pool.client.is_closed
+
+        await pool.aclose()
+        assert pool.client.is_closed
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_peak_in_flight(self, pool):
+        """Test concurrent requests are counted while in flight."""
+
+        async def slow_response(request):
+            await asyncio.sleep(0.01)
+            return Response(200)
+
+        respx.get("https://upstream.test/").mock(side_effect=slow_response)
+
+        await asyncio.gather(*(pool.client.get("https://upstream.test/") for _ in range(3)))
+
+        stats = pool.stats
+        assert stats.in_flight == 0
+        assert stats.peak_in_flight == 3
+        assert stats.requests == 3
+
+    def test_stats_count_connections(self, pool):
+        """Test the default transport's connections are counted."""
+        stats = pool.stats
+
+        assert (stats.connections, stats.idle_connections) == (0, 0)
+        assert stats.utilization == 0.0
+
+    @pytest.mark.asyncio
+    async def test_stats_without_inspectable_pool(self):
+        """Test a transport without a connection pool reports unknown connections."""
+        pool = UpstreamPool(transport=httpx.MockTransport(lambda request: Response(200)))
+
+        await pool.client.get("https://upstream.test/")
+        stats = pool.stats
+        await pool.aclose()
+
+        assert stats.connections is None
+        assert stats.utilization is None
+        assert stats.requests == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_prewarm_opens_connections_per_host(self, pool):
+        """Test prewarm sends one request per requested connection."""
+        route = respx.head("https://upstream.test/").mock(return_value=Response(401))
+
+        opened = await pool.prewarm(["https://upstream.test/"], connections=3)
+
+        assert opened == 3
+        assert route.call_count == 3
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_prewarm_ignores_failures(self, pool):
+        """Test an unreachable host doesn't fail startup."""
+        respx.head("https://upstream.test/").mock(side_effect=httpx.ConnectError("unreachable"))
+
+        assert await pool.prewarm(["https://upstream.test/"], connections=2) == 0
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_compression_disabled(self):
+        """Test disabling compression asks upstream for identity encoding."""
+        route = respx.get("https://upstream.test/").mock(return_value=Response(200))
+        pool = UpstreamPool(compression=False)
+
+        await pool.client.get("https://upstream.test/")
+        await pool.aclose()
+
+        assert route.calls.last.request.headers["Accept-Encoding"] == "identity"
@@ -0,0 +1,137 @@
+"""Unit tests for live weather channels shared between subscribers."""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from models.weather import CurrentWeather, WeatherCondition
+from services.live import LiveWeatherHub, TooManySubscribers
+from services.weather_provider import WeatherProvider
+
+
+def make_weather(temp: float = 20.0, hour: int = 12) -> CurrentWeather:
+    return CurrentWeather(
+        location_name="Paris",
+        lat=48.8566,
+        lon=2.3522,
+        timestamp=datetime(2024, 1, 1, hour, 0, 0),
+        temp=temp,
+        feels_like=temp,
+        temp_min=temp - 2,
+        temp_max=temp + 2,
+        humidity=65,
+        pressure=1015,
+        wind_speed=3.5,
+        wind_deg=180,
+        clouds=0,
+        condition=WeatherCondition(id=800, main="Clear", description="clear sky", icon="01d"),
+    )
+
+
+class TestLiveWeatherHub:
+    """Tests for polling once per location and pushing changes to subscribers."""
+
+    @pytest.fixture
+    def provider(self):
+        """Create a mock provider returning the same observation until told otherwise."""
+        provider = AsyncMock(spec=WeatherProvider)
+        provider.get_current.return_value = make_weather()
+        return provider
+
+    @pytest.fixture
+    def hub(self, provider):
+        """Create a hub whose pollers poll once and then wait for the test."""
+
+        async def sleep(seconds: float) -> None:
+            await asyncio.Event().wait()
+
+        return LiveWeatherHub(provider, interval=60, max_subscribers=3, sleep=sleep)
+
+    @pytest.mark.asyncio
+    async def test_subscribers_share_one_poll(self, hub, provider):
+        """Test nearby subscribers share a channel and get the observation in their units."""
+        metric = hub.subscribe(48.8566, 2.3522)
+        nearby = hub.subscribe(48.8571, 2.3519)
+        imperial = hub.subscribe(48.8566, 2.3522, units="imperial")
+        await asyncio.sleep(0)
+
+        provider.get_current.assert_awaited_once_with(48.86, 2.35)
+        assert (await metric.next()).temp == 20.0
+        assert (await nearby.next()).temp == 20.0
+        assert (await imperial.next()).temp == 68.0
+        assert (hub.stats.channels, hub.stats.subscribers) == (1, 3)
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_pushes_only_changes(self, hub, provider):
+        """Test an unchanged observation isn't pushed again."""
+        subscription = hub.subscribe(48.8566, 2.3522)
+        await asyncio.sleep(0)
+        await subscription.next()
+
+        await hub.run_once()
+        assert await subscription.next(timeout=0.01) is None
+
+        provider.get_current.return_value = make_weather(temp=21.0, hour=13)
+        await hub.run_once()
+        assert (await subscription.next(timeout=0.01)).temp == 21.0
+        assert (hub.stats.polls, hub.stats.changes) == (3, 2)
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_gets_latest(self, hub, provider):
+        """Test observations a subscriber hasn't read are replaced, not queued."""
+        subscription = hub.subscribe(48.8566, 2.3522)
+        await asyncio.sleep(0)
+        for hour in (13, 14):
+            provider.get_current.return_value = make_weather(temp=hour, hour=hour)
+            await hub.run_once()
+
+        assert (await subscription.next()).temp == 14
+        assert await subscription.next(timeout=0.01) is None
+        assert hub.stats.coalesced == 2
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_last_unsubscribe_stops_polling(self, hub, provider):
+        """Test a location's poller stops with its last subscriber."""
+        first = hub.subscribe(48.8566, 2.3522)
+        await asyncio.sleep(0)
+        # A later subscriber gets the latest observation without another poll
+        second = hub.subscribe(48.8566, 2.3522)
+        assert (await second.next(timeout=0)).temp == 20.0
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        hub.unsubscribe(second)
+        await hub.run_once()
+
+        assert provider.get_current.await_count == 1
+        assert (hub.stats.channels, hub.stats.subscribers) == (0, 0)
+        assert second.closed and await second.next() is None
+
+    @pytest.mark.asyncio
+    async def test_limits_subscribers(self, hub):
+        """Test subscribing past max_subscribers is refused."""
+        for _ in range(3):
+            hub.subscribe(48.8566, 2.3522)
+
+        with pytest.raises(TooManySubscribers):
+            hub.subscribe(51.5074, -0.1278)
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_poll_keeps_last_observation(self, hub, provider):
+        """Test a failing poll is counted and nothing is pushed."""
+        subscription = hub.subscribe(48.8566, 2.3522)
+        await asyncio.sleep(0)
+        await subscription.next()
+
+        provider.get_current.side_effect = RuntimeError("upstream down")
+        await hub.run_once()
+
+        assert await subscription.next(timeout=0.01) is None
+        assert hub.stats.failed == 1
+        await hub.close()
@@ -0,0 +1,136 @@
+"""Unit tests for the typeahead prefix cache."""
+
+from models.geocoding import GeoLocation
+from services.prefix_cache import PrefixCache
+
+
+def make_location(name: str, country: str, lat: float = 0.0, lon: float = 0.0) -> GeoLocation:
+    return GeoLocation.from_openweathermap({"name": name, "lat": lat, "lon": lon, "country": country})
+
+
+PARIS_RESULTS = [
+    make_location("Paris", "FR", 48.85, 2.35),
+    make_location("Paris", "US", 33.66, -95.55),
+    make_location("Paris", "US", 36.30, -88.32),
+]
+
+
+class TestPrefixCacheExactQueries:
+    """Tests for repeated identical queries."""
+
+    def test_repeated_query_hits(self):
+        """Test a stored query is answered from cache, ignoring case."""
+        cache = PrefixCache()
+        cache.add("Paris", 5, PARIS_RESULTS)
+
+        assert cache.get(" PARIS ", 5) == PARIS_RESULTS
+        assert cache.stats.hits == 1
+
+    def test_short_answer_satisfies_larger_limit(self):
+        """Test an answer shorter than its limit is exhaustive for larger limits."""
+        cache = PrefixCache()
+        cache.add("Paris", 3, PARIS_RESULTS[:2])
+
+        assert cache.get("Paris", 5) == PARIS_RESULTS[:2]
+
+    def test_smaller_stored_limit_misses(self):
+        """Test a full answer for a smaller limit can't answer a larger one."""
+        cache = PrefixCache()
+        cache.add("Paris", 2, PARIS_RESULTS[:2])
+
+        assert cache.get("Paris", 5) is None
+        assert cache.stats.misses == 1
+
+
+class TestPrefixCacheCompletions:
+    """Tests for answering prefixes from cached completions."""
+
+    def test_prefix_answered_when_enough_completions(self):
+        """Test a prefix is answered once limit completions are known."""
+        cache = PrefixCache()
+        cache.add("Paris", 5, PARIS_RESULTS)
+
+        results = cache.get("Par", 3)
+
+        assert results is not None
+        assert {(r.country, r.lat) for r in results} == {(r.country, r.lat) for r in PARIS_RESULTS}
+
+    def test_prefix_misses_when_too_few_completions(self):
+        """Test a prefix misses when fewer than limit completions are known."""
+        cache = PrefixCache()
+        cache.add("Paris", 5, PARIS_RESULTS)
+
+        assert cache.get("Par", 5) is None
+
+    def test_exact_names_ranked_first(self):
+        """Test completions whose name equals the prefix rank first."""
+        cache = PrefixCache()
+        cache.add("Parma", 5, [make_location("Parma", "IT")])
+        cache.add("Par, Cornwall", 5, [make_location("Par", "GB")])
+
+        results = cache.get("par", 2)
+
+        assert [r.name for r in results] == ["Par", "Parma"]
+
+    def test_popular_locations_ranked_higher(self):
+        """Test locations returned by more queries rank higher."""
+        cache = PrefixCache()
+        cache.add("Portland", 5, [make_location("Portland", "US", 45.5, -122.7)])
+        cache.add("Porto", 5, [make_location("Porto", "PT")])
+        cache.add("Portland, OR", 5, [make_location("Portland", "US", 45.5, -122.7)])
+
+        results = cache.get("port", 2)
+
+        assert [r.name for r in results] == ["Portland", "Porto"]
+
+    def test_qualified_query_not_completed(self):
+        """Test comma-qualified queries are not answered from names."""
+        cache = PrefixCache()
+        cache.add("Paris", 5, PARIS_RESULTS)
+
+        assert cache.get("Par,US", 1) is None
+
+
+class TestPrefixCacheEviction:
+    """Tests for entry-count and memory bounds."""
+
+    def test_evicts_by_entry_count(self):
+        """Test the least recently used query is evicted past max_entries."""
+        cache = PrefixCache(max_entries=2)
+        cache.add("Paris", 5, PARIS_RESULTS)
+        cache.add("London", 5, [make_location("London", "GB")])
+        cache.get("Paris", 5)
+        cache.add("Berlin", 5, [make_location("Berlin", "DE")])
+
+        assert cache.get("London", 5) is None
+        assert cache.get("Paris", 5) is not None
+        assert cache.stats.evictions == 1
+        assert len(cache) == 2
+
+    def test_evicted_locations_leave_trie(self):
+        """Test evicted locations are no longer offered as completions."""
+        cache = PrefixCache(max_entries=1)
+        cache.add("Lond", 1, [make_location("London", "GB")])
+        cache.add("Berlin", 1, [make_location("Berlin", "DE")])
+
+        assert cache.get("Lo", 1) is None
+        assert cache.get("Ber", 1) is not None
+
+    def test_shared_locations_survive_partial_eviction(self):
+        """Test a location stays cached while another query still references it."""
+        cache = PrefixCache(max_entries=2)
+        berlin = make_location("Berlin", "DE")
+        cache.add("Berl", 1, [berlin])
+        cache.add("Berlin", 1, [berlin])
+        cache.add("Rome", 1, [make_location("Rome", "IT")])
+
+        assert cache.get("Be", 1) == [berlin]
+
+    def test_evicts_by_memory(self):
+        """Test entries are evicted to stay under max_bytes."""
+        cache = PrefixCache(max_bytes=2000)
+        for i in range(20):
+            cache.add(f"city{i}", 1, [make_location(f"City{i}", "XX")])
+
+        assert cache.memory_bytes <= 2000
+        assert 0 < len(cache) < 20
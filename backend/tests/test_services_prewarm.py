@@ -0,0 +1,217 @@
+"""Unit tests for popularity tracking and cache pre-warming."""
+
+import asyncio
+
+import pytest
+import respx
+from httpx import Response
+
+from services.cache import TTLCache
+from services.prewarm import PopularityTracker, PrewarmScheduler
+from services.rate_limit import RateLimiter, RateLimitExceeded
+from services.shared_cache import MemoryBackend
+from services.weather_provider import WeatherProvider
+
+
+class TestPopularityTracker:
+    """Tests for decayed access counts."""
+
+    def test_counts_decay(self, fake_clock):
+        """Test counts halve every half-life."""
+        tracker = PopularityTracker(half_life=60, clock=fake_clock)
+        for _ in range(4):
+            tracker.record("paris")
+
+        fake_clock.now = 120
+
+        assert tracker.score("paris") == pytest.approx(1.0)
+
+    def test_top_prefers_recent_accesses(self, fake_clock):
+        """Test recent accesses outrank older, more numerous ones."""
+        tracker = PopularityTracker(half_life=60, clock=fake_clock)
+        for _ in range(3):
+            tracker.record("paris")
+        fake_clock.now = 180
+        tracker.record("london")
+        tracker.record("london")
+
+        assert [key for key, _ in tracker.top(2)] == ["london", "paris"]
+        assert [key for key, _ in tracker.top(2, min_score=1.0)] == ["london"]
+
+    def test_keeps_most_popular_keys(self, fake_clock):
+        """Test unpopular keys are pruned once too many are tracked."""
+        tracker = PopularityTracker(max_keys=2, clock=fake_clock)
+        tracker.record("paris")
+        tracker.record("paris")
+        for key in ("a", "b", "c", "d"):
+            tracker.record(key)
+
+        assert len(tracker) <= 4
+        assert tracker.top(1)[0][0] == "paris"
+
+    def test_rescales_large_weights(self, fake_clock):
+        """Test scores stay finite and ordered across many half-lives."""
+        tracker = PopularityTracker(half_life=1, clock=fake_clock)
+        tracker.record("paris")
+        tracker.record("paris")
+        fake_clock.now = 400
+        tracker.record("london")
+
+        assert tracker.score("london") == pytest.approx(1.0)
+        assert [key for key, _ in tracker.top(2)] == ["london", "paris"]
+
+
+class TestPrewarmScheduler:
+    """Tests for refreshing popular entries before they expire."""
+
+    @pytest.fixture
+    def provider(self, fake_clock):
+        """Create a provider with fake-clock caches and popularity tracking."""
+        return WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=300, stale_ttl=600, clock=fake_clock),
+            forecast_cache=TTLCache(ttl=1800, stale_ttl=600, clock=fake_clock),
+            popularity=PopularityTracker(clock=fake_clock),
+        )
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_refreshes_popular_entries_near_expiry(
+        self, provider, fake_clock, sample_current_weather_response, sample_forecast_response
+    ):
+        """Test popular entries close to expiry are refreshed and others left alone."""
+        current = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        forecast = respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=sample_forecast_response)
+        )
+        for _ in range(3):
+            await provider.get_current(48.8566, 2.3522)
+            await provider.get_forecast(48.8566, 2.3522)
+        await provider.get_current(51.5074, -0.1278)
+        scheduler = PrewarmScheduler(
+            provider, provider._popularity, min_score=2.0, lead_time=30, clock=fake_clock
+        )
+
+        fake_clock.now = 280
+        refreshed = await scheduler.run_once()
+
+        assert refreshed == 1
+        assert (current.call_count, forecast.call_count) == (3, 1)
+        assert provider.expires_in(("current", 48.86, 2.35)) == pytest.approx(300)
+        # Refreshed entries are served fresh without another upstream call
+        await provider.get_current(48.8566, 2.3522)
+        assert current.call_count == 3
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_respects_budget(self, provider, fake_clock, sample_current_weather_response):
+        """Test a cycle stops once the scheduler's call budget is spent."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        for lat in (10, 20, 30):
+            await provider.get_current(lat, 0)
+        scheduler = PrewarmScheduler(
+            provider,
+            provider._popularity,
+            min_score=0,
+            max_calls_per_minute=2,
+            clock=fake_clock,
+        )
+
+        fake_clock.now = 290
+        refreshed = await scheduler.run_once()
+
+        assert refreshed == 2
+        assert route.call_count == 5
+        assert scheduler.stats.deferred == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_yields_to_interactive_traffic(
+        self, fake_clock, sample_current_weather_response
+    ):
+        """Test a cycle stops when the rate limiter refuses background calls."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        provider = WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=300, stale_ttl=600, clock=fake_clock),
+            rate_limiter=RateLimiter(per_minute=10, background_reserve=0.95, clock=fake_clock),
+            popularity=PopularityTracker(clock=fake_clock),
+        )
+        for lat in (10, 20):
+            await provider.get_current(lat, 0)
+        scheduler = PrewarmScheduler(provider, provider._popularity, min_score=0, clock=fake_clock)
+
+        fake_clock.now = 290
+        refreshed = await scheduler.run_once()
+
+        assert refreshed == 0
+        assert route.call_count == 2
+        assert scheduler.stats.deferred == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_interactive_call_joining_dropped_refresh(
+        self, fake_clock, sample_current_weather_response
+    ):
+        """Test an interactive call isn't refused along with a refresh it joined."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        provider = WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=300, stale_ttl=600, clock=fake_clock),
+            rate_limiter=RateLimiter(per_minute=5, clock=fake_clock),
+        )
+        for lat in (10, 20, 30, 40):
+            await provider.get_current(lat, 0)
+
+        refresh, weather = await asyncio.gather(
+            provider.refresh(("current", 50.0, 0.0)),
+            provider.get_current(50, 0),
+            return_exceptions=True,
+        )
+
+        assert isinstance(refresh, RateLimitExceeded)
+        assert weather.location_name == "Paris"
+        assert route.call_count == 5
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_workers_share_refreshes(self, fake_clock, sample_current_weather_response):
+        """Test a worker takes an entry another worker refreshed instead of calling upstream."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        backend = MemoryBackend(clock=fake_clock)
+        workers = [
+            WeatherProvider(
+                api_key="test-api-key",
+                current_cache=TTLCache(ttl=300, stale_ttl=600, clock=fake_clock),
+                shared_cache=backend,
+                popularity=PopularityTracker(clock=fake_clock),
+            )
+            for _ in range(2)
+        ]
+        schedulers = []
+        for worker in workers:
+            worker._shared_current._clock = fake_clock
+            await worker.get_current(48.8566, 2.3522)
+            schedulers.append(
+                PrewarmScheduler(
+                    worker, worker._popularity, min_score=0, lead_time=30, clock=fake_clock
+                )
+            )
+
+        fake_clock.now = 280
+        refreshed = [await scheduler.run_once() for scheduler in schedulers]
+
+        assert refreshed == [1, 0]
+        assert schedulers[1].stats.shared == 1
+        assert route.call_count == 2
+        assert workers[1].expires_in(("current", 48.86, 2.35)) == pytest.approx(300)
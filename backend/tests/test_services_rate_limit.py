@@ -0,0 +1,176 @@
+"""Unit tests for the upstream rate limiter."""
+
+import asyncio
+
+import pytest
+import respx
+from httpx import Response
+
+from services.cache import TTLCache
+from services.rate_limit import (
+    Priority,
+    RateLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    upstream_priority,
+    worker_share,
+)
+from services.weather_provider import WeatherProvider
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket refill."""
+
+    def test_refills_continuously(self, fake_clock):
+        """Test tokens refill at capacity per period, up to capacity."""
+        bucket = TokenBucket(60, 60, fake_clock)
+        for _ in range(60):
+            bucket.take()
+
+        fake_clock.now = 10
+        assert bucket.tokens == pytest.approx(10)
+        assert bucket.time_until(11) == pytest.approx(1)
+
+        fake_clock.now = 1000
+        assert bucket.tokens == 60
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter budgets and priorities."""
+
+    @pytest.mark.asyncio
+    async def test_unlimited_by_default(self):
+        """Test a limiter without budgets never blocks."""
+        limiter = RateLimiter()
+        for _ in range(1000):
+            await limiter.acquire()
+
+        assert limiter.stats.minute_remaining is None
+        assert limiter.stats.granted == 1000
+
+    @pytest.mark.asyncio
+    async def test_interactive_waits_for_token(self, fake_clock, fake_sleep):
+        """Test an interactive call waits for the bucket to refill."""
+        limiter = RateLimiter(per_minute=60, max_wait=5, clock=fake_clock, sleep=fake_sleep)
+        for _ in range(60):
+            await limiter.acquire()
+
+        await limiter.acquire()
+
+        assert fake_sleep.calls == [pytest.approx(1)]
+        assert limiter.stats.waited == 1
+
+    @pytest.mark.asyncio
+    async def test_interactive_throttled_past_max_wait(self, fake_clock, fake_sleep):
+        """Test an interactive call fails rather than wait past max_wait."""
+        limiter = RateLimiter(per_day=10, max_wait=60, clock=fake_clock, sleep=fake_sleep)
+        for _ in range(10):
+            await limiter.acquire()
+
+        # The next day token is 8640 seconds away
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.acquire()
+
+        assert excinfo.value.retry_after == pytest.approx(8640)
+        assert fake_sleep.calls == []
+        assert limiter.stats.throttled == 1
+        assert limiter.stats.day_remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_background_dropped_at_reserve(self, fake_clock):
+        """Test background calls stop at the reserve, leaving it for interactive calls."""
+        limiter = RateLimiter(per_minute=10, background_reserve=0.2, clock=fake_clock)
+        for _ in range(8):
+            await limiter.acquire(Priority.BACKGROUND)
+
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(Priority.BACKGROUND)
+        await limiter.acquire(Priority.INTERACTIVE)
+        await limiter.acquire(Priority.INTERACTIVE)
+
+        stats = limiter.stats
+        assert stats.dropped == 1
+        assert stats.granted == 10
+        assert stats.minute_remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_background_dropped_while_interactive_waits(self, fake_clock):
+        """Test a waiting interactive call takes precedence over background calls."""
+        woke = asyncio.Event()
+
+        async def sleep(seconds: float) -> None:
+            await woke.wait()
+            fake_clock.now += seconds
+
+        limiter = RateLimiter(
+            per_minute=60, max_wait=5, background_reserve=0.0, clock=fake_clock, sleep=sleep
+        )
+        for _ in range(60):
+            await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        fake_clock.now += 1
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(Priority.BACKGROUND)
+
+        woke.set()
+        await waiter
+        assert limiter.stats.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_priority_from_context(self, fake_clock):
+        """Test acquire uses the current task's upstream_priority."""
+        limiter = RateLimiter(per_minute=10, background_reserve=1.0, clock=fake_clock)
+
+        async def background_call():
+            upstream_priority.set(Priority.BACKGROUND)
+            await limiter.acquire()
+
+        with pytest.raises(RateLimitExceeded):
+            await asyncio.create_task(background_call())
+        await limiter.acquire()
+
+        assert upstream_priority.get() is Priority.INTERACTIVE
+
+
+class TestWorkerShare:
+    """Tests for splitting an account quota between worker processes."""
+
+    @pytest.mark.parametrize(
+        "quota, workers, expected",
+        [(60, 1, 60), (60, 4, 15), (60, 7, 8), (3, 4, 1), (0, 4, 0), (60, 0, 60)],
+    )
+    def test_workers_stay_within_quota(self, quota, workers, expected):
+        """Test the workers' shares add up to no more than the quota."""
+        assert worker_share(quota, workers) == expected
+
+
+class TestWeatherProviderRateLimit:
+    """Tests for WeatherProvider with a rate limiter."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_background_refresh_dropped_serves_stale(
+        self, fake_clock, sample_current_weather_response
+    ):
+        """Test a refresh dropped for budget leaves the stale entry in place."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        limiter = RateLimiter(per_minute=10, background_reserve=1.0, clock=fake_clock)
+        provider = WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=60, stale_ttl=600, clock=fake_clock),
+            stale_while_revalidate=600,
+            rate_limiter=limiter,
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 61
+        stale = await provider.get_current(48.8566, 2.3522)
+        await asyncio.gather(*provider._revalidations, return_exceptions=True)
+
+        assert stale.temp == 20.5
+        assert route.call_count == 1
+        assert limiter.stats.dropped == 1
@@ -0,0 +1,145 @@
+"""Unit tests for recording upstream traffic and replaying it."""
+
+import gzip
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from services.http_pool import UpstreamPool
+from services.recording import (
+    Exchange,
+    ReplayTransport,
+    TrafficArchive,
+    load_archive,
+)
+from services.weather_provider import WeatherProvider
+
+
+class TestRecording:
+    """Tests for RecordingTransport and TrafficArchive."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_records_exchanges(self, tmp_path, sample_current_weather_response):
+        """Test upstream calls are archived with their response and no API key."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        path = str(tmp_path / "upstream.jsonl.gz")
+        archive = TrafficArchive(path)
+        pool = UpstreamPool(archive=archive)
+        provider = WeatherProvider(api_key="secret-key", client=pool.client)
+
+        result = await provider.get_current(48.8566, 2.3522)
+        await pool.aclose()
+
+        assert result.location_name == "Paris"
+        [exchange] = load_archive(path)
+        assert exchange.key == "GET /data/2.5/weather?lat=48.8566&lon=2.3522&units=metric"
+        assert exchange.status == 200
+        assert b'"name":"Paris"' in exchange.body.replace(b" ", b"")
+        assert b"secret-key" not in gzip.open(archive.path).read()
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_records_transport_errors(self, tmp_path):
+        """Test failed exchanges are archived by exception type."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=httpx.ConnectTimeout("slow")
+        )
+        path = str(tmp_path / "upstream.jsonl.gz")
+        pool = UpstreamPool(archive=TrafficArchive(path))
+
+        with pytest.raises(httpx.ConnectTimeout):
+            await pool.client.get("https://api.openweathermap.org/data/2.5/weather")
+        await pool.aclose()
+
+        assert load_archive(path)[0].error == "ConnectTimeout"
+
+    def test_sessions_append(self, tmp_path, fake_clock):
+        """Test each session adds to the archive instead of replacing it."""
+        path = str(tmp_path / "upstream.jsonl.gz")
+        for key in ("GET /a", "GET /b"):
+            archive = TrafficArchive(path, clock=fake_clock)
+            archive.append(Exchange(0.0, key, 0.1, 200, [], b"{}"))
+            archive.close()
+
+        assert [exchange.key for exchange in load_archive(path)] == ["GET /a", "GET /b"]
+
+    def test_processes_record_to_own_files(self, tmp_path, monkeypatch):
+        """Test each process appends to its own file and loading reads them all."""
+        path = tmp_path / "upstream.jsonl.gz"
+        for pid, key in ((101, "GET /a"), (102, "GET /b")):
+            monkeypatch.setattr("services.recording.os.getpid", lambda pid=pid: pid)
+            archive = TrafficArchive(str(path))
+            archive.append(Exchange(0.0, key, 0.1, 200, [], b"{}"))
+            archive.close()
+        (tmp_path / "upstream.old.jsonl.gz").write_bytes(b"")
+
+        assert sorted(p.name for p in tmp_path.glob("upstream.1*")) == [
+            "upstream.101.jsonl.gz",
+            "upstream.102.jsonl.gz",
+        ]
+        assert [exchange.key for exchange in load_archive(str(path))] == ["GET /a", "GET /b"]
+
+    def test_missing_archive(self, tmp_path):
+        """Test loading an archive nobody recorded raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            load_archive(str(tmp_path / "upstream.jsonl.gz"))
+
+    def test_binary_bodies(self, tmp_path):
+        """Test bodies that aren't UTF-8 survive the round trip."""
+        path = str(tmp_path / "upstream.jsonl.gz")
+        archive = TrafficArchive(path)
+        archive.append(Exchange(0.0, "GET /a", 0.1, 200, [], b"\xff\x00"))
+        archive.close()
+
+        assert load_archive(path)[0].body == b"\xff\x00"
+
+
+class TestReplayTransport:
+    """Tests for serving requests from recorded exchanges."""
+
+    @pytest.fixture
+    def exchanges(self):
+        key = "GET /data/2.5/weather?lat=1&lon=2"
+        return [
+            Exchange(0.0, key, 0.2, 200, [("content-type", "application/json")], b'{"n":1}'),
+            Exchange(1.0, key, 0.4, 200, [("content-type", "application/json")], b'{"n":2}'),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_replays_in_order_with_scaled_latency(self, exchanges, fake_sleep):
+        """Test repeats get recorded responses in order, cycling, after scaled delays."""
+        client = httpx.AsyncClient(
+            transport=ReplayTransport(exchanges, latency_scale=0.5, sleep=fake_sleep)
+        )
+        # Host, parameter order and API key don't affect matching
+        url = "http://localhost:9000/data/2.5/weather?lon=2&lat=1&appid=x"
+
+        bodies = [(await client.get(url)).json()["n"] for _ in range(3)]
+
+        assert bodies == [1, 2, 1]
+        assert fake_sleep.calls == [0.1, 0.2, 0.1]
+
+    @pytest.mark.asyncio
+    async def test_unrecorded_request(self, exchanges):
+        """Test requests missing from the archive get a 404 and are counted."""
+        transport = ReplayTransport(exchanges, latency_scale=0)
+        client = httpx.AsyncClient(transport=transport)
+
+        response = await client.get("http://localhost/data/2.5/forecast?lat=1&lon=2")
+
+        assert response.status_code == 404
+        assert (transport.served, transport.missing) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_replays_errors(self):
+        """Test recorded transport errors are raised again."""
+        exchanges = [Exchange(0.0, "GET /a", 0.1, error="ReadTimeout")]
+        client = httpx.AsyncClient(transport=ReplayTransport(exchanges, latency_scale=0))
+
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get("http://localhost/a")
@@ -0,0 +1,295 @@
+"""Unit tests for upstream circuit breakers and the retry deadline."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from services.cache import TTLCache
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    DeadlineExceeded,
+    UpstreamPolicy,
+    upstream_get,
+)
+from services.rate_limit import RateLimiter
+from services.weather_provider import WeatherProvider
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://upstream.test/")
+    return httpx.HTTPStatusError(
+        "error", request=request, response=Response(status, request=request)
+    )
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state transitions."""
+
+    def test_opens_after_threshold(self, fake_clock):
+        """Test consecutive failures open the circuit."""
+        breaker = CircuitBreaker(failure_threshold=3, clock=fake_clock)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.state is CircuitState.CLOSED
+
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state is CircuitState.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_failures(self, fake_clock):
+        """Test a success in between restarts the failure count."""
+        breaker = CircuitBreaker(failure_threshold=2, clock=fake_clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.failures == 1
+
+    def test_half_open_admits_one_probe(self, fake_clock):
+        """Test only one call is let through once the recovery time passes."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=30, clock=fake_clock)
+        breaker.record_failure()
+
+        fake_clock.now = 30
+        assert breaker.state is CircuitState.HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_probe_success_closes(self, fake_clock):
+        """Test a successful probe closes the circuit."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=30, clock=fake_clock)
+        breaker.record_failure()
+        fake_clock.now = 30
+        breaker.before_call()
+
+        breaker.record_success()
+
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.failures == 0
+
+    def test_probe_failure_reopens(self, fake_clock):
+        """Test a failed probe re-opens the circuit for another recovery time."""
+        breaker = CircuitBreaker(failure_threshold=5, recovery_time=30, clock=fake_clock)
+        for _ in range(5):
+            breaker.record_failure()
+        fake_clock.now = 30
+        breaker.before_call()
+
+        breaker.record_failure()
+
+        assert breaker.state is CircuitState.OPEN
+        fake_clock.now = 59
+        assert breaker.state is CircuitState.OPEN
+        fake_clock.now = 60
+        assert breaker.state is CircuitState.HALF_OPEN
+
+
+class TestUpstreamPolicy:
+    """Tests for UpstreamPolicy retries and deadline."""
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, fake_clock, fake_sleep):
+        """Test timeouts are retried with exponential backoff."""
+        policy = UpstreamPolicy(attempts=3, backoff=0.25, clock=fake_clock, sleep=fake_sleep)
+        results = iter([httpx.ReadTimeout("slow"), httpx.ConnectError("down"), "ok"])
+
+        async def request(timeout):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        assert await policy.call("weather", request) == "ok"
+        assert fake_sleep.calls == [0.25, 0.5]
+        assert policy.stats["weather"].failures == 0
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self, fake_clock, fake_sleep):
+        """Test a 4xx is raised at once and doesn't count against the circuit."""
+        policy = UpstreamPolicy(failure_threshold=1, clock=fake_clock, sleep=fake_sleep)
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            raise status_error(404)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await policy.call("weather", request)
+
+        assert len(calls) == 1
+        assert policy.stats["weather"].state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_server_errors_count_but_not_retried(self, fake_clock, fake_sleep):
+        """Test a 5xx counts as a failure and is raised without retrying."""
+        policy = UpstreamPolicy(failure_threshold=1, clock=fake_clock, sleep=fake_sleep)
+
+        async def request(timeout):
+            raise status_error(503)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await policy.call("weather", request)
+
+        assert fake_sleep.calls == []
+        assert policy.stats["weather"].state == "open"
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeouts_share_deadline(self, fake_clock, fake_sleep):
+        """Test each attempt gets the time left and retries stop at the deadline."""
+        policy = UpstreamPolicy(
+            deadline=1.0, attempts=5, backoff=0.25, clock=fake_clock, sleep=fake_sleep
+        )
+        timeouts = []
+
+        async def request(timeout):
+            timeouts.append(timeout)
+            fake_clock.now += 0.3
+            raise httpx.ReadTimeout("slow")
+
+        with pytest.raises(DeadlineExceeded):
+            await policy.call("weather", request)
+
+        assert timeouts == [pytest.approx(1.0), pytest.approx(0.45)]
+        assert fake_clock.now == pytest.approx(0.85)
+
+    @pytest.mark.asyncio
+    async def test_slow_body_stops_at_deadline(self):
+        """Test a body sent slowly enough to beat httpx's per-read timeout stops at the deadline."""
+
+        async def slow_body():
+            for _ in range(20):
+                await asyncio.sleep(0.05)
+                yield b"x"
+
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: Response(200, content=slow_body()))
+        )
+        policy = UpstreamPolicy(deadline=0.3, attempts=3, backoff=0.05)
+
+        async def request(timeout):
+            response = await client.get("https://upstream.test/", timeout=timeout)
+            return response.content
+
+        started = time.perf_counter()
+        with pytest.raises((DeadlineExceeded, httpx.TimeoutException)):
+            await policy.call("weather", request)
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+
+        assert elapsed < 0.3 + 0.1
+        assert policy.call_stats["weather"].timeouts >= 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self, fake_clock, fake_sleep):
+        """Test calls to an open endpoint fail without running the request."""
+        policy = UpstreamPolicy(
+            attempts=1, failure_threshold=1, clock=fake_clock, sleep=fake_sleep
+        )
+        calls = []
+
+        async def request(timeout):
+            calls.append(timeout)
+            raise httpx.ConnectError("down")
+
+        with pytest.raises(httpx.ConnectError):
+            await policy.call("weather", request)
+        with pytest.raises(CircuitOpenError):
+            await policy.call("weather", request)
+
+        assert len(calls) == 1
+        # Other endpoints have their own circuit
+        with pytest.raises(httpx.ConnectError):
+            await policy.call("forecast", request)
+
+    @pytest.mark.asyncio
+    async def test_before_attempt_counts_against_deadline(self, fake_clock, fake_sleep):
+        """Test time spent in before_attempt shrinks the attempt timeout."""
+        policy = UpstreamPolicy(deadline=10.0, clock=fake_clock, sleep=fake_sleep)
+
+        async def wait_for_budget():
+            fake_clock.now += 4
+
+        async def request(timeout):
+            return timeout
+
+        assert await policy.call("weather", request, wait_for_budget) == pytest.approx(6)
+
+
+class TestUpstreamGet:
+    """Tests for the upstream GET shared by the providers."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_acquires_budget_per_attempt(self, fake_clock, fake_sleep):
+        """Test each attempt, including retries, takes a rate limiter token."""
+        route = respx.get("https://upstream.test/data").mock(
+            side_effect=[httpx.ConnectError("refused"), Response(200, json={"ok": True})]
+        )
+        limiter = RateLimiter(per_minute=10, clock=fake_clock)
+        policy = UpstreamPolicy(attempts=2, clock=fake_clock, sleep=fake_sleep)
+
+        async with httpx.AsyncClient() as client:
+            response = await upstream_get(
+                client, "https://upstream.test/data", {"q": "x"}, policy, rate_limiter=limiter
+            )
+
+        assert response.json() == {"ok": True}
+        assert route.call_count == 2
+        assert limiter.stats.granted == 2
+        assert policy.call_stats["/data"].retries == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_error_status_raised(self, fake_clock, fake_sleep):
+        """Test an error status is raised without a retry."""
+        route = respx.get("https://upstream.test/data").mock(return_value=Response(404))
+        policy = UpstreamPolicy(clock=fake_clock, sleep=fake_sleep)
+
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await upstream_get(client, "https://upstream.test/data", {}, policy)
+
+        assert route.call_count == 1
+
+
+class TestWeatherProviderCircuit:
+    """Tests for WeatherProvider with an upstream policy."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_open_circuit_serves_stale(self, fake_clock, sample_current_weather_response):
+        """Test an open circuit falls back to stale-if-error without calling upstream."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=[
+                Response(200, json=sample_current_weather_response),
+                Response(500),
+            ]
+        )
+        provider = WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=60, stale_ttl=600, clock=fake_clock),
+            stale_if_error=600,
+            policy=UpstreamPolicy(attempts=1, failure_threshold=1, clock=fake_clock),
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 61
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 62
+        stale = await provider.get_current(48.8566, 2.3522)
+
+        assert stale.temp == 20.5
+        assert route.call_count == 2
+        assert provider._policy.stats["/data/2.5/weather"].state == "open"
@@ -0,0 +1,423 @@
+"""Unit tests for the shared cache tier and its backends."""
+
+import asyncio
+import sqlite3
+
+import pytest
+import respx
+from httpx import Response
+
+from services.cache import TTLCache
+from services.geocoding import GeocodingService
+from services.shared_cache import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    RedisError,
+    SharedCache,
+    SQLiteBackend,
+    open_backend,
+)
+from services.weather_provider import WeatherProvider
+
+
+class FakeRedis:
+    """Minimal Redis-protocol server supporting GET, SET PX and SELECT."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data: dict[bytes, tuple[float, bytes]] = {}
+        self.connections = 0
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                count = int((await reader.readline())[1:])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._handle(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ValueError, ConnectionError):
+            writer.close()
+
+    def _handle(self, args: list[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"SET":
+            self.data[args[1]] = (self.clock() + int(args[4]) / 1000, args[2])
+            return b"+OK\r\n"
+        if command == b"GET":
+            entry = self.data.get(args[1])
+            if entry is None or entry[0] <= self.clock():
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(entry[1]), entry[1])
+        return b"-ERR unknown command\r\n"
+
+
+class BrokenBackend(CacheBackend):
+    """Backend whose every operation fails."""
+
+    async def get(self, key):
+        raise ConnectionRefusedError("down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionRefusedError("down")
+
+
+@pytest.fixture
+async def fake_redis(fake_clock):
+    """Run a FakeRedis server for the test."""
+    server = FakeRedis(fake_clock)
+    server.port = await server.start()
+    yield server
+    await server.stop()
+
+
+class TestCacheBackend:
+    """Tests for the backend interface."""
+
+    def test_backend_is_abstract(self):
+        """Test a backend missing get or set can't be instantiated."""
+
+        class Incomplete(CacheBackend):
+            async def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestMemoryBackend:
+    """Tests for MemoryBackend."""
+
+    @pytest.mark.asyncio
+    async def test_expiry(self, fake_clock):
+        """Test entries disappear after their ttl."""
+        backend = MemoryBackend(clock=fake_clock)
+        await backend.set("a", b"1", ttl=10)
+
+        assert await backend.get("a") == b"1"
+        fake_clock.now = 10
+        assert await backend.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, fake_clock):
+        """Test the least recently used entry is evicted when full."""
+        backend = MemoryBackend(max_entries=2, clock=fake_clock)
+        await backend.set("a", b"1", ttl=10)
+        await backend.set("b", b"2", ttl=10)
+        await backend.get("a")
+        await backend.set("c", b"3", ttl=10)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        assert len(backend) == 2
+
+
+class TestSQLiteBackend:
+    """Tests for SQLiteBackend."""
+
+    @pytest.mark.asyncio
+    async def test_shared_between_connections(self, tmp_path, fake_clock):
+        """Test an entry written by one worker is read by another."""
+        path = str(tmp_path / "cache.db")
+        writer = SQLiteBackend(path, clock=fake_clock)
+        reader = SQLiteBackend(path, clock=fake_clock)
+
+        await writer.set("a", b"\x00payload", ttl=10)
+
+        assert await reader.get("a") == b"\x00payload"
+        fake_clock.now = 10
+        assert await reader.get("a") is None
+        await writer.close()
+        await reader.close()
+
+    @pytest.mark.asyncio
+    async def test_wal_mode(self, tmp_path):
+        """Test the database uses write-ahead logging."""
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+
+        assert backend._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_purges_expired_rows(self, tmp_path, fake_clock):
+        """Test expired rows are deleted periodically."""
+        backend = SQLiteBackend(str(tmp_path / "cache.db"), purge_every=2, clock=fake_clock)
+        await backend.set("old", b"1", ttl=1)
+        fake_clock.now = 5
+        await backend.set("new", b"2", ttl=10)
+
+        assert backend._db.execute("SELECT key FROM cache").fetchall() == [("new",)]
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_locked_database_does_not_block_loop(self, tmp_path):
+        """Test a write waiting for another process's lock leaves the event loop running."""
+        path = str(tmp_path / "cache.db")
+        backend = SQLiteBackend(path, busy_timeout=2.0)
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+
+        write = asyncio.create_task(backend.set("a", b"1", ttl=10))
+        await asyncio.sleep(0.05)
+        assert not write.done()
+
+        other.execute("COMMIT")
+        await write
+        assert await backend.get("a") == b"1"
+        other.close()
+        await backend.close()
+
+
+class TestRedisBackend:
+    """Tests for RedisBackend against a local stand-in server."""
+
+    @pytest.mark.asyncio
+    async def test_get_set(self, fake_redis, fake_clock):
+        """Test values round-trip with a millisecond expiry."""
+        backend = RedisBackend(port=fake_redis.port, db=2)
+
+        await backend.set("a", b"\r\nbinary", ttl=1.5)
+        assert await backend.get("a") == b"\r\nbinary"
+        assert await backend.get("missing") is None
+
+        fake_clock.now = 1.5
+        assert await backend.get("a") is None
+        assert fake_redis.connections == 1
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_reconnects_after_connection_loss(self, fake_redis):
+        """Test a dropped connection is replaced on the next command."""
+        backend = RedisBackend(port=fake_redis.port)
+        await backend.set("a", b"1", ttl=10)
+        backend._writer.transport.abort()
+
+        with pytest.raises(Exception):
+            await backend.get("a")
+        assert await backend.get("a") == b"1"
+        assert fake_redis.connections == 2
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_error_reply(self, fake_redis):
+        """Test an error reply raises RedisError and keeps the connection."""
+        backend = RedisBackend(port=fake_redis.port)
+
+        with pytest.raises(RedisError, match="unknown command"):
+            await backend._command(b"FLUSHALL")
+        await backend.get("a")
+
+        assert fake_redis.connections == 1
+        await backend.close()
+
+
+class TestOpenBackend:
+    """Tests for open_backend URL parsing."""
+
+    def test_redis_url(self):
+        """Test host, port and database come from the URL."""
+        backend = open_backend("redis://cache.internal:6380/3")
+
+        assert isinstance(backend, RedisBackend)
+        assert (backend.host, backend.port, backend.db) == ("cache.internal", 6380, 3)
+
+    @pytest.mark.asyncio
+    async def test_sqlite_url(self, tmp_path):
+        """Test the path comes from the URL."""
+        backend = open_backend(f"sqlite://{tmp_path}/cache.db")
+
+        assert isinstance(backend, SQLiteBackend)
+        assert (tmp_path / "cache.db").exists()
+        await backend.close()
+
+    def test_memory_url(self):
+        """Test memory:// opens an in-process backend."""
+        assert isinstance(open_backend("memory://"), MemoryBackend)
+
+    def test_unsupported_url(self):
+        """Test an unknown scheme is rejected."""
+        with pytest.raises(ValueError, match="Unsupported"):
+            open_backend("memcached://localhost")
+
+
+class TestSharedCache:
+    """Tests for SharedCache freshness and error handling."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_and_stale(self, fake_clock):
+        """Test entries report staleness like TTLCache.get_entry."""
+        cache = SharedCache(
+            MemoryBackend(clock=fake_clock), "test", ttl=60, stale_ttl=600, clock=fake_clock
+        )
+        await cache.set(("current", 1.0, 2.0), b"value")
+
+        fake_clock.now = 30
+        assert await cache.get_entry(("current", 1.0, 2.0)) == (b"value", -30)
+        fake_clock.now = 90
+        assert await cache.get_entry(("current", 1.0, 2.0)) == (b"value", 30)
+        fake_clock.now = 660
+        assert await cache.get_entry(("current", 1.0, 2.0)) is None
+
+        stats = cache.stats
+        assert (stats.hits, stats.stale_hits, stats.misses) == (1, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_namespaced_keys(self, fake_clock):
+        """Test keys are prefixed with the namespace."""
+        backend = MemoryBackend(clock=fake_clock)
+        await SharedCache(backend, "weather.v1", ttl=60, clock=fake_clock).set(("a", 1), b"x")
+
+        assert await backend.get("weather.v1:a:1") is not None
+
+    @pytest.mark.asyncio
+    async def test_backend_errors_are_misses(self):
+        """Test an unavailable backend never fails the caller."""
+        cache = SharedCache(BrokenBackend(), "test", ttl=60)
+
+        await cache.set("key", b"value")
+        assert await cache.get_entry("key") is None
+        assert cache.stats.misses == 1
+
+
+class TestWorkersShareCache:
+    """Tests for services sharing a backend across workers."""
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_weather_shared_between_providers(
+        self, tmp_path, sample_current_weather_response
+    ):
+        """Test a second worker serves weather fetched by the first."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        path = str(tmp_path / "cache.db")
+        workers = [
+            WeatherProvider(
+                api_key="test-api-key",
+                current_cache=TTLCache(ttl=60),
+                shared_cache=SQLiteBackend(path),
+            )
+            for _ in range(2)
+        ]
+
+        first = await workers[0].get_current(48.8566, 2.3522)
+        second = await workers[1].get_current(48.8566, 2.3522, units="imperial")
+
+        assert route.call_count == 1
+        assert second.timestamp == first.timestamp
+        assert second.temp == pytest.approx(first.temp * 9 / 5 + 32)
+        assert workers[1].shared_cache_stats["weather"].hits == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_forecast_shared_between_providers(self, sample_forecast_response):
+        """Test a second worker serves a forecast fetched by the first."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=sample_forecast_response)
+        )
+        backend = MemoryBackend()
+        workers = [
+            WeatherProvider(
+                api_key="test-api-key", forecast_cache=TTLCache(ttl=60), shared_cache=backend
+            )
+            for _ in range(2)
+        ]
+
+        first = await workers[0].get_forecast(48.8566, 2.3522)
+        second = await workers[1].get_forecast(48.8566, 2.3522)
+
+        assert route.call_count == 1
+        assert second == first
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_fresher_shared_entry_replaces_stale_local(
+        self, fake_clock, sample_current_weather_response
+    ):
+        """Test a worker picks up an entry another worker refreshed."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        backend = MemoryBackend(clock=fake_clock)
+        workers = [
+            WeatherProvider(
+                api_key="test-api-key",
+                current_cache=TTLCache(ttl=60, stale_ttl=600, clock=fake_clock),
+                stale_if_error=600,
+                shared_cache=backend,
+            )
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker._shared_current._clock = fake_clock
+
+        await workers[0].get_current(48.8566, 2.3522)
+        await workers[1].get_current(48.8566, 2.3522)
+        fake_clock.now = 61
+        await workers[0].get_current(48.8566, 2.3522)
+        await workers[1].get_current(48.8566, 2.3522)
+
+        fake_clock.now = 62
+        await workers[1].get_current(48.8566, 2.3522)
+
+        assert route.call_count == 2
+        assert workers[1].shared_cache_stats["weather"].hits == 2
+        # The refreshed entry was copied into the local cache
+        assert workers[1].cache_stats.hits == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_geocoding_shared_between_services(self, sample_geocoding_response):
+        """Test a second worker serves geocoding results fetched by the first."""
+        route = respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+        backend = MemoryBackend()
+        workers = [
+            GeocodingService(api_key="test-api-key", shared_cache=backend) for _ in range(2)
+        ]
+
+        first = await workers[0].search("Paris")
+        second = await workers[1].search("paris")
+
+        assert route.call_count == 1
+        assert second == first
+        assert workers[1].shared_cache_stats.hits == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_geocoding_freshness_from_shared_tier(self, fake_clock, sample_geocoding_response):
+        """Test geocoding results are fresh for what is left of their shared entry."""
+        respx.get("https://api.openweathermap.org/geo/1.0/direct").mock(
+            return_value=Response(200, json=sample_geocoding_response)
+        )
+        backend = MemoryBackend(clock=fake_clock)
+        workers = [
+            GeocodingService(api_key="test-api-key", shared_cache=backend, shared_cache_ttl=3600)
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker._shared_cache._clock = fake_clock
+
+        _, fetched_for = await workers[0].search_entry("Paris")
+        fake_clock.now = 600
+        _, shared_for = await workers[1].search_entry("Paris")
+        _, uncached_for = await GeocodingService(api_key="test-api-key").search_entry("Paris")
+
+        assert (fetched_for, shared_for, uncached_for) == (3600, 3000, 0.0)
@@ -1,14 +1,26 @@
 """Unit tests for the weather provider service."""
 
+import asyncio
+import copy
+
 import pytest
 import httpx
 import respx
 from httpx import Response
 from datetime import datetime
 
-from services.weather_provider import WeatherProvider
+from models.units import (
+    convert_current_weather,
+    convert_speed,
+    convert_temp,
+    normalize_units,
+)
+from services.cache import TTLCache
+from services.weather_provider import ForecastSeries, WeatherProvider
 from models.weather import CurrentWeather, DailyForecast, ForecastResponse, WeatherCondition
 
+CURRENT_CONVERTED = ("temp", "feels_like", "temp_min", "temp_max", "wind_speed")
+
 
 class TestCurrentWeatherModel:
     """Tests for CurrentWeather.from_openweathermap parsing."""
@@ -101,6 +113,102 @@ class TestDailyForecastModel:
         assert result.temp_max == 15.0
 
 
+class TestUnitConversion:
+    """Tests for local unit conversion against independently known values."""
+
+    @pytest.mark.parametrize(
+        "celsius, units, expected",
+        [
+            (0.0, "imperial", 32.0),
+            (100.0, "imperial", 212.0),
+            (-40.0, "imperial", -40.0),
+            (37.0, "imperial", 98.6),
+            (0.0, "standard", 273.15),
+            (-273.15, "standard", 0.0),
+            (21.3, "metric", 21.3),
+        ],
+    )
+    def test_convert_temp(self, celsius, units, expected):
+        """Test temperature conversion from Celsius at fixed points of each scale."""
+        assert convert_temp(celsius, units) == pytest.approx(expected)
+
+    @pytest.mark.parametrize(
+        "meters_per_second, units, expected",
+        [
+            # One mile per hour is exactly 0.44704 m/s
+            (0.44704, "imperial", 1.0),
+            (44.704, "imperial", 100.0),
+            (10.0, "imperial", 22.37),
+            (3.5, "standard", 3.5),
+        ],
+    )
+    def test_convert_speed(self, meters_per_second, units, expected):
+        """Test wind speed conversion from m/s."""
+        assert convert_speed(meters_per_second, units) == pytest.approx(expected)
+
+    def test_normalize_units(self):
+        """Test unknown units fall back to standard like OpenWeatherMap."""
+        assert normalize_units("Imperial") == "imperial"
+        assert normalize_units("kelvin") == "standard"
+
+    def test_convert_current_weather(self, sample_current_weather_response):
+        """Test only temperatures and wind speed change with the unit system."""
+        metric = CurrentWeather.from_openweathermap(sample_current_weather_response)
+
+        imperial = convert_current_weather(metric, "imperial")
+
+        assert (imperial.temp, imperial.feels_like) == (68.9, 67.64)
+        assert (imperial.temp_min, imperial.temp_max) == (64.4, 71.6)
+        assert imperial.wind_speed == 7.83
+        assert imperial.model_dump(exclude=set(CURRENT_CONVERTED)) == metric.model_dump(
+            exclude=set(CURRENT_CONVERTED)
+        )
+        assert convert_current_weather(metric, "metric") is metric
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_forecast_converted_after_aggregation(self, sample_forecast_response):
+        """Test daily values are converted from exact metric aggregates, rounded once."""
+        payload = copy.deepcopy(sample_forecast_response)
+        first = payload["list"][0]
+        payload["list"] = [
+            {**first, "dt": first["dt"] + i * 3600, "main": {**first["main"], "temp": temp}}
+            for i, temp in enumerate((0.001, 0.002, 0.003))
+        ]
+        respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=payload)
+        )
+        provider = WeatherProvider(api_key="test-api-key")
+
+        forecast = await provider.get_forecast(48.8566, 2.3522, days=1, units="imperial")
+
+        # 0.002 C is 32.0036 F; rounding each slot first would average to 32.0033
+        assert forecast.daily[0].temp_day == 32.0
+        assert forecast.daily[0].temp_max == 32.01
+
+
+class TestForecastSeries:
+    """Tests for ForecastSeries aggregation and memoization."""
+
+    def test_for_days_slices_aggregated_days(self, sample_forecast_response):
+        """Test for_days returns the first N local days."""
+        series = ForecastSeries(sample_forecast_response)
+
+        assert len(series.for_days(5).daily) == 1
+        assert series.for_days(1).daily[0].temp_day == pytest.approx(19.25)
+
+    def test_for_days_memoized(self, sample_forecast_response):
+        """Test repeated for_days calls return the memoized response."""
+        series = ForecastSeries(sample_forecast_response)
+
+        assert series.for_days(3) is series.for_days(3)
+
+    def test_malformed_payload_fails_on_creation(self):
+        """Test a malformed payload raises before it can be cached."""
+        with pytest.raises(KeyError):
+            ForecastSeries({"city": {"timezone": 0}, "list": [{"dt": 0}]})
+
+
 class TestForecastResponseModel:
     """Tests for ForecastResponse model."""
 
@@ -147,15 +255,29 @@ class TestWeatherProvider:
 
     @respx.mock
     @pytest.mark.asyncio
-    async def test_get_current_passes_units(self, provider, sample_current_weather_response):
-        """Test that units parameter is passed to API."""
+    async def test_get_current_fetches_canonical_units(self, provider, sample_current_weather_response):
+        """Test that upstream is always queried in metric and converted locally."""
         route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
             return_value=Response(200, json=sample_current_weather_response)
         )
 
-        await provider.get_current(48.8566, 2.3522, units="imperial")
+        result = await provider.get_current(48.8566, 2.3522, units="imperial")
 
-        assert route.calls[0].request.url.params["units"] == "imperial"
+        assert route.calls[0].request.url.params["units"] == "metric"
+        assert result.temp == 68.9
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_custom_base_url(self, sample_current_weather_response):
+        """Test requests go to a configured upstream origin."""
+        route = respx.get("http://127.0.0.1:8081/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        provider = WeatherProvider(api_key="test-api-key", base_url="http://127.0.0.1:8081/data/2.5")
+
+        await provider.get_current(48.8566, 2.3522)
+
+        assert route.called
 
     @respx.mock
     @pytest.mark.asyncio
@@ -207,6 +329,92 @@ class TestWeatherProvider:
         with pytest.raises(httpx.HTTPStatusError):
             await provider.get_forecast(48.8566, 2.3522)
 
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_concurrent_forecasts_coalesced(self, provider, sample_forecast_response):
+        """Test concurrent identical forecast requests make one upstream call."""
+
+        async def slow_response(request):
+            await asyncio.sleep(0.01)
+            return Response(200, json=sample_forecast_response)
+
+        route = respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            side_effect=slow_response
+        )
+
+        results = await asyncio.gather(
+            *(provider.get_forecast(48.8566, 2.3522, days=5) for _ in range(5))
+        )
+
+        assert route.call_count == 1
+        assert all(r.lat == 48.8566 for r in results)
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_concurrent_current_errors_propagate(self, provider):
+        """Test a coalesced upstream error reaches every caller."""
+
+        async def slow_error(request):
+            await asyncio.sleep(0.01)
+            return Response(500, json={"message": "Server error"})
+
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=slow_error
+        )
+
+        results = await asyncio.gather(
+            *(provider.get_current(48.8566, 2.3522) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert route.call_count == 1
+        assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_get_current_many(self, provider, sample_current_weather_response):
+        """Test batch lookup dedupes locations and reports per-item errors."""
+
+        def respond(request):
+            if request.url.params["lat"] == "0.0":
+                return Response(500, json={"message": "Server error"})
+            return Response(200, json=sample_current_weather_response)
+
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=respond
+        )
+
+        results = await provider.get_current_many(
+            [(48.8566, 2.3522), (0.0, 0.0), (48.8566, 2.3522)]
+        )
+
+        assert route.call_count == 2
+        assert results[0].location_name == "Paris"
+        assert isinstance(results[1], httpx.HTTPStatusError)
+        assert results[2] is results[0]
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_get_current_many_bounds_concurrency(self, sample_current_weather_response):
+        """Test no more than batch_concurrency upstream calls run at once."""
+        provider = WeatherProvider(api_key="test-api-key", batch_concurrency=3)
+        active = 0
+        peak = 0
+
+        async def respond(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return Response(200, json=sample_current_weather_response)
+
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(side_effect=respond)
+
+        await provider.get_current_many([(float(i), 0.0) for i in range(10)])
+
+        assert peak == 3
+
     @pytest.mark.asyncio
     async def test_close_client(self, provider):
         """Test closing the HTTP client."""
@@ -215,3 +423,207 @@ class TestWeatherProvider:
 
         await provider.close()
         assert client.is_closed
+
+
+class TestWeatherProviderCache:
+    """Tests for the current-weather cache in WeatherProvider."""
+
+    @pytest.fixture
+    def provider(self):
+        """Create a weather provider with a current-weather cache."""
+        return WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=60),
+            cache_grid=0.01,
+        )
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_nearby_coords_share_upstream_call(self, provider, sample_current_weather_response):
+        """Test near-identical coordinates are served from one cache entry."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+
+        first = await provider.get_current(48.8566, 2.3522)
+        second = await provider.get_current(48.8581, 2.3509)
+
+        assert route.call_count == 1
+        assert second is first
+        assert provider.cache_stats.hits == 1
+        assert provider.cache_stats.misses == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_requests_snapped_coords(self, provider, sample_current_weather_response):
+        """Test the upstream request uses the snapped cell coordinates."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+
+        params = route.calls[0].request.url.params
+        assert params["lat"] == "48.86"
+        assert params["lon"] == "2.35"
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_units_share_cache_entry(self, provider, sample_current_weather_response):
+        """Test different units are served from one cache entry."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+
+        metric = await provider.get_current(48.8566, 2.3522, units="metric")
+        imperial = await provider.get_current(48.8566, 2.3522, units="imperial")
+
+        assert route.call_count == 1
+        assert metric.temp == 20.5
+        assert imperial.temp == 68.9
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_errors_not_cached(self, provider, sample_current_weather_response):
+        """Test failed upstream calls are not cached."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=[
+                Response(500, json={"message": "Server error"}),
+                Response(200, json=sample_current_weather_response),
+            ]
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await provider.get_current(48.8566, 2.3522)
+        result = await provider.get_current(48.8566, 2.3522)
+
+        assert result.location_name == "Paris"
+        assert route.call_count == 2
+
+    def test_cache_stats_none_without_cache(self):
+        """Test cache_stats is None when caching is disabled."""
+        assert WeatherProvider(api_key="test-api-key").cache_stats is None
+
+
+class TestWeatherProviderStaleServing:
+    """Tests for stale-while-revalidate and stale-if-error serving."""
+
+    @pytest.fixture
+    def provider(self, fake_clock):
+        """Create a provider with 60s fresh, 60s revalidate and 600s error windows."""
+        return WeatherProvider(
+            api_key="test-api-key",
+            current_cache=TTLCache(ttl=60, stale_ttl=600, clock=fake_clock),
+            forecast_cache=TTLCache(ttl=60, stale_ttl=600, clock=fake_clock),
+            stale_while_revalidate=60,
+            stale_if_error=600,
+        )
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_and_refreshed(
+        self, provider, fake_clock, sample_current_weather_response
+    ):
+        """Test a stale entry is returned immediately and refreshed in the background."""
+        updated = {**sample_current_weather_response, "name": "Paris Updated"}
+        route = respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=[
+                Response(200, json=sample_current_weather_response),
+                Response(200, json=updated),
+            ]
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 90
+
+        stale = await provider.get_current(48.8566, 2.3522)
+        assert stale.location_name == "Paris"
+
+        await asyncio.gather(*provider._revalidations)
+        fresh = await provider.get_current(48.8566, 2.3522)
+
+        assert fresh.location_name == "Paris Updated"
+        assert route.call_count == 2
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_stale_if_error(self, provider, fake_clock, sample_current_weather_response):
+        """Test the last good value is served when upstream fails."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=[
+                Response(200, json=sample_current_weather_response),
+                Response(500, json={"message": "Server error"}),
+            ]
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 300  # Past the revalidate window, inside the error window
+
+        result = await provider.get_current(48.8566, 2.3522)
+
+        assert result.location_name == "Paris"
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_error_raised_past_stale_window(
+        self, provider, fake_clock, sample_current_weather_response
+    ):
+        """Test errors propagate once the entry is past every stale window."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            side_effect=[
+                Response(200, json=sample_current_weather_response),
+                Response(500, json={"message": "Server error"}),
+            ]
+        )
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 1000
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await provider.get_current(48.8566, 2.3522)
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_forecast_days_share_raw_series(self, provider, sample_forecast_response):
+        """Test different days values are derived from one cached upstream series."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=sample_forecast_response)
+        )
+
+        five_days = await provider.get_forecast(48.8566, 2.3522, days=5)
+        one_day = await provider.get_forecast(48.8566, 2.3522, days=1)
+
+        assert route.call_count == 1
+        assert one_day.daily == five_days.daily[:1]
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_forecast_cached(self, provider, sample_forecast_response):
+        """Test forecasts are served from the forecast cache."""
+        route = respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=sample_forecast_response)
+        )
+
+        await provider.get_forecast(48.8566, 2.3522, days=5)
+        await provider.get_forecast(48.8566, 2.3522, days=5)
+
+        assert route.call_count == 1
+        assert provider.forecast_cache_stats.hits == 1
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_fresh_for_counts_down(self, provider, fake_clock, sample_current_weather_response):
+        """Test freshness is what is left of the location's cache entry."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+        assert provider.fresh_for("current", 48.8566, 2.3522) == 0.0
+
+        await provider.get_current(48.8566, 2.3522)
+        fake_clock.now = 45
+
+        assert provider.fresh_for("current", 48.8571, 2.3519) == 15.0
+        assert provider.fresh_for("forecast", 48.8566, 2.3522) == 0.0
+        fake_clock.now = 90
+        assert provider.fresh_for("current", 48.8566, 2.3522) == 0.0
+        assert WeatherProvider(api_key="test-api-key").fresh_for("current", 0, 0) == 0.0
@@ -0,0 +1,108 @@
+"""Tests for per-phase request timings and the Server-Timing header."""
+
+import logging
+
+import pytest
+import respx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from httpx import Response
+
+from routers import weather_router
+from services.timing import RequestTimings, ServerTimingMiddleware, phase, request_timings
+from services.weather_provider import WeatherProvider
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Map each Server-Timing metric name to its duration."""
+    timings = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        timings[name] = float(params[0].removeprefix("dur="))
+    return timings
+
+
+class TestRequestTimings:
+    """Tests for RequestTimings and phase."""
+
+    def test_header(self):
+        """Test phases are reported in milliseconds, with repeat counts."""
+        timings = RequestTimings()
+        timings.add("upstream", 0.1)
+        timings.add("upstream", 0.05)
+        timings.add("parse", 0.0004)
+
+        header = timings.header()
+
+        assert header.startswith('upstream;dur=150.00;desc="2x", parse;dur=0.40, total;dur=')
+
+    def test_phase_records_into_current_request(self):
+        """Test phase adds its block's time to the active request."""
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            with phase("parse"):
+                pass
+        finally:
+            request_timings.reset(token)
+
+        assert timings.phases["parse"][1] == 1
+
+    def test_phase_without_request(self):
+        """Test phase is a no-op outside a request."""
+        with phase("parse"):
+            pass
+
+        assert request_timings.get() is None
+
+
+class TestServerTimingMiddleware:
+    """Tests for the Server-Timing header on API responses."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.state.weather_provider = WeatherProvider(api_key="test-api-key")
+        app.add_middleware(ServerTimingMiddleware, log=True)
+        app.include_router(weather_router)
+        return TestClient(app)
+
+    @respx.mock
+    def test_forecast_phases(self, client, sample_forecast_response):
+        """Test a forecast reports upstream, parse, aggregation and serialization."""
+        respx.get("https://api.openweathermap.org/data/2.5/forecast").mock(
+            return_value=Response(200, json=sample_forecast_response)
+        )
+
+        response = client.get("/api/weather/forecast", params={"lat": 48.8566, "lon": 2.3522})
+
+        timings = parse_server_timing(response.headers["server-timing"])
+        assert list(timings) == ["upstream", "parse", "aggregate", "serialize", "total"]
+        assert timings["total"] >= timings["upstream"]
+
+    @respx.mock
+    def test_error_responses_timed(self, client):
+        """Test failed requests still report where their time went."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(404)
+        )
+
+        response = client.get("/api/weather/current", params={"lat": 48.8566, "lon": 2.3522})
+
+        assert response.status_code == 502
+        assert set(parse_server_timing(response.headers["server-timing"])) == {
+            "upstream",
+            "total",
+        }
+
+    @respx.mock
+    def test_logs_timings(self, client, sample_current_weather_response, caplog):
+        """Test each request's timings are logged when enabled."""
+        respx.get("https://api.openweathermap.org/data/2.5/weather").mock(
+            return_value=Response(200, json=sample_current_weather_response)
+        )
+
+        with caplog.at_level(logging.INFO, logger="services.timing"):
+            client.get("/api/weather/current", params={"lat": 48.8566, "lon": 2.3522})
+
+        assert "GET /api/weather/current upstream;dur=" in caplog.text
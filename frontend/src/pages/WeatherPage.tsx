@@ -2,7 +2,7 @@ import { useState } from 'react';
 import { LocationSearch } from '../components/LocationSearch';
 import { CurrentWeatherCard } from '../components/CurrentWeatherCard';
 import { ForecastCard } from '../components/ForecastCard';
-import { getCurrentWeather, getForecast } from '../services/api';
+import { getWeatherBundle } from '../services/api';
 import type { GeoLocation, CurrentWeather, ForecastResponse } from '../types/weather';
 
 export function WeatherPage() {
@@ -17,10 +17,7 @@ export function WeatherPage() {
     setError(null);
 
     try {
-      const [weather, forecastData] = await Promise.all([
-        getCurrentWeather(lat, lon),
-        getForecast(lat, lon, 5),
-      ]);
+      const { current: weather, forecast: forecastData } = await getWeatherBundle(lat, lon, 5);
       // Use the selected location's display name if provided,
       // otherwise fall back to the API's returned location name
       if (displayName) {
@@ -1,7 +1,6 @@
 import type {
   GeocodingResponse,
-  CurrentWeather,
-  ForecastResponse,
+  WeatherBundle,
 } from '../types/weather';
 
 const API_BASE = import.meta.env.VITE_API_URL ?? '';
@@ -17,29 +16,16 @@ export async function searchLocations(query: string, signal?: AbortSignal): Prom
   return response.json();
 }
 
-export async function getCurrentWeather(
-  lat: number,
-  lon: number
-): Promise<CurrentWeather> {
-  const response = await fetch(
-    `${API_BASE}/api/weather/current?lat=${lat}&lon=${lon}&units=imperial`
-  );
-  if (!response.ok) {
-    throw new Error(`Weather fetch failed: ${response.statusText}`);
-  }
-  return response.json();
-}
-
-export async function getForecast(
+export async function getWeatherBundle(
   lat: number,
   lon: number,
   days: number = 5
-): Promise<ForecastResponse> {
+): Promise<WeatherBundle> {
   const response = await fetch(
-    `${API_BASE}/api/weather/forecast?lat=${lat}&lon=${lon}&days=${days}&units=imperial`
+    `${API_BASE}/api/weather/bundle?lat=${lat}&lon=${lon}&days=${days}&units=imperial`
   );
   if (!response.ok) {
-    throw new Error(`Forecast fetch failed: ${response.statusText}`);
+    throw new Error(`Weather fetch failed: ${response.statusText}`);
   }
   return response.json();
 }
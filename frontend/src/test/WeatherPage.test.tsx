@@ -6,8 +6,7 @@ import { WeatherPage } from '../pages/WeatherPage';
 // Mock the API module
 vi.mock('../services/api', () => ({
   searchLocations: vi.fn(),
-  getCurrentWeather: vi.fn(),
-  getForecast: vi.fn(),
+  getWeatherBundle: vi.fn(),
 }));
 
 function renderWeatherPage() {
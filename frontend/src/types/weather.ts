@@ -61,3 +61,8 @@ export interface ForecastResponse {
   timezone: number | null;
   daily: DailyForecast[];
 }
+
+export interface WeatherBundle {
+  current: CurrentWeather;
+  forecast: ForecastResponse;
+}